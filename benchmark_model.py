@@ -0,0 +1,269 @@
+"""
+`weights/{model_name}`のモデルで、合成の速さと元の方法との差を測る。
+
+python benchmark_model.py --model-name {model_name} {batch,f0,pitch}
+python benchmark_model.py {text,label}
+
+- `batch`: `p2speech_batch`でまとめて合成したときと、1文ずつ合成したときの
+  スループット（秒あたりの文数）と、音声の長さ・波形の差を比べる。
+- `f0`: `change_pitch`の、f0の推定方法（harvest/dio）ごとの速さと、f0の変換を
+  Pythonのループで行っていた以前の実装との波形の差を比べる。
+- `text`: `p2tokens`の、`str.replace`を繰り返していた以前の実装と今の実装
+  （覚えた結果を使わないとき・使うとき）の速さを比べる。モデルは使わない。
+- `label`: `pyopenjtalk_g2p_prosody`で、フルコンテキストラベルから特徴量を
+  正規表現で取り出していた以前の方法と、1回で読み取る今の方法の速さと結果を比べる。
+  モデルは使わない。
+- `pitch`: 音程を変えるときの、`pitch_method`（world/latent）ごとの`p2speech`の
+  速さ（音声1秒あたりの合成時間）を比べる。
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from typing import List, Sequence, Tuple
+
+import numpy as np
+import pyworld
+
+from espnet2.text.phoneme_tokenizer import (
+    _extract_fullcontext_label,
+    _numeric_feature_by_regex,
+    _parse_fullcontext_label,
+)
+from model import VITSJaProsModel, find_model_files, scale_f0
+from text import _p2tokens, g2p, kata2a_with_spaces, kata2p, p2tokens
+
+benchmark_texts = [
+    "こんにちは。",
+    "今日はいい天気ですね、散歩にでも行きましょうか？",
+    "音声合成のモデルをまとめて動かして、どれくらい速くなるかを確かめます。",
+    "はい。",
+    "長めの文章でも同じように合成できるかどうか、短い文と混ぜて見ておきます。",
+    "明日の予定を教えてください。",
+    "駅までは歩いて十分ほどです。",
+    "それは難しいけれど、やってみます。",
+]
+
+
+def benchmark_batch(model: VITSJaProsModel, p_list: List[str], batch_size: int = 16):
+    """ノイズ無しで、1文ずつとまとめての合成時間と結果の差を表示する"""
+    kwargs = dict(noise_scale=0, noise_scale_dur=0)
+    # 1回目は準備に時間がかかるので除く
+    model.p2speech(p_list[0], **kwargs)
+    start = time.perf_counter()
+    refs = [model.p2speech(p, **kwargs)[1] for p in p_list]
+    single = time.perf_counter() - start
+    start = time.perf_counter()
+    fs, waves = model.p2speech_batch(p_list, batch_size=batch_size, **kwargs)
+    batched = time.perf_counter() - start
+
+    duration = sum(len(wave) for wave in refs) / fs
+    print(f"{len(p_list)}文（{duration:.1f}秒の音声）、batch_size={batch_size}")
+    print(
+        f"1文ずつ: {len(p_list) / single:.1f}文/秒、"
+        f"まとめて: {len(p_list) / batched:.1f}文/秒（{single / batched:.2f}倍速）"
+    )
+    mismatched = [i for i, (r, w) in enumerate(zip(refs, waves)) if len(r) != len(w)]
+    print(f"長さが違う文: {len(mismatched)}/{len(p_list)}")
+    diffs = [np.abs(r - w).max() for r, w in zip(refs, waves) if len(r) == len(w)]
+    if len(diffs) > 0:
+        print(f"波形の差（最大）: {max(diffs):.2e}")
+
+
+def _change_pitch_loop(fs, wave, pitch_scale, intonation_scale, f0_method):
+    """f0の変換をPythonのループで行う、以前の`change_pitch`"""
+    wave = wave.astype(np.double)
+    if f0_method == "dio":
+        f0, t = pyworld.dio(wave, fs)
+        f0 = pyworld.stonemask(wave, f0, t, fs)
+    else:
+        f0, t = pyworld.harvest(wave, fs)
+    sp = pyworld.cheaptrick(wave, f0, t, fs)
+    ap = pyworld.d4c(wave, f0, t, fs)
+    non_zero_f0 = [f for f in f0 if f != 0]
+    if len(non_zero_f0) == 0:
+        # 以前はゼロ除算で落ちていた。今の実装に合わせてそのまま返す
+        return wave
+    f0_mean = sum(non_zero_f0) / len(non_zero_f0)
+    for i, f in enumerate(f0):
+        if f == 0:
+            continue
+        f0[i] = pitch_scale * f0_mean + intonation_scale * (f - f0_mean)
+    return pyworld.synthesize(f0, sp, ap, fs)
+
+
+def benchmark_f0(
+    model: VITSJaProsModel,
+    p_list: List[str],
+    pitch_scale: float = 1.1,
+    intonation_scale: float = 1.3,
+):
+    """合成した音声で、f0の推定方法ごとに`change_pitch`の時間と以前の実装との差を表示する"""
+    fs, waves = model.p2speech_batch(p_list, noise_scale=0, noise_scale_dur=0)
+    duration = sum(len(wave) for wave in waves) / fs
+    print(f"{len(p_list)}文（{duration:.1f}秒の音声）")
+    f0 = np.random.default_rng(0).uniform(80, 300, 100000)
+    start = time.perf_counter()
+    scale_f0(f0.copy(), pitch_scale, intonation_scale)
+    vectorized = time.perf_counter() - start
+    start = time.perf_counter()
+    non_zero_f0 = [f for f in f0 if f != 0]
+    f0_mean = sum(non_zero_f0) / len(non_zero_f0)
+    for i, f in enumerate(f0):
+        f0[i] = pitch_scale * f0_mean + intonation_scale * (f - f0_mean)
+    loop = time.perf_counter() - start
+    print(
+        f"f0の変換（{len(f0)}フレーム）: ループ {loop * 1000:.1f}ms、numpy {vectorized * 1000:.2f}ms"
+    )
+
+    for f0_method in ["harvest", "dio"]:
+        model.f0_method = f0_method
+        start = time.perf_counter()
+        changed = [
+            model.change_pitch(fs, wave, pitch_scale, intonation_scale)
+            for wave in waves
+        ]
+        elapsed = time.perf_counter() - start
+        refs = [
+            _change_pitch_loop(fs, wave, pitch_scale, intonation_scale, f0_method)
+            for wave in waves
+        ]
+        diff = max(np.abs(r - c).max() for r, c in zip(refs, changed))
+        print(
+            f"{f0_method}: 音声1秒あたり{elapsed / duration * 1000:.1f}ms、"
+            f"以前の実装との差（最大）: {diff:.2e}"
+        )
+
+
+def benchmark_pitch(
+    model: VITSJaProsModel,
+    p_list: List[str],
+    pitch_scales: Sequence[float] = (0.8, 1.0, 1.25),
+):
+    """`pitch_method`ごとに、音程を変えた`p2speech`の合成時間を表示する"""
+    kwargs = dict(noise_scale=0, noise_scale_dur=0)
+    for pitch_scale in pitch_scales:
+        for pitch_method in ["world", "latent"]:
+            model.pitch_method = pitch_method
+            # 1回目はリサンプリングの準備などに時間がかかるので除く
+            model.p2speech(p_list[0], pitch_scale=pitch_scale, **kwargs)
+            start = time.perf_counter()
+            waves = [
+                model.p2speech(p, pitch_scale=pitch_scale, **kwargs)[1] for p in p_list
+            ]
+            elapsed = time.perf_counter() - start
+            duration = sum(len(wave) for wave in waves) / model.fs
+            print(
+                f"pitch_scale={pitch_scale}、{pitch_method}: "
+                f"音声1秒あたり{elapsed / duration * 1000:.1f}ms"
+                f"（{len(p_list) / elapsed:.1f}文/秒）"
+            )
+
+
+def _p2tokens_replace(p: str) -> List[str]:
+    """記号・カタカナごとに`str.replace`していた、以前の`p2tokens`"""
+    p = p.replace("　", " ")
+    p = p.replace("？", "?")
+    p = re.sub(r"\s{2,}", " ", p)
+    p = p.strip()
+    if p[-1] != "?" and p[-1] != "$":
+        p = p + "$"
+    for k, v in kata2p.items():
+        p = p.replace(k, v)
+    p = "^" + p
+    for k, v in kata2a_with_spaces.items():
+        p = p.replace(k, v)
+    for sym in ["[", "]", "#", "_", "N", "cl", "?", "$"]:
+        p = p.replace(sym, " " + sym)
+    return p.split(" ")
+
+
+def benchmark_text(p_list: List[str], repeat: int = 100):
+    """`p2tokens`の1文あたりの時間と、以前の実装と結果が違う文の数を表示する"""
+    timings = {}
+    for name, fn in [
+        ("以前の実装", _p2tokens_replace),
+        ("今の実装", _p2tokens.__wrapped__),
+        ("今の実装（覚えた結果）", p2tokens),
+    ]:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for p in p_list:
+                fn(p)
+        timings[name] = (time.perf_counter() - start) / (repeat * len(p_list))
+    for name, elapsed in timings.items():
+        print(f"{name}: 1文あたり{elapsed * 1e6:.1f}µs")
+    mismatched = [p for p in p_list if p2tokens(p) != _p2tokens_replace(p)]
+    print(f"以前の実装と結果が違う文: {len(mismatched)}/{len(p_list)}")
+
+
+def _label_features_regex(lab: str) -> Tuple[str, int, int, int, int, int]:
+    """特徴量ごとに正規表現で探していた、以前の`pyopenjtalk_g2p_prosody`の方法"""
+    p3 = re.search(r"\-(.*?)\+", lab).group(1)
+    a1 = _numeric_feature_by_regex(r"/A:([0-9\-]+)\+", lab)
+    a2 = _numeric_feature_by_regex(r"\+(\d+)\+", lab)
+    a3 = _numeric_feature_by_regex(r"\+(\d+)/", lab)
+    f1 = _numeric_feature_by_regex(r"/F:(\d+)_", lab)
+    e3 = _numeric_feature_by_regex(r"!(\d+)_", lab)
+    return p3, a1, a2, a3, f1, e3
+
+
+def benchmark_label(texts: List[str], repeat: int = 100):
+    """ラベル1つあたりの特徴量の取り出し時間と、以前の方法と結果が違うラベルの数を表示する"""
+    labels = [lab for text in texts for lab in _extract_fullcontext_label(text)]
+    timings = {}
+    for name, fn in [
+        ("正規表現（以前）", _label_features_regex),
+        ("1回で読み取る（今）", _parse_fullcontext_label),
+    ]:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for lab in labels:
+                fn(lab)
+        timings[name] = (time.perf_counter() - start) / (repeat * len(labels))
+    for name, elapsed in timings.items():
+        print(f"{name}: ラベル1つあたり{elapsed * 1e6:.2f}µs")
+    mismatched = [
+        lab
+        for lab in labels
+        if _parse_fullcontext_label(lab) != _label_features_regex(lab)
+    ]
+    print(f"以前の方法と結果が違うラベル: {len(mismatched)}/{len(labels)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model-root", type=str, default="weights")
+    parser.add_argument("--model-name", type=str, default=None)
+    parser.add_argument("--device", type=str, default="cpu")
+    parser.add_argument(
+        "mode", type=str, choices=["batch", "f0", "pitch", "text", "label"]
+    )
+    parser.add_argument("--num-texts", type=int, default=64, help="合成する文の数")
+    parser.add_argument("--batch-size", type=int, default=16)
+    args = parser.parse_args()
+
+    if args.mode == "label":
+        benchmark_label(benchmark_texts)
+        sys.exit()
+    p_list = [g2p(text) for text in benchmark_texts]
+    if args.mode == "text":
+        benchmark_text(p_list)
+        sys.exit()
+    if args.model_name is None:
+        parser.error(f"{args.mode}には--model-nameが必要です。")
+    p_list = (p_list * (args.num_texts // len(p_list) + 1))[: args.num_texts]
+    model_path, config_path = find_model_files(
+        os.path.join(args.model_root, args.model_name)
+    )
+    model = VITSJaProsModel(
+        args.model_name, model_path, config_path, device=args.device
+    )
+
+    if args.mode == "batch":
+        benchmark_batch(model, p_list, args.batch_size)
+    elif args.mode == "f0":
+        benchmark_f0(model, p_list)
+    elif args.mode == "pitch":
+        benchmark_pitch(model, p_list)
@@ -0,0 +1,441 @@
+"""
+学習まわりの変更で、学習の速さと元の方法との差を測る。モデルの学習済みファイルは使わない。
+
+python benchmark_train.py {reporter,gan_freeze} [--device cuda]
+python benchmark_train.py text_int --model-name {model_name}
+python benchmark_train.py feats [--model-name {model_name}] [--device cuda]
+python benchmark_train.py packed_wav [--model-name {model_name}]
+python benchmark_train.py dataloader [--model-name {model_name}] [--num-workers 4]
+
+- `reporter`: `--defer_stats`の有無で、損失を毎ステップ`item()`するときと、
+  ログを書くときにまとめて取り出すときの1ステップの時間と、ログの値の差を比べる。
+  CPUでは`item()`がデバイスを待たないので、差が出るのはGPUのとき。
+- `gan_freeze`: `--freeze_inactive_params`の有無で、生成器のターンの順伝播と逆伝播の時間と
+  （GPUのときは）メモリの最大使用量、生成器の勾配の差を比べる。
+- `text_int`: `preprocess.py`で前処理したデータで、以前のように`text`をその場で
+  トークンIDに変換するときと、`text_int`を読むときの、1エポック分のtextの読み込み時間を比べる。
+- `feats`: 線形スペクトログラムを学習中に計算するときと、`preprocess.py --dump-feats`で
+  保存したものをmmapで読むときの1文あたりの時間と、値の差を比べる。`--model-name`を
+  指定すると前処理したデータ（`--dump-feats`したもの）を、省略すると乱数の音声を使う。
+- `packed_wav`: `wav.scp`から1ファイルずつwavを読むときと、`wav_packed.scp`でまとめた
+  npyファイルをmmapで読むときの1文あたりの時間と、値が一致するかを比べる。
+  `--model-name`を指定すると前処理したデータを、省略すると乱数の音声を使う。
+- `dataloader`: DataLoaderのワーカーをエポックごとに作り直すとき（以前の設定）と、
+  `--persistent_workers true --prefetch_factor 4`（`conf/finetune.yaml`の設定）のときで、
+  各エポックの最初のバッチまでの時間と、学習のステップ（`--step-ms`ミリ秒の待ち時間で代用）の
+  間にバッチを待った時間を比べる。`--model-name`を指定すると前処理したデータを、
+  省略すると乱数の音声を使う。
+"""
+import argparse
+import os
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import soundfile as sf
+import torch
+
+from espnet2.fileio.packed_npy import (
+    PackedNpyReader,
+    PackedNpyWriter,
+    PackedSoundReader,
+)
+from espnet2.fileio.sound_scp import SoundScpReader
+from espnet2.iterators.sequence_iter_factory import SequenceIterFactory
+from espnet2.tasks.gan_tts import GANTTSTask
+from espnet2.train.collate_fn import CommonCollateFn
+from espnet2.train.dataset import ESPnetDataset
+from espnet2.train.gan_trainer import GANTrainer
+from espnet2.train.reporter import Reporter
+from espnet2.tts.feats_extract.linear_spectrogram import LinearSpectrogram
+from preprocess import (
+    hop_length,
+    n_fft,
+    pack_wav_scp,
+    sampling_rate,
+    training_args,
+    write_feats,
+)
+
+# VITSの生成器のターンで登録している損失の名前
+VITS_LOSS_NAMES = [
+    "generator_loss",
+    "generator_mel_loss",
+    "generator_kl_loss",
+    "generator_dur_loss",
+    "generator_adv_loss",
+    "generator_feat_match_loss",
+]
+
+
+def _toy_step(
+    model: torch.nn.Module, optimizer: torch.optim.Optimizer, x: torch.Tensor
+) -> Dict[str, torch.Tensor]:
+    """VITSの1ステップのように、損失をいくつか計算して更新し、detachした損失を返す"""
+    h = model(x)
+    losses = {
+        name: (h[:, i :: len(VITS_LOSS_NAMES)] ** 2).mean()
+        for i, name in enumerate(VITS_LOSS_NAMES[1:])
+    }
+    loss = sum(losses.values())
+    optimizer.zero_grad()
+    loss.backward()
+    optimizer.step()
+    stats = {VITS_LOSS_NAMES[0]: loss.detach()}
+    stats.update({k: v.detach() for k, v in losses.items()})
+    return stats
+
+
+def benchmark_reporter(
+    device: str, num_steps: int = 300, log_interval: int = 50, repeat: int = 3
+):
+    """`defer_stats`ごとに、1ステップの時間とログの値を比べる"""
+    results: Dict[bool, Tuple[float, List[str]]] = {}
+    for defer_stats in [False, True] * repeat:
+        torch.manual_seed(0)
+        model = torch.nn.Sequential(
+            torch.nn.Linear(256, 1024), torch.nn.ReLU(), torch.nn.Linear(1024, 256)
+        ).to(device)
+        optimizer = torch.optim.Adam(model.parameters(), lr=1e-4)
+        x = torch.randn(64, 256, device=device)
+        reporter = Reporter(defer_stats=defer_stats)
+        reporter.set_epoch(1)
+        messages = []
+        with reporter.observe("train") as sub_reporter:
+            # 1回目は準備に時間がかかるので除く
+            _toy_step(model, optimizer, x)
+            if device == "cuda":
+                torch.cuda.synchronize()
+            start = time.perf_counter()
+            for i in range(num_steps):
+                sub_reporter.register(_toy_step(model, optimizer, x))
+                sub_reporter.next()
+                if (i + 1) % log_interval == 0:
+                    messages.append(sub_reporter.log_message(-log_interval))
+            if device == "cuda":
+                torch.cuda.synchronize()
+            elapsed = (time.perf_counter() - start) / num_steps
+        # 繰り返した中で一番速かったものを使う
+        if defer_stats not in results or elapsed < results[defer_stats][0]:
+            results[defer_stats] = (elapsed, messages)
+
+    for defer_stats, (elapsed, _) in results.items():
+        print(f"defer_stats={defer_stats}: 1ステップあたり{elapsed * 1000:.3f}ms")
+    print(f"速さ: {results[False][0] / results[True][0]:.2f}倍")
+    same = results[False][1] == results[True][1]
+    print(f"ログの値: {'同じ' if same else '違う'}")
+
+
+class _ToyGAN(torch.nn.Module):
+    """VITSのように、識別器が生成器より大きいGAN"""
+
+    def __init__(self):
+        super().__init__()
+        self.generator = torch.nn.Sequential(
+            torch.nn.Conv1d(1, 32, 7, padding=3),
+            torch.nn.LeakyReLU(0.1),
+            torch.nn.Conv1d(32, 1, 7, padding=3),
+        )
+        layers = []
+        channels = 1
+        for out_channels in [32, 64, 128, 128]:
+            layers += [
+                torch.nn.Conv1d(channels, out_channels, 15, padding=7),
+                torch.nn.LeakyReLU(0.1),
+            ]
+            channels = out_channels
+        layers.append(torch.nn.Conv1d(channels, 1, 3, padding=1))
+        self.discriminator = torch.nn.Sequential(*layers)
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        fake = self.generator(x)
+        adv_loss = ((1 - self.discriminator(fake)) ** 2).mean()
+        return adv_loss + (fake - x).abs().mean()
+
+
+def benchmark_gan_freeze(device: str, num_steps: int = 20, repeat: int = 3):
+    """生成器のターンで識別器を固定するかどうかで、時間とメモリと勾配を比べる"""
+    torch.manual_seed(0)
+    model = _ToyGAN().to(device)
+    optimizers = [
+        torch.optim.SGD(model.generator.parameters(), lr=0.0),
+        torch.optim.SGD(model.discriminator.parameters(), lr=0.0),
+    ]
+    x = torch.randn(16, 1, 8192, device=device)
+    results: Dict[bool, Tuple[float, float, List[torch.Tensor]]] = {}
+    for freeze in [False, True] * repeat:
+        if device == "cuda":
+            torch.cuda.synchronize()
+            torch.cuda.reset_peak_memory_stats()
+        elapsed = []
+        # 1回目は準備に時間がかかるので除く
+        for i in range(num_steps + 1):
+            start = time.perf_counter()
+            with GANTrainer._freeze_inactive_params(optimizers, "generator", freeze):
+                model(x).backward()
+            if device == "cuda":
+                torch.cuda.synchronize()
+            if i > 0:
+                elapsed.append(time.perf_counter() - start)
+            grads = [p.grad.clone() for p in model.generator.parameters()]
+            for optimizer in optimizers:
+                optimizer.zero_grad(set_to_none=True)
+        step_time = sum(elapsed) / len(elapsed)
+        peak_mem = (
+            torch.cuda.max_memory_allocated() / 2**30 if device == "cuda" else 0.0
+        )
+        # 繰り返した中で一番速かったものを使う
+        if freeze not in results or step_time < results[freeze][0]:
+            results[freeze] = (step_time, peak_mem, grads)
+
+    for freeze, (step_time, peak_mem, _) in results.items():
+        message = f"freeze_inactive_params={freeze}: 1ステップあたり{step_time * 1000:.1f}ms"
+        if device == "cuda":
+            message += f"、メモリの最大使用量{peak_mem:.3f}GB"
+        print(message)
+    print(f"速さ: {results[False][0] / results[True][0]:.2f}倍")
+    same = all(
+        torch.allclose(a, b) for a, b in zip(results[False][2], results[True][2])
+    )
+    print(f"生成器の勾配: {'同じ' if same else '違う'}")
+
+
+def benchmark_text_int(model_name: str, output_dir: str):
+    """学習時と同じ`ESPnetDataset`で、1エポック分のtextを読む時間を比べる"""
+    dump_dir = os.path.join(output_dir, model_name, "dump", "train")
+    preprocessor = GANTTSTask.build_preprocess_fn(
+        training_args(model_name, output_dir), train=True
+    )
+    times = {}
+    for name, loader_type in [("text", "text"), ("text_int", "text_int")]:
+        dataset = ESPnetDataset(
+            [(os.path.join(dump_dir, name), "text", loader_type)],
+            preprocess=preprocessor,
+        )
+        start = time.perf_counter()
+        for wav in dataset:
+            dataset[wav]
+        times[name] = time.perf_counter() - start
+    print(
+        f"1エポック（{len(dataset)}文）のtextの読み込み: "
+        f"その場で変換 {times['text']:.2f}秒、text_int {times['text_int']:.3f}秒"
+    )
+
+
+def _random_packed_wavs(tmp_dir: str, num_clips: int = 100) -> str:
+    """前処理したデータの代わりに、乱数の音声（1〜8秒）をint16でまとめて、scpのパスを返す"""
+    rng = np.random.default_rng(0)
+    lengths = {
+        f"utt{i}": int(sampling_rate * rng.uniform(1, 8)) for i in range(num_clips)
+    }
+    packed_scp = os.path.join(tmp_dir, "wav_packed.scp")
+    with PackedNpyWriter(
+        os.path.join(tmp_dir, "wav.npy"), packed_scp, lengths, dtype="int16"
+    ) as writer:
+        for wav, length in lengths.items():
+            writer[wav] = rng.integers(-(2**14), 2**14, length, dtype=np.int16)
+    return packed_scp
+
+
+def benchmark_feats(model_name: Optional[str], output_dir: str, device: str):
+    """学習中にSTFTを計算するときと、保存したものを読むときの1文あたりの時間を比べる"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if model_name is None:
+            packed_scp = _random_packed_wavs(tmp_dir)
+            feats_scp = os.path.join(tmp_dir, "feats.scp")
+            write_feats(packed_scp, os.path.join(tmp_dir, "feats.npy"), feats_scp)
+        else:
+            dump_dir = os.path.join(output_dir, model_name, "dump", "train")
+            packed_scp = os.path.join(dump_dir, "wav_packed.scp")
+            feats_scp = os.path.join(dump_dir, "feats.scp")
+        wav_reader = PackedSoundReader(packed_scp, dtype="float32")
+        feats_reader = PackedNpyReader(feats_scp)
+        feats_extract = LinearSpectrogram(
+            n_fft=n_fft, win_length=None, hop_length=hop_length
+        ).to(device)
+
+        # 学習中と同じく、デバイスに送ってから計算する・読んでからデバイスに送る
+        times = {"STFT": 0.0, "mmap": 0.0}
+        max_diff = 0.0
+        for wav in wav_reader:
+            start = time.perf_counter()
+            speech = torch.from_numpy(wav_reader[wav]).to(device)
+            with torch.no_grad():
+                feats, _ = feats_extract(speech[None])
+            if device == "cuda":
+                torch.cuda.synchronize()
+            times["STFT"] += time.perf_counter() - start
+
+            start = time.perf_counter()
+            dumped = torch.from_numpy(np.array(feats_reader[wav])).to(device)
+            if device == "cuda":
+                torch.cuda.synchronize()
+            times["mmap"] += time.perf_counter() - start
+            max_diff = max(max_diff, (feats[0] - dumped).abs().max().item())
+
+    for name, elapsed in times.items():
+        print(f"{name}: 1文あたり{elapsed / len(wav_reader) * 1000:.2f}ms")
+    print(f"速さ: {times['STFT'] / times['mmap']:.1f}倍、値の差の最大: {max_diff:.2e}")
+
+
+def benchmark_packed_wav(
+    model_name: Optional[str], output_dir: str, num_clips: int = 200
+):
+    """wav.scpとwav_packed.scpで、1文あたりの読み込み時間を比べる"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if model_name is None:
+            rng = np.random.default_rng(0)
+            wav_scp = os.path.join(tmp_dir, "wav.scp")
+            with open(wav_scp, "w", encoding="utf-8") as f:
+                for i in range(num_clips):
+                    path = os.path.join(tmp_dir, f"utt{i}.wav")
+                    wave = rng.uniform(
+                        -0.5, 0.5, int(sampling_rate * rng.uniform(1, 8))
+                    )
+                    sf.write(path, wave, sampling_rate, "PCM_16")
+                    f.write(f"utt{i} {path}\n")
+            packed_scp = os.path.join(tmp_dir, "wav_packed.scp")
+            pack_wav_scp(wav_scp, os.path.join(tmp_dir, "wav.npy"), packed_scp)
+        else:
+            dump_dir = os.path.join(output_dir, model_name, "dump", "train")
+            wav_scp = os.path.join(dump_dir, "wav.scp")
+            packed_scp = os.path.join(dump_dir, "wav_packed.scp")
+        # 学習時と同じ読み込み方
+        readers = {
+            "wav.scp": SoundScpReader(wav_scp, dtype="float32"),
+            "wav_packed.scp": PackedSoundReader(packed_scp, dtype="float32"),
+        }
+        keys = list(readers["wav.scp"])[:num_clips]
+        times = {}
+        waves = {}
+        for name, reader in readers.items():
+            start = time.perf_counter()
+            waves[name] = [reader[wav] for wav in keys]
+            times[name] = time.perf_counter() - start
+
+    for name, elapsed in times.items():
+        print(f"{name}: 1文あたり{elapsed / len(keys) * 1000:.3f}ms")
+    same = all(
+        np.array_equal(rate_and_wave[1], wave)
+        for rate_and_wave, wave in zip(waves["wav.scp"], waves["wav_packed.scp"])
+    )
+    print(
+        f"速さ: {times['wav.scp'] / times['wav_packed.scp']:.1f}倍、"
+        f"値: {'同じ' if same else '違う'}"
+    )
+
+
+def benchmark_dataloader(
+    model_name: Optional[str],
+    output_dir: str,
+    num_workers: int = 4,
+    batch_size: int = 8,
+    num_epochs: int = 3,
+    step_ms: float = 50,
+):
+    """ワーカーをエポックごとに作り直すときと、残しておくときで、バッチを待つ時間を比べる"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if model_name is None:
+            dataset = ESPnetDataset(
+                [(_random_packed_wavs(tmp_dir), "speech", "packed_sound")]
+            )
+            collate_fn = CommonCollateFn(float_pad_value=0.0, int_pad_value=0)
+        else:
+            # 学習時と同じデータ・前処理・まとめ方
+            dump_dir = os.path.join(output_dir, model_name, "dump", "train")
+            args = training_args(model_name, output_dir)
+            dataset = ESPnetDataset(
+                [
+                    (os.path.join(dump_dir, "text_int"), "text", "text_int"),
+                    (
+                        os.path.join(dump_dir, "wav_packed.scp"),
+                        "speech",
+                        "packed_sound",
+                    ),
+                ],
+                preprocess=GANTTSTask.build_preprocess_fn(args, train=True),
+            )
+            collate_fn = GANTTSTask.build_collate_fn(args, train=True)
+        keys = list(dataset)
+        batches = [keys[i : i + batch_size] for i in range(0, len(keys), batch_size)]
+
+        for persistent_workers, prefetch_factor in [(False, None), (True, 4)]:
+            factory = SequenceIterFactory(
+                dataset,
+                batches,
+                shuffle=True,
+                num_workers=num_workers,
+                collate_fn=collate_fn,
+                persistent_workers=persistent_workers,
+                prefetch_factor=prefetch_factor,
+            )
+            first_batch, wait = [], []
+            for epoch in range(1, num_epochs + 1):
+                start = time.perf_counter()
+                iterator = iter(factory.build_iter(epoch))
+                next(iterator)
+                first_batch.append(time.perf_counter() - start)
+                epoch_wait = 0.0
+                while True:
+                    # 学習の1ステップの代わり
+                    time.sleep(step_ms / 1000)
+                    start = time.perf_counter()
+                    try:
+                        next(iterator)
+                    except StopIteration:
+                        break
+                    epoch_wait += time.perf_counter() - start
+                wait.append(epoch_wait)
+            del iterator, factory
+            print(
+                f"persistent_workers={persistent_workers}, "
+                f"prefetch_factor={prefetch_factor}: "
+                "最初のバッチまで "
+                + "、".join(f"{t:.2f}" for t in first_batch)
+                + "秒、ステップの間にバッチを待った時間 "
+                + "、".join(f"{t:.2f}" for t in wait)
+                + "秒（エポックごと）"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "mode",
+        type=str,
+        choices=[
+            "reporter",
+            "gan_freeze",
+            "text_int",
+            "feats",
+            "packed_wav",
+            "dataloader",
+        ],
+    )
+    parser.add_argument(
+        "--device", type=str, default="cuda" if torch.cuda.is_available() else "cpu"
+    )
+    parser.add_argument("--model-name", type=str, help="前処理したデータを使うときのモデル名")
+    parser.add_argument("--output-dir", type=str, default="outputs")
+    parser.add_argument("--num-workers", type=int, default=4)
+    parser.add_argument("--step-ms", type=float, default=50, help="学習の1ステップの代わりに待つ時間")
+    args = parser.parse_args()
+
+    if args.mode == "reporter":
+        benchmark_reporter(args.device)
+    elif args.mode == "gan_freeze":
+        benchmark_gan_freeze(args.device)
+    elif args.mode == "text_int":
+        benchmark_text_int(args.model_name, args.output_dir)
+    elif args.mode == "feats":
+        benchmark_feats(args.model_name, args.output_dir, args.device)
+    elif args.mode == "packed_wav":
+        benchmark_packed_wav(args.model_name, args.output_dir)
+    elif args.mode == "dataloader":
+        benchmark_dataloader(
+            args.model_name,
+            args.output_dir,
+            num_workers=args.num_workers,
+            step_ms=args.step_ms,
+        )
@@ -0,0 +1,162 @@
+"""
+`batch_type: vits_cost`の見積もりの係数（`batch_cost_conf`）を、実際の学習の1ステップの
+時間から求める。
+
+python calibrate_batch_cost.py --config outputs/{model_name}/checkpoints/config.yaml
+
+`--config`の設定でモデルを組み立て（重みは乱数のまま）、文の長さ・フレーム数・バッチサイズを
+変えたミニバッチで、生成器と識別器のターンの順伝播と逆伝播にかかる時間を測る。
+その時間に見積もりの式を非負の最小二乗法で当てはめ、`conf/finetune.yaml`に書ける
+`batch_cost_conf`と、1ステップの時間の目安から決めた`batch_bins`を表示する。
+学習に使うGPUで、学習していないときに実行すること。
+"""
+import argparse
+import itertools
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+import torch
+import yaml
+
+from espnet2.samplers.vits_cost_batch_sampler import batch_cost, fit_cost_conf
+from espnet2.tasks.gan_tts import GANTTSTask
+
+
+def measure_step(
+    model: torch.nn.Module,
+    batch_size: int,
+    text_length: int,
+    num_frames: int,
+    hop_length: int,
+    num_tokens: int,
+    device: str,
+    num_runs: int = 3,
+) -> Optional[float]:
+    """
+    乱数の入力で学習の1ステップ（生成器と識別器のターン）の時間を測り、中央値を返す。
+    メモリが足りないときはNoneを返す。
+    """
+    text = torch.randint(1, num_tokens, (batch_size, text_length), device=device)
+    text_lengths = torch.full((batch_size,), text_length, device=device)
+    speech = torch.randn(batch_size, (num_frames - 1) * hop_length, device=device)
+    speech_lengths = torch.full((batch_size,), speech.size(1), device=device)
+    times = []
+    try:
+        # 1回目は準備に時間がかかるので除く
+        for i in range(num_runs + 1):
+            if device == "cuda":
+                torch.cuda.synchronize()
+            start = time.perf_counter()
+            for forward_generator in [True, False]:
+                loss = model(
+                    text,
+                    text_lengths,
+                    speech,
+                    speech_lengths,
+                    forward_generator=forward_generator,
+                )["loss"]
+                loss.backward()
+                model.zero_grad(set_to_none=True)
+            if device == "cuda":
+                torch.cuda.synchronize()
+            if i > 0:
+                times.append(time.perf_counter() - start)
+    except torch.cuda.OutOfMemoryError:
+        model.zero_grad(set_to_none=True)
+        torch.cuda.empty_cache()
+        return None
+    return float(np.median(times))
+
+
+def calibrate(
+    config_path: str,
+    device: str,
+    batch_sizes: List[int],
+    text_lengths: List[int],
+    num_frames: List[int],
+    num_runs: int = 3,
+) -> Tuple[dict, float, float, List[Tuple[int, int, int, float]]]:
+    """全ての組み合わせで時間を測って係数を求め、(cost_conf, scale, overhead, 測定結果)を返す"""
+    model, args = GANTTSTask.build_model_from_file(config_path, None, device)
+    model.train()
+    hop_length = args.feats_extract_conf["hop_length"]
+    segment_size = args.tts_conf["generator_params"].get("segment_size", 32)
+    measurements = []
+    for batch_size, text_length, frames in itertools.product(
+        batch_sizes, text_lengths, num_frames
+    ):
+        # デコーダには各文からsegment_sizeフレームを切り出して入れるので、それより長くする
+        if frames <= segment_size:
+            continue
+        seconds = measure_step(
+            model,
+            batch_size,
+            text_length,
+            frames,
+            hop_length,
+            len(args.token_list),
+            device,
+            num_runs=num_runs,
+        )
+        if seconds is None:
+            print(f"B={batch_size}, T={text_length}, F={frames}: メモリ不足")
+            continue
+        print(f"B={batch_size}, T={text_length}, F={frames}: {seconds * 1000:.1f}ms")
+        measurements.append((batch_size, text_length, frames, seconds))
+    b, t, f, s = zip(*measurements)
+    cost_conf, scale, overhead = fit_cost_conf(t, f, b, s, hop_length)
+    return cost_conf, scale, overhead, measurements
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--config", type=str, required=True, help="学習のconfig.yaml")
+    parser.add_argument(
+        "--device", type=str, default="cuda" if torch.cuda.is_available() else "cpu"
+    )
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument(
+        "--text-lengths", type=int, nargs="+", default=[20, 60, 120, 200]
+    )
+    parser.add_argument(
+        "--num-frames",
+        type=int,
+        nargs="+",
+        default=[100, 300, 600, 900],
+        help="フレーム数（音声のサンプル数をhop_lengthで割ったもの）",
+    )
+    parser.add_argument("--num-runs", type=int, default=3)
+    parser.add_argument(
+        "--step-seconds",
+        type=float,
+        default=None,
+        help="1ステップの時間の目安（秒）。指定すると、それに合うbatch_binsを表示する",
+    )
+    args = parser.parse_args()
+
+    cost_conf, scale, overhead, measurements = calibrate(
+        args.config,
+        args.device,
+        args.batch_sizes,
+        args.text_lengths,
+        args.num_frames,
+        num_runs=args.num_runs,
+    )
+    # 当てはめた式で見積もった時間と、測った時間の差
+    errors = [
+        abs(scale * batch_cost(cost_conf, t, f, b) + overhead - s) / s
+        for b, t, f, s in measurements
+    ]
+    print("---")
+    print(
+        f"見積もりの誤差: 平均 {np.mean(errors):.1%}、最大 {np.max(errors):.1%}"
+        f"（1ステップの固定の時間 {overhead * 1000:.1f}ms）"
+    )
+    print("conf/finetune.yamlに次のように書いてください。")
+    # 有効数字3桁で十分
+    cost_conf = {k: float(f"{v:.3g}") for k, v in cost_conf.items()}
+    conf = dict(batch_type="vits_cost", batch_cost_conf=cost_conf)
+    if args.step_seconds is not None:
+        conf["batch_bins"] = int((args.step_seconds - overhead) / scale)
+    print(yaml.safe_dump(conf, sort_keys=False))
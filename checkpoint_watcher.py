@@ -0,0 +1,137 @@
+"""
+学習中に`outputs/{model_name}/checkpoints`に保存される`{N}epoch.pth`を監視し、
+新しいエポックが出たら裏のスレッドで読み込んで、`ModelRegistry`のモデルと差し替える。
+
+読み込みは別のインスタンスに対して行い、読み込み終わってから差し替える
+（`ModelRegistry.swap`）ので、その間も今のモデルで合成を続けられる。
+エポックを指定した場合は、最新を追わずにそのエポックを読み込む。
+"""
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from model import ModelRegistry
+
+# 書き込み中の一時ファイル（`*.pth.tmp`）や平均したモデルは対象にしない
+_CHECKPOINT_PATTERN = re.compile(r"^(\d+)epoch\.pth$")
+
+
+def list_checkpoints(checkpoint_dir: str) -> Dict[int, str]:
+    """`checkpoint_dir`の`{N}epoch.pth`を、エポックからパスへの辞書で返す"""
+    if not os.path.isdir(checkpoint_dir):
+        return {}
+    checkpoints = {}
+    for f in os.listdir(checkpoint_dir):
+        m = _CHECKPOINT_PATTERN.match(f)
+        if m is not None:
+            checkpoints[int(m.group(1))] = os.path.join(checkpoint_dir, f)
+    return checkpoints
+
+
+@dataclass
+class _Target:
+    device: str
+    dtype: str
+    epoch: Optional[int]
+    message: str = "待機中"
+
+
+class CheckpointWatcher:
+    """
+    `watch`したモデルのチェックポイントを`interval`秒ごとに確認する。
+    読み込みは1つのスレッドで順番に行うので、同時に読み込むモデルは1つだけ。
+    """
+
+    def __init__(
+        self,
+        registry: ModelRegistry,
+        output_root: str = "outputs",
+        interval: float = 10.0,
+    ):
+        self.registry = registry
+        self.output_root = output_root
+        self.interval = interval
+        self.targets: Dict[str, _Target] = {}
+        self.lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def checkpoint_dir(self, model_name: str) -> str:
+        return os.path.join(self.output_root, model_name, "checkpoints")
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def watch(
+        self,
+        model_name: str,
+        device: str = "cpu",
+        dtype: str = "float32",
+        epoch: Optional[int] = None,
+    ):
+        """
+        `model_name`の監視を始める。`epoch`がNoneなら最新のエポックを追い、
+        指定するとそのエポックを読み込む。すぐに1回目の確認をする。
+        """
+        with self.lock:
+            self.targets[model_name] = _Target(device, dtype, epoch)
+        self.start()
+        self._wakeup.set()
+
+    def unwatch(self, model_name: str):
+        with self.lock:
+            self.targets.pop(model_name, None)
+
+    def status(self, model_name: str) -> str:
+        with self.lock:
+            target = self.targets.get(model_name)
+            return "監視していません" if target is None else target.message
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            with self.lock:
+                targets = list(self.targets.items())
+            for model_name, target in targets:
+                self._check(model_name, target)
+
+    def _check(self, model_name: str, target: _Target):
+        checkpoint_dir = self.checkpoint_dir(model_name)
+        checkpoints = list_checkpoints(checkpoint_dir)
+        if len(checkpoints) == 0:
+            target.message = f"`{checkpoint_dir}`にチェックポイントがありません。"
+            return
+        epoch = max(checkpoints) if target.epoch is None else target.epoch
+        if epoch not in checkpoints:
+            target.message = f"{epoch}エポックのチェックポイントがありません。"
+            return
+        model_path = checkpoints[epoch]
+        # 読み込み済みかは`registry`に聞く（捨てられた後や、WebUIで`weights`のモデルを
+        # 読み込み直した後も、`get`で使われるファイルと比べられる）
+        swapped = self.registry.swapped_path(model_name, target.device, target.dtype)
+        if swapped == model_path:
+            target.message = f"{epoch}エポックを使っています。"
+            return
+
+        target.message = f"{epoch}エポックを読み込んでいます..."
+        config_path = os.path.join(checkpoint_dir, "config.yaml")
+        try:
+            self.registry.swap(
+                model_name,
+                target.device,
+                target.dtype,
+                model_path=model_path,
+                config_path=config_path if os.path.exists(config_path) else None,
+            )
+        except Exception as e:
+            # 読み込めなかったときは今のモデルのまま、次の確認でもう一度試す
+            target.message = f"{epoch}エポックの読み込みに失敗しました: {e}"
+            print(target.message)
+            return
+        target.message = f"{epoch}エポックを使っています。"
+        print(f"{model_name}: {target.message}")
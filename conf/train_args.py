@@ -15,6 +15,8 @@ train_args = [
     "none",
     "--resume",
     "true",
+    "--defer_stats",
+    "true",
     "--fold_length",
     "150",
     "--fold_length",
@@ -32,21 +34,23 @@ train_args = [
     "--feats_extract_conf",
     "win_length=null",
     "--train_data_path_and_name_and_type",
-    "{output_dir}/{model_name}/dump/train/text,text,text",
+    "{output_dir}/{model_name}/dump/train/text_int,text,text_int",
     "--train_data_path_and_name_and_type",
-    "{output_dir}/{model_name}/dump/train/wav.scp,speech,sound",
+    "{output_dir}/{model_name}/dump/train/wav_packed.scp,speech,packed_sound",
     "--train_shape_file",
     "{output_dir}/{model_name}/stats/train/text_shape.phn",
     "--train_shape_file",
     "{output_dir}/{model_name}/stats/train/speech_shape",
     "--valid_data_path_and_name_and_type",
-    "{output_dir}/{model_name}/dump/valid/text,text,text",
+    "{output_dir}/{model_name}/dump/valid/text_int,text,text_int",
     "--valid_data_path_and_name_and_type",
-    "{output_dir}/{model_name}/dump/valid/wav.scp,speech,sound",
+    "{output_dir}/{model_name}/dump/valid/wav_packed.scp,speech,packed_sound",
     "--valid_shape_file",
     "{output_dir}/{model_name}/stats/valid/text_shape.phn",
     "--valid_shape_file",
     "{output_dir}/{model_name}/stats/valid/speech_shape",
+    "--inference_snapshot_dir",
+    "weights/{model_name}",
     "--init_param",
     "pretrained/pretrained.pth:tts:tts",
     "--ngpu",
@@ -0,0 +1,148 @@
+import collections.abc
+from pathlib import Path
+from typing import Dict, Tuple, Union
+
+import numpy as np
+from typeguard import check_argument_types
+
+from espnet2.fileio.read_text import read_2columns_text
+
+
+class PackedNpyWriter:
+    """Writer class for arrays packed into a single npy file.
+
+    All arrays are concatenated along the first axis into one npy file and
+    the scp file records the range of each key.
+
+    Examples:
+        key1 /some/path/feats.npy:0:120
+        key2 /some/path/feats.npy:120:305
+        ...
+
+        >>> lengths = {'aa': 120, 'bb': 185}
+        >>> writer = PackedNpyWriter('feats.npy', 'feats.scp', lengths, (1025,))
+        >>> writer['aa'] = numpy_array
+        >>> writer['bb'] = numpy_array
+
+    """
+
+    def __init__(
+        self,
+        npyfile: Union[Path, str],
+        scpfile: Union[Path, str],
+        lengths: Dict[str, int],
+        shape: Tuple[int, ...] = (),
+        dtype: Union[str, np.dtype] = "float32",
+    ):
+        assert check_argument_types()
+        self.npyfile = Path(npyfile)
+        self.npyfile.parent.mkdir(parents=True, exist_ok=True)
+        scpfile = Path(scpfile)
+        scpfile.parent.mkdir(parents=True, exist_ok=True)
+        self.fscp = scpfile.open("w", encoding="utf-8")
+
+        self.ranges = {}
+        offset = 0
+        for key, length in lengths.items():
+            self.ranges[key] = (offset, offset + length)
+            offset += length
+        self.array = np.lib.format.open_memmap(
+            str(self.npyfile), mode="w+", dtype=dtype, shape=(offset, *shape)
+        )
+
+    def __setitem__(self, key, value):
+        assert isinstance(value, np.ndarray), type(value)
+        start, end = self.ranges[key]
+        if value.shape != (end - start, *self.array.shape[1:]):
+            raise RuntimeError(
+                f"Shape mismatch for {key}: expected "
+                f"{(end - start, *self.array.shape[1:])}, but got {value.shape}"
+            )
+        self.array[start:end] = value
+        self.fscp.write(f"{key} {self.npyfile}:{start}:{end}\n")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self.array.flush()
+        self.fscp.close()
+
+
+class PackedNpyReader(collections.abc.Mapping):
+    """Reader class for arrays packed into a single npy file.
+
+    The npy file is opened with ``mmap_mode="r"`` and each item is a view of
+    it, so no file is opened and nothing is copied per item.
+
+    Examples:
+        key1 /some/path/feats.npy:0:120
+        key2 /some/path/feats.npy:120:305
+        ...
+
+        >>> reader = PackedNpyReader('feats.scp')
+        >>> array = reader['key1']
+
+    """
+
+    def __init__(self, fname: Union[Path, str]):
+        assert check_argument_types()
+        self.fname = Path(fname)
+        self.data = read_2columns_text(fname)
+        self.arrays = {}
+
+    def get_path(self, key):
+        return self.data[key]
+
+    def __getitem__(self, key) -> np.ndarray:
+        p, start, end = self.data[key].rsplit(":", 2)
+        array = self.arrays.get(p)
+        if array is None:
+            # Opened lazily so that each DataLoader worker maps the file by itself
+            array = np.load(p, mmap_mode="r")
+            self.arrays[p] = array
+        return array[int(start) : int(end)]
+
+    def __contains__(self, item):
+        return item in self.data
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def keys(self):
+        return self.data.keys()
+
+
+class PackedSoundReader(PackedNpyReader):
+    """Reader class for waveforms packed into a single npy file.
+
+    Integer PCM (e.g. int16 written by PackedNpyWriter) is scaled to [-1, 1]
+    in the same way as soundfile, so the values match SoundScpReader.
+
+    Examples:
+        key1 /some/path/wav.npy:0:44100
+        key2 /some/path/wav.npy:44100:132300
+        ...
+
+        >>> reader = PackedSoundReader('wav_packed.scp', dtype='float32')
+        >>> array = reader['key1']
+
+    """
+
+    def __init__(self, fname: Union[Path, str], dtype=None):
+        assert check_argument_types()
+        super().__init__(fname)
+        self.dtype = dtype
+
+    def __getitem__(self, key) -> np.ndarray:
+        array = super().__getitem__(key)
+        if array.dtype.kind == "i":
+            scale = 1.0 / (np.iinfo(array.dtype).max + 1)
+            return np.multiply(array, scale, dtype=self.dtype or np.float64)
+        return array.astype(self.dtype or np.float64)
@@ -70,6 +70,8 @@ class ESPnetGANTTSModel(AbsGANESPnetModel):
         text_lengths: torch.Tensor,
         speech: torch.Tensor,
         speech_lengths: torch.Tensor,
+        feats: Optional[torch.Tensor] = None,
+        feats_lengths: Optional[torch.Tensor] = None,
         durations: Optional[torch.Tensor] = None,
         durations_lengths: Optional[torch.Tensor] = None,
         pitch: Optional[torch.Tensor] = None,
@@ -89,6 +91,9 @@ class ESPnetGANTTSModel(AbsGANESPnetModel):
             text_lengths (Tensor): Text length tensor (B,).
             speech (Tensor): Speech waveform tensor (B, T_wav).
             speech_lengths (Tensor): Speech length tensor (B,).
+            feats (Optional[Tensor]): Pre-extracted feature tensor (B, T_feats, D).
+                If given, feats_extract is skipped.
+            feats_lengths (Optional[Tensor]): Feature length tensor (B,).
             duration (Optional[Tensor]): Duration tensor.
             duration_lengths (Optional[Tensor]): Duration length tensor (B,).
             pitch (Optional[Tensor]): Pitch tensor.
@@ -110,9 +115,8 @@ class ESPnetGANTTSModel(AbsGANESPnetModel):
 
         """
         with autocast(False):
-            # Extract features
-            feats = None
-            if self.feats_extract is not None:
+            # Extract features unless they are already dumped
+            if self.feats_extract is not None and feats is None:
                 feats, feats_lengths = self.feats_extract(
                     speech,
                     speech_lengths,
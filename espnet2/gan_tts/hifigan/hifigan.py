@@ -159,6 +159,83 @@ class HiFiGANGenerator(torch.nn.Module):
 
         return c
 
+    @property
+    def receptive_field(self) -> int:
+        """Return one-sided receptive field of the generator in input frames.
+
+        Each output sample only depends on the input frames within this number of
+        frames on each side, so the output of a window whose margins are wider
+        than this value is identical to that of the full sequence.
+
+        """
+
+        def _context(m: torch.nn.Module) -> int:
+            conv = m[-1]
+            return (conv.kernel_size[0] - 1) // 2 * conv.dilation[0]
+
+        # trace backward from the output to the input
+        rf = _context(self.output_conv[:-1])
+        for i in reversed(range(self.num_upsamples)):
+            blocks = self.blocks[i * self.num_blocks : (i + 1) * self.num_blocks]
+            rf += max(
+                sum(
+                    _context(m)
+                    for m in block.modules()
+                    if isinstance(m, torch.nn.Sequential)
+                )
+                for block in blocks
+            )
+            upsample = self.upsamples[i][-1]
+            stride, kernel_size = upsample.stride[0], upsample.kernel_size[0]
+            rf = -(-rf // stride) + -(-kernel_size // stride)
+        rf += (self.input_conv.kernel_size[0] - 1) // 2
+
+        return rf
+
+    def chunked_forward(
+        self,
+        c: torch.Tensor,
+        g: Optional[torch.Tensor] = None,
+        chunk_size: int = 64,
+        context: Optional[int] = None,
+    ) -> torch.Tensor:
+        """Calculate forward propagation over overlapping windows of the input.
+
+        The input is split into windows of ``chunk_size`` frames, each of which is
+        extended by ``context`` frames on both sides. The extended margins are
+        discarded after decoding, so the peak memory is bounded by the window size
+        instead of the total length.
+
+        Args:
+            c (Tensor): Input tensor (B, in_channels, T).
+            g (Optional[Tensor]): Global conditioning tensor (B, global_channels, 1).
+            chunk_size (int): Number of input frames to be generated per window.
+            context (Optional[int]): Number of context frames on each side. If not
+                provided, the receptive field of the generator is used.
+
+        Returns:
+            Tensor: Output tensor (B, out_channels, T).
+
+        """
+        if context is None:
+            context = self.receptive_field
+        total_len = c.size(2)
+        if total_len <= chunk_size + 2 * context:
+            return self.forward(c, g=g)
+
+        outs = []
+        for start in range(0, total_len, chunk_size):
+            end = min(start + chunk_size, total_len)
+            left = min(context, start)
+            right = min(context, total_len - end)
+            out = self.forward(c[:, :, start - left : end + right], g=g)
+            upsample_factor = out.size(2) // (end + right - start + left)
+            out_start = left * upsample_factor
+            out_end = out_start + (end - start) * upsample_factor
+            outs += [out[:, :, out_start:out_end]]
+
+        return torch.cat(outs, dim=2)
+
     def reset_parameters(self):
         """Reset parameters.
 
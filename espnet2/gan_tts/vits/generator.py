@@ -86,6 +86,7 @@ class VITSGenerator(torch.nn.Module):
         stochastic_duration_predictor_dropout_rate: float = 0.5,
         stochastic_duration_predictor_flows: int = 4,
         stochastic_duration_predictor_dds_conv_layers: int = 3,
+        maximum_path_impl: str = "cython",
     ):
         """Initialize VITS generator module.
 
@@ -165,6 +166,9 @@ class VITSGenerator(torch.nn.Module):
                 duration predictor.
             stochastic_duration_predictor_dds_conv_layers (int): Number of DDS conv
                 layers in stochastic duration predictor.
+            maximum_path_impl (str): Implementation of monotonic alignment search.
+                "cython" runs the cython (or numba) version on CPU and "torch" runs
+                the vectorized version on the device of the inputs.
 
         """
         super().__init__()
@@ -252,9 +256,17 @@ class VITSGenerator(torch.nn.Module):
             self.lang_emb = torch.nn.Embedding(langs, global_channels)
 
         # delayed import
-        from espnet2.gan_tts.vits.monotonic_align import maximum_path
+        from espnet2.gan_tts.vits.monotonic_align import (
+            maximum_path,
+            maximum_path_torch,
+        )
 
-        self.maximum_path = maximum_path
+        if maximum_path_impl == "cython":
+            self.maximum_path = maximum_path
+        elif maximum_path_impl == "torch":
+            self.maximum_path = maximum_path_torch
+        else:
+            raise ValueError(f"Not supported: maximum_path_impl={maximum_path_impl}")
 
     def forward(
         self,
@@ -423,6 +435,8 @@ class VITSGenerator(torch.nn.Module):
         alpha: float = 1.0,
         max_len: Optional[int] = None,
         use_teacher_forcing: bool = False,
+        decoder_chunk_size: Optional[int] = None,
+        latent_stretch: float = 1.0,
     ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
         """Run inference.
 
@@ -441,6 +455,11 @@ class VITSGenerator(torch.nn.Module):
             alpha (float): Alpha parameter to control the speed of generated speech.
             max_len (Optional[int]): Maximum length of acoustic feature sequence.
             use_teacher_forcing (bool): Whether to use teacher forcing.
+            decoder_chunk_size (Optional[int]): If provided, run the decoder over
+                overlapping windows of this number of frames to bound the memory.
+            latent_stretch (float): Factor to stretch the latent sequence in time
+                before the decoder. Resampling the output waveform back to the
+                original length shifts the pitch by this factor.
 
         Returns:
             Tensor: Generated waveform tensor (B, T_wav).
@@ -512,7 +531,7 @@ class VITSGenerator(torch.nn.Module):
             dur = attn.sum(2)  # (B, 1, T_text)
 
             # forward decoder with random segments
-            wav = self.decoder(z * y_mask, g=g)
+            wav = self._decode(z * y_mask, g=g, chunk_size=decoder_chunk_size)
         else:
             # duration
             if dur is None:
@@ -545,11 +564,42 @@ class VITSGenerator(torch.nn.Module):
             # decoder
             z_p = m_p + torch.randn_like(m_p) * torch.exp(logs_p) * noise_scale
             z = self.flow(z_p, y_mask, g=g, inverse=True)
-            wav = self.decoder((z * y_mask)[:, :, :max_len], g=g)
+            z = (z * y_mask)[:, :, :max_len]
+            if latent_stretch != 1.0:
+                z = F.interpolate(
+                    z,
+                    size=max(int(z.size(2) * latent_stretch), 1),
+                    mode="linear",
+                    align_corners=False,
+                )
+            wav = self._decode(z, g=g, chunk_size=decoder_chunk_size)
 
         return wav.squeeze(1), attn.squeeze(1), dur.squeeze(1)
 
-    def _generate_path(self, dur: torch.Tensor, mask: torch.Tensor) -> torch.Tensor:
+    def _decode(
+        self,
+        z: torch.Tensor,
+        g: Optional[torch.Tensor] = None,
+        chunk_size: Optional[int] = None,
+    ) -> torch.Tensor:
+        """Run decoder on the whole sequence or over overlapping windows.
+
+        Args:
+            z (Tensor): Latent tensor (B, H, T_feats).
+            g (Optional[Tensor]): Global conditioning tensor (B, global_channels, 1).
+            chunk_size (Optional[int]): Window size in frames. If not provided,
+                decode the whole sequence at once.
+
+        Returns:
+            Tensor: Generated waveform tensor (B, 1, T_wav).
+
+        """
+        if chunk_size is None:
+            return self.decoder(z, g=g)
+        return self.decoder.chunked_forward(z, g=g, chunk_size=chunk_size)
+
+    @staticmethod
+    def _generate_path(dur: torch.Tensor, mask: torch.Tensor) -> torch.Tensor:
         """Generate path a.k.a. monotonic attention.
 
         Args:
@@ -0,0 +1,74 @@
+"""Generator-only snapshot of VITS for inference."""
+
+from typing import Any, Dict
+
+import torch
+
+SNAPSHOT_SUFFIX = ".slim.pth"
+# The modules of the generator which are not used in the inference
+TRAINING_ONLY_MODULES = ("posterior_encoder",)
+
+
+def fold_weight_norm(state_dict: Dict[str, torch.Tensor]) -> Dict[str, torch.Tensor]:
+    """Replace the weight_g and weight_v pairs with the normalized weights.
+
+    This gives the same state dict as calling torch.nn.utils.remove_weight_norm()
+    on the modules, without touching the modules themselves.
+
+    """
+    retval = {}
+    for k, v in state_dict.items():
+        if k.endswith(".weight_g") and k[: -len("g")] + "v" in state_dict:
+            continue
+        if k.endswith(".weight_v") and k[: -len("v")] + "g" in state_dict:
+            g = state_dict[k[: -len("v")] + "g"]
+            # g has the size of 1 except in the normalized dimension, i.e. the norm
+            # of v is taken over the dimensions where g is broadcast
+            dims = [d for d in range(v.dim()) if g.size(d) == 1]
+            norm = torch.linalg.vector_norm(v, dim=dims, keepdim=True)
+            retval[k[: -len("_v")]] = g * v / norm
+            continue
+        retval[k] = v
+    return retval
+
+
+def inference_snapshot(
+    model_state: Dict[str, torch.Tensor],
+    config: Dict[str, Any],
+    aux_channels: int,
+    fs: int,
+    source: str,
+    prefix: str = "tts.generator.",
+) -> Dict[str, Any]:
+    """Make the generator-only snapshot from the state dict of the whole model.
+
+    Args:
+        model_state: State dict of ESPnetGANTTSModel.
+        config: Training configuration, i.e. the content of config.yaml.
+        aux_channels: The dimension of the linear spectrogram.
+        fs: Sampling rate.
+        source: Name of the original model file.
+        prefix: Prefix of the generator parameters in model_state.
+
+    Returns:
+        Dict[str, Any]: The generator type and parameters, the sampling rate,
+            the source file name, and the state dict of the generator without
+            weight normalization.
+
+    """
+    tts_conf = config["tts_conf"]
+    generator_params = dict(tts_conf.get("generator_params", {}))
+    generator_params.update(vocabs=len(config["token_list"]), aux_channels=aux_channels)
+    state_dict = {
+        k[len(prefix) :]: v
+        for k, v in model_state.items()
+        if k.startswith(prefix)
+        and k[len(prefix) :].split(".")[0] not in TRAINING_ONLY_MODULES
+    }
+    return dict(
+        generator_type=tts_conf.get("generator_type", "vits_generator"),
+        generator_params=generator_params,
+        fs=fs,
+        source=source,
+        state_dict=fold_weight_norm(state_dict),
+    )
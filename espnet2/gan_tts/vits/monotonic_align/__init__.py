@@ -77,3 +77,62 @@ def maximum_path_numba(paths, values, t_ys, t_xs):
     """Calculate batch maximum path with numba."""
     for i in prange(paths.shape[0]):
         maximum_path_each_numba(paths[i], values[i], t_ys[i], t_xs[i])
+
+
+def maximum_path_torch(
+    neg_x_ent: torch.Tensor, attn_mask: torch.Tensor, max_neg_val: float = -1e9
+) -> torch.Tensor:
+    """Calculate maximum path with torch on the device of the inputs.
+
+    This gives the same result as the cython version (``maximum_path_c``)
+    without copying the tensors to CPU. Since each row of the dynamic
+    programming depends only on the previous row, the loop runs over T_feats
+    and each step is vectorized over the batch and T_text.
+
+    Args:
+        neg_x_ent (Tensor): Negative X entropy tensor (B, T_feats, T_text).
+        attn_mask (Tensor): Attention mask (B, T_feats, T_text).
+        max_neg_val (float): Value used for the unreachable cells.
+
+    Returns:
+        Tensor: Maximum path tensor (B, T_feats, T_text).
+
+    """
+    device, dtype = neg_x_ent.device, neg_x_ent.dtype
+    B, T_feats, T_text = neg_x_ent.shape
+    value = neg_x_ent.detach().float().clone()
+    t_ys = attn_mask.sum(1)[:, 0].long().unsqueeze(1)  # (B, 1)
+    t_xs = attn_mask.sum(2)[:, 0].long().unsqueeze(1)  # (B, 1)
+    x = torch.arange(T_text, device=device).unsqueeze(0)  # (1, T_text)
+    neg = torch.full((B, 1), max_neg_val, dtype=value.dtype, device=device)
+
+    # forward: accumulate the best score only inside the reachable band
+    for y in range(T_feats):
+        if y == 0:
+            v_best = neg.expand(B, T_text).clone()
+            v_best[:, 0] = 0.0
+        else:
+            row = value[:, y - 1]
+            v_cur = row.masked_fill(x == y, max_neg_val)
+            v_prev = torch.cat([neg, row[:, :-1]], dim=1)
+            v_best = torch.maximum(v_prev, v_cur)
+        band = (x >= t_xs + y - t_ys) & (x < t_xs.clamp(max=y + 1)) & (y < t_ys)
+        value[:, y] = torch.where(band, value[:, y] + v_best, value[:, y])
+
+    # backward: whether to move to the previous token when leaving each cell
+    step = torch.zeros_like(value, dtype=torch.bool)
+    step[:, 1:, 1:] = value[:, :-1, 1:] < value[:, :-1, :-1]
+    y = torch.arange(T_feats, device=device).unsqueeze(1)  # (T_feats, 1)
+    step = (step | (x == y)) & (x != 0) & (y < t_ys.unsqueeze(2))
+    step = step.long()
+
+    index = (t_xs.squeeze(1) - 1).clamp(min=0)  # (B,)
+    indices = torch.zeros(B, T_feats, dtype=torch.long, device=device)
+    for y in range(T_feats - 1, -1, -1):
+        indices[:, y] = index
+        index = index - step[:, y].gather(1, index.unsqueeze(1)).squeeze(1)
+
+    path = torch.zeros(B, T_feats, T_text, dtype=dtype, device=device)
+    path.scatter_(2, indices.unsqueeze(2), 1)
+    valid = torch.arange(T_feats, device=device).unsqueeze(0) < t_ys  # (B, T_feats)
+    return path * valid.unsqueeze(2).to(dtype)
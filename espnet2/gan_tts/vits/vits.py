@@ -113,6 +113,7 @@ class VITS(AbsGANTTS):
             "stochastic_duration_predictor_dropout_rate": 0.5,
             "stochastic_duration_predictor_flows": 4,
             "stochastic_duration_predictor_dds_conv_layers": 3,
+            "maximum_path_impl": "cython",
         },
         # discriminator related
         discriminator_type: str = "hifigan_multi_scale_multi_period_discriminator",
@@ -424,12 +425,12 @@ class VITS(AbsGANTTS):
             loss = mel_loss + kl_loss + dur_loss + adv_loss + feat_match_loss
 
         stats = dict(
-            generator_loss=loss.item(),
-            generator_mel_loss=mel_loss.item(),
-            generator_kl_loss=kl_loss.item(),
-            generator_dur_loss=dur_loss.item(),
-            generator_adv_loss=adv_loss.item(),
-            generator_feat_match_loss=feat_match_loss.item(),
+            generator_loss=loss.detach(),
+            generator_mel_loss=mel_loss.detach(),
+            generator_kl_loss=kl_loss.detach(),
+            generator_dur_loss=dur_loss.detach(),
+            generator_adv_loss=adv_loss.detach(),
+            generator_feat_match_loss=feat_match_loss.detach(),
         )
 
         loss, stats, weight = force_gatherable((loss, stats, batch_size), loss.device)
@@ -521,9 +522,9 @@ class VITS(AbsGANTTS):
             loss = real_loss + fake_loss
 
         stats = dict(
-            discriminator_loss=loss.item(),
-            discriminator_real_loss=real_loss.item(),
-            discriminator_fake_loss=fake_loss.item(),
+            discriminator_loss=loss.detach(),
+            discriminator_real_loss=real_loss.detach(),
+            discriminator_fake_loss=fake_loss.detach(),
         )
         loss, stats, weight = force_gatherable((loss, stats, batch_size), loss.device)
 
@@ -551,6 +552,8 @@ class VITS(AbsGANTTS):
         alpha: float = 1.0,
         max_len: Optional[int] = None,
         use_teacher_forcing: bool = False,
+        decoder_chunk_size: Optional[int] = None,
+        latent_stretch: float = 1.0,
     ) -> Dict[str, torch.Tensor]:
         """Run inference.
 
@@ -566,6 +569,10 @@ class VITS(AbsGANTTS):
             alpha (float): Alpha parameter to control the speed of generated speech.
             max_len (Optional[int]): Maximum length.
             use_teacher_forcing (bool): Whether to use teacher forcing.
+            decoder_chunk_size (Optional[int]): If provided, run the decoder over
+                overlapping windows of this number of frames to bound the memory.
+            latent_stretch (float): Factor to stretch the latent sequence in time
+                before the decoder.
 
         Returns:
             Dict[str, Tensor]:
@@ -607,6 +614,7 @@ class VITS(AbsGANTTS):
                 lids=lids,
                 max_len=max_len,
                 use_teacher_forcing=use_teacher_forcing,
+                decoder_chunk_size=decoder_chunk_size,
             )
         else:
             wav, att_w, dur = self.generator.inference(
@@ -620,5 +628,7 @@ class VITS(AbsGANTTS):
                 noise_scale_dur=noise_scale_dur,
                 alpha=alpha,
                 max_len=max_len,
+                decoder_chunk_size=decoder_chunk_size,
+                latent_stretch=latent_stretch,
             )
         return dict(wav=wav.view(-1), att_w=att_w[0], duration=dur[0])
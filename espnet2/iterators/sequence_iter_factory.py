@@ -1,7 +1,7 @@
 import itertools
 import random
 from functools import partial
-from typing import Any, Sequence, Union
+from typing import Any, Optional, Sequence, Union
 
 import numpy as np
 from torch.utils.data import DataLoader
@@ -40,6 +40,11 @@ class SequenceIterFactory(AbsIterFactory):
       guarantees reproducibility when resuming from middle of training process.
     - Enable to restrict the number of samples for one epoch. This features
       controls the interval number between training and evaluation.
+    - If persistent_workers is true, a single DataLoader is kept across epochs
+      and only its batch list is replaced for each epoch, so the workers and
+      everything they have loaded (e.g. the dictionary of the g2p, the opened
+      data files) are reused. Note that worker_init_fn is then called only
+      once, i.e. the random seed of the workers is not reset for each epoch.
 
     """
 
@@ -54,6 +59,8 @@ class SequenceIterFactory(AbsIterFactory):
         num_workers: int = 0,
         collate_fn=None,
         pin_memory: bool = False,
+        persistent_workers: bool = False,
+        prefetch_factor: Optional[int] = None,
     ):
         assert check_argument_types()
 
@@ -71,6 +78,9 @@ class SequenceIterFactory(AbsIterFactory):
         self.collate_fn = collate_fn
         # https://discuss.pytorch.org/t/what-is-the-disadvantage-of-using-pin-memory/1702
         self.pin_memory = pin_memory
+        self.persistent_workers = persistent_workers and num_workers > 0
+        self.prefetch_factor = prefetch_factor
+        self.loader = None
 
     def build_iter(self, epoch: int, shuffle: bool = None) -> DataLoader:
         if shuffle is None:
@@ -155,6 +165,26 @@ class SequenceIterFactory(AbsIterFactory):
             batches = _batches
             del _batches
 
+        if self.num_workers > 0 and self.prefetch_factor is not None:
+            kwargs.update(prefetch_factor=self.prefetch_factor)
+
+        if self.persistent_workers:
+            if self.loader is None:
+                self.loader = DataLoader(
+                    dataset=self.dataset,
+                    batch_sampler=RawSampler(batches),
+                    num_workers=self.num_workers,
+                    pin_memory=self.pin_memory,
+                    worker_init_fn=partial(worker_init_fn, base_seed=epoch + self.seed),
+                    persistent_workers=True,
+                    **kwargs,
+                )
+            else:
+                # The batch sampler is iterated again in the main process when
+                # the next epoch starts, so the alive workers get the new batches
+                self.loader.batch_sampler.batches = batches
+            return self.loader
+
         return DataLoader(
             dataset=self.dataset,
             batch_sampler=batches,
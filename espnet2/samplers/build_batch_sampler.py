@@ -1,4 +1,4 @@
-from typing import List, Sequence, Tuple, Union
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 
 from typeguard import check_argument_types, check_return_type
 
@@ -8,6 +8,7 @@ from espnet2.samplers.length_batch_sampler import LengthBatchSampler
 from espnet2.samplers.num_elements_batch_sampler import NumElementsBatchSampler
 from espnet2.samplers.sorted_batch_sampler import SortedBatchSampler
 from espnet2.samplers.unsorted_batch_sampler import UnsortedBatchSampler
+from espnet2.samplers.vits_cost_batch_sampler import VITSCostBatchSampler
 
 BATCH_TYPES = dict(
     unsorted="UnsortedBatchSampler has nothing in particular feature and "
@@ -66,6 +67,16 @@ BATCH_TYPES = dict(
     "    utterance_id_a 1000,80\n"
     "    utterance_id_b 1453,80\n"
     "    utterance_id_c 1241,80\n",
+    vits_cost="VITSCostBatchSampler supports variable batch_size. "
+    "This sampler makes mini-batches which have the same estimated training cost "
+    "of VITS as possible, where the cost is calculated from the longest text "
+    "length and the largest number of frames in the mini-batch and "
+    "'batch_bins' is the budget in units of one frame of the posterior encoder. "
+    "The coefficients can be changed by '--batch_cost_conf'. "
+    "This sampler requires the text shape file and the speech shape file "
+    "in this order.\n\n"
+    "    utterance_id_a 52,47\n"
+    "    utterance_id_a 220500\n",
 )
 
 
@@ -81,6 +92,7 @@ def build_batch_sampler(
     fold_lengths: Sequence[int] = (),
     padding: bool = True,
     utt2category_file: str = None,
+    cost_conf: Optional[Dict[str, float]] = None,
 ) -> AbsSampler:
     """Helper function to instantiate BatchSampler.
 
@@ -99,6 +111,7 @@ def build_batch_sampler(
         fold_lengths: Used for "folded" mode
         padding: Whether sequences are input as a padded tensor or not.
             used for "numel" mode
+        cost_conf: The coefficients of the cost model. Used for "vits_cost" mode
     """
     assert check_argument_types()
     if len(shape_files) == 0:
@@ -158,6 +171,17 @@ def build_batch_sampler(
             min_batch_size=min_batch_size,
         )
 
+    elif type == "vits_cost":
+        retval = VITSCostBatchSampler(
+            batch_bins=batch_bins,
+            shape_files=shape_files,
+            sort_in_batch=sort_in_batch,
+            sort_batch=sort_batch,
+            drop_last=drop_last,
+            min_batch_size=min_batch_size,
+            cost_conf=cost_conf,
+        )
+
     else:
         raise ValueError(f"Not supported: {type}")
     assert check_return_type(retval)
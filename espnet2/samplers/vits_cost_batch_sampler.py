@@ -0,0 +1,291 @@
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from scipy.optimize import nnls
+from typeguard import check_argument_types
+
+from espnet2.fileio.read_text import load_num_sequence_text
+from espnet2.samplers.abs_sampler import AbsSampler
+
+# The costs are relative to one acoustic frame going through the posterior encoder
+# and the flow. The default values are rough FLOP ratios of the VITS generator in
+# conf/finetune.yaml (hidden_channels=192, 16 posterior encoder layers, 6 text
+# encoder blocks, segment_size=32 with HiFiGAN and the discriminators).
+# Use calibrate_batch_cost.py to fit them to the measured step time instead.
+DEFAULT_COST_CONF = dict(
+    hop_length=512,
+    feats=1.0,
+    text=0.4,
+    text_square=1.5e-4,
+    text_feats=1.0e-4,
+    utterance=800.0,
+)
+
+
+COST_TERMS = ("feats", "text", "text_square", "text_feats", "utterance")
+
+
+def batch_cost(
+    cost_conf: Dict[str, float],
+    text: Union[float, np.ndarray],
+    feats: Union[float, np.ndarray],
+    batch_size: Union[int, np.ndarray],
+) -> Union[float, np.ndarray]:
+    """Estimate the cost of a padded mini-batch (see VITSCostBatchSampler)."""
+    c = cost_conf
+    return batch_size * (
+        c["feats"] * feats
+        + c["text"] * text
+        + c["text_square"] * text**2
+        + c["text_feats"] * text * feats
+        + c["utterance"]
+    )
+
+
+def _cost_terms(
+    text: np.ndarray, feats: np.ndarray, batch_size: np.ndarray
+) -> np.ndarray:
+    """Return the terms of batch_cost() without the coefficients: (N, 5)."""
+    return batch_size[:, None] * np.stack(
+        [feats, text, text**2, text * feats, np.ones_like(text)], axis=1
+    )
+
+
+def fit_cost_conf(
+    text: Sequence[float],
+    feats: Sequence[float],
+    batch_size: Sequence[int],
+    seconds: Sequence[float],
+    hop_length: int,
+) -> Tuple[Dict[str, float], float, float]:
+    """Fit the coefficients of the cost model to the measured step times.
+
+    The time of a training step on a padded mini-batch is modeled as::
+
+        scale * batch_cost(text, feats, batch_size) + overhead
+
+    where overhead is the constant time of a step (e.g. the optimizer updates),
+    which does not change the packing. The coefficients are fitted by
+    non-negative least squares on the relative error, and normalized so that
+    the cost of a frame (feats) is 1.0 as in DEFAULT_COST_CONF.
+
+    Args:
+        text: The longest text length of each measured mini-batch.
+        feats: The largest number of frames of each measured mini-batch.
+        batch_size: The number of utterances of each measured mini-batch.
+        seconds: The measured time of each training step.
+        hop_length: The hop length to convert the speech samples to frames.
+
+    Returns:
+        Dict[str, float]: cost_conf for VITSCostBatchSampler.
+        float: Seconds per unit cost (scale).
+        float: Seconds of the constant overhead per step.
+
+    """
+    text, feats, batch_size, seconds = (
+        np.asarray(x, dtype=np.float64) for x in (text, feats, batch_size, seconds)
+    )
+    a = np.concatenate(
+        [_cost_terms(text, feats, batch_size), np.ones((len(text), 1))], axis=1
+    )
+    coef, _ = nnls(a / seconds[:, None], np.ones_like(seconds))
+    scale, overhead = coef[0], coef[-1]
+    if scale <= 0:
+        raise ValueError(
+            "The step time does not grow with the number of frames. "
+            "Measure the mini-batches with more various lengths."
+        )
+    cost_conf = dict(hop_length=hop_length)
+    cost_conf.update(
+        {k: float(c / scale) for k, c in zip(COST_TERMS, coef[: len(COST_TERMS)])}
+    )
+    return cost_conf, float(scale), float(overhead)
+
+
+class VITSCostBatchSampler(AbsSampler):
+    """Make mini-batches whose estimated VITS training cost is close to batch_bins.
+
+    The cost of a padded mini-batch of B utterances is estimated as::
+
+        B * (feats * F + text * T + text_square * T^2 + text_feats * T * F
+             + utterance)
+
+    where T is the longest text length and F is the largest number of frames
+    (speech samples // hop_length + 1) in the mini-batch.
+
+    - feats: Linear spectrogram, posterior encoder and flow over all the frames.
+    - text, text_square: Text encoder (feed-forward and self-attention).
+    - text_feats: Prior likelihood matrix and monotonic alignment search.
+    - utterance: Decoder and discriminators, which only see segment_size frames
+      of each utterance regardless of its length.
+
+    Unlike "numel", the dimensions in the shape files are ignored, so the dummy
+    vocabulary dimension in the text shape file does not inflate the text cost.
+    The first shape file must give the text lengths and the second one the
+    numbers of speech samples.
+
+    """
+
+    def __init__(
+        self,
+        batch_bins: int,
+        shape_files: Union[Tuple[str, ...], List[str]],
+        min_batch_size: int = 1,
+        sort_in_batch: str = "descending",
+        sort_batch: str = "ascending",
+        drop_last: bool = False,
+        cost_conf: Optional[Dict[str, float]] = None,
+    ):
+        assert check_argument_types()
+        assert batch_bins > 0
+        if sort_batch != "ascending" and sort_batch != "descending":
+            raise ValueError(
+                f"sort_batch must be ascending or descending: {sort_batch}"
+            )
+        if sort_in_batch != "descending" and sort_in_batch != "ascending":
+            raise ValueError(
+                f"sort_in_batch must be ascending or descending: {sort_in_batch}"
+            )
+        if len(shape_files) != 2:
+            raise ValueError(
+                "shape_files must be the text shape file and the speech shape file: "
+                f"{shape_files}"
+            )
+        self.cost_conf = dict(DEFAULT_COST_CONF)
+        if cost_conf is not None:
+            unknown = set(cost_conf) - set(self.cost_conf)
+            if len(unknown) != 0:
+                raise ValueError(f"Unknown keys in cost_conf: {sorted(unknown)}")
+            self.cost_conf.update(cost_conf)
+
+        self.batch_bins = batch_bins
+        self.shape_files = shape_files
+        self.sort_in_batch = sort_in_batch
+        self.sort_batch = sort_batch
+        self.drop_last = drop_last
+
+        utt2shapes = [
+            load_num_sequence_text(s, loader_type="csv_int") for s in shape_files
+        ]
+        first_utt2shape = utt2shapes[0]
+        for s, d in zip(shape_files, utt2shapes):
+            if set(d) != set(first_utt2shape):
+                raise RuntimeError(
+                    f"keys are mismatched between {s} != {shape_files[0]}"
+                )
+        keys = list(first_utt2shape)
+        if len(keys) == 0:
+            raise RuntimeError(f"0 lines found: {shape_files[0]}")
+
+        text = np.array([utt2shapes[0][k][0] for k in keys], dtype=np.float64)
+        feats = np.array([utt2shapes[1][k][0] for k in keys], dtype=np.float64)
+        feats = feats // self.cost_conf["hop_length"] + 1
+        # Sort samples in ascending order of the frames, and then of the text
+        order = np.lexsort((text, feats))
+        keys = [keys[i] for i in order]
+        text, feats = text[order], feats[order]
+
+        batch_sizes = self._pack(text, feats, min_batch_size)
+
+        # Statistics of the mini-batches
+        num_samples = sum(batch_sizes)
+        text, feats = text[:num_samples], feats[:num_samples]
+        starts = np.cumsum([0] + batch_sizes[:-1])
+        padded_costs = self.batch_cost(
+            np.maximum.reduceat(text, starts),
+            np.maximum.reduceat(feats, starts),
+            np.array(batch_sizes),
+        )
+        utt_costs = np.add.reduceat(self.batch_cost(text, feats, 1), starts)
+        # Ratio of the cost spent for padding
+        self.padding_waste = 1.0 - utt_costs.sum() / padded_costs.sum()
+        # Ratio of the estimated cost of a mini-batch to batch_bins
+        self.utilization = padded_costs.mean() / batch_bins
+
+        # Set mini-batch
+        self.batch_list = []
+        for start, bs in zip(starts, batch_sizes):
+            minibatch_keys = keys[start : start + bs]
+            if sort_in_batch == "descending":
+                minibatch_keys.reverse()
+            self.batch_list.append(tuple(minibatch_keys))
+
+        if sort_batch == "descending":
+            self.batch_list.reverse()
+
+    def batch_cost(
+        self,
+        text: Union[float, np.ndarray],
+        feats: Union[float, np.ndarray],
+        batch_size: Union[int, np.ndarray],
+    ) -> Union[float, np.ndarray]:
+        """Estimate the cost of a padded mini-batch.
+
+        Args:
+            text: The longest text length in the mini-batch.
+            feats: The largest number of frames in the mini-batch.
+            batch_size: The number of utterances in the mini-batch.
+
+        """
+        return batch_cost(self.cost_conf, text, feats, batch_size)
+
+    def _pack(
+        self, text: np.ndarray, feats: np.ndarray, min_batch_size: int
+    ) -> List[int]:
+        """Decide the batch sizes greedily from the beginning of the sorted samples.
+
+        The padded cost of a mini-batch is not less than the sum of the costs of its
+        utterances, so the candidates of each mini-batch are bounded by the
+        cumulative sum and the costs of all the candidates are computed at once.
+
+        """
+        n = len(text)
+        cumsum = np.cumsum(self.batch_cost(text, feats, 1))
+        batch_sizes = []
+        last_is_full = True
+        start = 0
+        while start < n:
+            offset = cumsum[start - 1] if start > 0 else 0.0
+            end = int(np.searchsorted(cumsum, offset + self.batch_bins, "right")) + 1
+            end = min(end, n)
+            sizes = np.arange(1, end - start + 1)
+            costs = self.batch_cost(
+                np.maximum.accumulate(text[start:end]),
+                np.maximum.accumulate(feats[start:end]),
+                sizes,
+            )
+            # The costs are non-decreasing as the batch grows
+            bs = int(np.searchsorted(costs, self.batch_bins, "right"))
+            # The last mini-batch is not full if all the remaining samples fit
+            last_is_full = bs < len(costs)
+            bs = min(max(bs, min_batch_size, 1), n - start)
+            batch_sizes.append(bs)
+            start += bs
+
+        if self.drop_last and not last_is_full and len(batch_sizes) > 1:
+            batch_sizes.pop(-1)
+
+        # If the last batch-size is smaller than minimum batch_size,
+        # the samples are redistributed to the other mini-batches
+        if len(batch_sizes) > 1 and batch_sizes[-1] < min_batch_size:
+            for i in range(batch_sizes.pop(-1)):
+                batch_sizes[-(i % len(batch_sizes)) - 1] += 1
+
+        return batch_sizes
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__name__}("
+            f"N-batch={len(self)}, "
+            f"batch_bins={self.batch_bins}, "
+            f"padding_waste={self.padding_waste:.1%}, "
+            f"utilization={self.utilization:.1%}, "
+            f"sort_in_batch={self.sort_in_batch}, "
+            f"sort_batch={self.sort_batch})"
+        )
+
+    def __len__(self):
+        return len(self.batch_list)
+
+    def __iter__(self) -> Iterator[Tuple[str, ...]]:
+        return iter(self.batch_list)
@@ -342,6 +342,20 @@ class AbsTask(ABC):
             default=1,
             help="The number of workers used for DataLoader",
         )
+        group.add_argument(
+            "--persistent_workers",
+            type=str2bool,
+            default=False,
+            help="Keep the workers of DataLoader alive across epochs. "
+            "Only the sequence iterator supports it",
+        )
+        group.add_argument(
+            "--prefetch_factor",
+            type=int_or_none,
+            default=None,
+            help="The number of batches loaded in advance by each worker. "
+            "If None, the default of DataLoader is used",
+        )
         group.add_argument(
             "--num_att_plot",
             type=int,
@@ -523,6 +537,23 @@ class AbsTask(ABC):
             default=0,
             help="The epoch interval to apply model averaging and save nbest models",
         )
+        group.add_argument(
+            "--async_checkpoint",
+            type=str2bool,
+            default=True,
+            help="Save the checkpoints in a background thread. "
+            "The training is blocked only while the states are copied to CPU",
+        )
+        group.add_argument(
+            "--inference_snapshot_dir",
+            type=str_or_none,
+            default=None,
+            help="If given, the generator-only snapshot of VITS for inference and "
+            "config.yaml are also saved in this directory (e.g. the model directory "
+            "of the inference) every epoch. Only the snapshot saved by the same "
+            "training in the previous epoch (or the epoch resumed from) is removed, "
+            "and an existing config.yaml must be the same as the one of the training",
+        )
         group.add_argument(
             "--grad_clip",
             type=float,
@@ -581,6 +612,14 @@ class AbsTask(ABC):
             "training phase. If None is given, it is decided according the number "
             "of training samples automatically .",
         )
+        group.add_argument(
+            "--defer_stats",
+            type=str2bool,
+            default=False,
+            help="Keep the reported stats as tensors and convert them to Python "
+            "numbers only when the logs are written, instead of synchronizing "
+            "with the device at every step.",
+        )
         group.add_argument(
             "--use_matplotlib",
             type=str2bool,
@@ -702,7 +741,8 @@ class AbsTask(ABC):
             "--batch_bins",
             type=int,
             default=1000000,
-            help="The number of batch bins. Used if batch_type='length' or 'numel'",
+            help="The number of batch bins. Used if batch_type='length', 'numel' "
+            "or 'vits_cost'",
         )
         group.add_argument(
             "--valid_batch_bins",
@@ -732,6 +772,13 @@ class AbsTask(ABC):
             choices=list(BATCH_TYPES) + [None],
             help="If not given, the value of --batch_type is used",
         )
+        group.add_argument(
+            "--batch_cost_conf",
+            action=NestedDictAction,
+            default=dict(),
+            help="The coefficients of the cost model used if batch_type='vits_cost'. "
+            "See espnet2.samplers.vits_cost_batch_sampler.DEFAULT_COST_CONF",
+        )
         group.add_argument("--fold_length", type=int, action="append", default=[])
         group.add_argument(
             "--sort_in_batch",
@@ -1607,6 +1654,7 @@ class AbsTask(ABC):
             if iter_options.distributed
             else 1,
             utt2category_file=utt2category_file,
+            cost_conf=args.batch_cost_conf,
         )
 
         batches = list(batch_sampler)
@@ -1643,6 +1691,8 @@ class AbsTask(ABC):
             num_workers=args.num_workers,
             collate_fn=iter_options.collate_fn,
             pin_memory=args.ngpu > 0,
+            persistent_workers=args.persistent_workers,
+            prefetch_factor=args.prefetch_factor,
         )
 
     @classmethod
@@ -254,6 +254,7 @@ class GANTTSTask(AbsTask):
     ) -> Tuple[str, ...]:
         if not inference:
             retval = (
+                "feats",
                 "spembs",
                 "durations",
                 "pitch",
@@ -2,7 +2,7 @@ import logging
 import re
 import warnings
 from pathlib import Path
-from typing import Iterable, List, Optional, Union
+from typing import Iterable, List, Optional, Tuple, Union
 
 import g2p_en
 import jamo
@@ -124,13 +124,12 @@ def pyopenjtalk_g2p_prosody(text: str, drop_unvoiced_vowels: bool = True) -> Lis
     """
     labels = _extract_fullcontext_label(text)
     N = len(labels)
+    # Parse each label once; labels[n + 1] is reused for the next-label lookup.
+    features = [_parse_fullcontext_label(lab) for lab in labels]
 
     phones = []
     for n in range(N):
-        lab_curr = labels[n]
-
-        # current phoneme
-        p3 = re.search(r"\-(.*?)\+", lab_curr).group(1)
+        p3, a1, a2, a3, f1, e3 = features[n]
 
         # deal unvoiced vowels as normal vowels
         if drop_unvoiced_vowels and p3 in "AEIOU":
@@ -143,7 +142,6 @@ def pyopenjtalk_g2p_prosody(text: str, drop_unvoiced_vowels: bool = True) -> Lis
                 phones.append("^")
             elif n == N - 1:
                 # check question form or not
-                e3 = _numeric_feature_by_regex(r"!(\d+)_", lab_curr)
                 if e3 == 0:
                     phones.append("$")
                 elif e3 == 1:
@@ -155,15 +153,7 @@ def pyopenjtalk_g2p_prosody(text: str, drop_unvoiced_vowels: bool = True) -> Lis
         else:
             phones.append(p3)
 
-        # accent type and position info (forward or backward)
-        a1 = _numeric_feature_by_regex(r"/A:([0-9\-]+)\+", lab_curr)
-        a2 = _numeric_feature_by_regex(r"\+(\d+)\+", lab_curr)
-        a3 = _numeric_feature_by_regex(r"\+(\d+)/", lab_curr)
-
-        # number of mora in accent phrase
-        f1 = _numeric_feature_by_regex(r"/F:(\d+)_", lab_curr)
-
-        a2_next = _numeric_feature_by_regex(r"\+(\d+)\+", labels[n + 1])
+        a2_next = features[n + 1][2]
         # accent phrase border
         if a3 == 1 and a2_next == 1 and p3 in "aeiouAEIOUNcl":
             phones.append("#")
@@ -177,6 +167,78 @@ def pyopenjtalk_g2p_prosody(text: str, drop_unvoiced_vowels: bool = True) -> Lis
     return phones
 
 
+def _parse_fullcontext_label(lab: str) -> Tuple[str, int, int, int, int, int]:
+    """Extract the features used by pyopenjtalk_g2p_prosody from a label.
+
+    A full-context label looks like
+    ``p1^p2-p3+p4=p5/A:a1+a2+a3/B:...!e3_e4-e5/F:f1_f2#...``.
+    The fields are located with plain string operations instead of one regex
+    search per feature. Whenever a field is not a plain integer (e.g. ``xx``
+    around silences), the original regex is used so the result is identical
+    to ``_numeric_feature_by_regex``.
+
+    Args:
+        lab (str): HTS full-context label.
+
+    Returns:
+        Tuple[str, int, int, int, int, int]: p3 (current phoneme), a1 (accent
+            position relative to the accent nucleus), a2 / a3 (forward /
+            backward mora position in the accent phrase), f1 (number of moras
+            in the accent phrase) and e3 (question flag of the previous
+            accent phrase). Missing features are -50.
+
+    """
+    # current phoneme
+    start = lab.index("-") + 1
+    p3 = lab[start : lab.index("+", start)]
+
+    # accent type and position info (forward or backward)
+    a1 = a2 = a3 = None
+    start = lab.find("/A:")
+    if start >= 0:
+        start += 3
+        end = lab.find("/", start)
+        fields = lab[start : end if end >= 0 else None].split("+")
+        if len(fields) == 3:
+            if fields[0].lstrip("-").isdecimal():
+                a1 = int(fields[0])
+            if fields[1].isdecimal():
+                a2 = int(fields[1])
+            if fields[2].isdecimal():
+                a3 = int(fields[2])
+    if a1 is None:
+        a1 = _numeric_feature_by_regex(r"/A:([0-9\-]+)\+", lab)
+    if a2 is None:
+        a2 = _numeric_feature_by_regex(r"\+(\d+)\+", lab)
+    if a3 is None:
+        a3 = _numeric_feature_by_regex(r"\+(\d+)/", lab)
+
+    # number of mora in accent phrase
+    f1 = _numeric_feature_after(lab, "/F:")
+    if f1 is None:
+        f1 = _numeric_feature_by_regex(r"/F:(\d+)_", lab)
+
+    # question form or not
+    e3 = _numeric_feature_after(lab, "!")
+    if e3 is None:
+        e3 = _numeric_feature_by_regex(r"!(\d+)_", lab)
+
+    return p3, a1, a2, a3, f1, e3
+
+
+def _numeric_feature_after(lab: str, prefix: str) -> Optional[int]:
+    """Return the integer between ``prefix`` and the next ``_`` if there is one."""
+    start = lab.find(prefix)
+    if start < 0:
+        return None
+    start += len(prefix)
+    end = lab.find("_", start)
+    if end < 0:
+        return None
+    value = lab[start:end]
+    return int(value) if value.isdecimal() else None
+
+
 def _numeric_feature_by_regex(regex, s):
     match = re.search(regex, s)
     if match is None:
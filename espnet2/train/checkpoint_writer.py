@@ -0,0 +1,142 @@
+"""Checkpoint writer running in a background thread."""
+
+import logging
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Optional, Union
+
+import torch
+from typeguard import check_argument_types
+
+from espnet2.torch_utils.device_funcs import to_device
+
+
+def snapshot(obj: Any) -> Any:
+    """Copy the tensors to CPU and the containers recursively.
+
+    The returned object is not affected by the following training steps,
+    so it can be saved while the training goes on.
+
+    """
+    return to_device(obj, "cpu", copy=True)
+
+
+def atomic_save(obj: Any, path: Union[str, Path]):
+    """Save obj to a temporary file and rename it to path.
+
+    The file at path is always either the previous one or the complete new one,
+    even if the process is killed while saving.
+
+    """
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    torch.save(obj, tmp_path)
+    os.replace(tmp_path, path)
+
+
+class CheckpointWriter:
+    """Save the checkpoints in the order of submission in a background thread.
+
+    The objects must be snapshots (see snapshot()), which are not modified after
+    the submission. If asynchronous=False, the jobs are done in the caller.
+
+    Examples:
+        >>> writer = CheckpointWriter()
+        >>> writer.save(snapshot(model.state_dict()), "1epoch.pth")
+        >>> writer.wait()  # Wait until 1epoch.pth is saved
+
+        >>> with CheckpointWriter() as writer:  # close() is called on exit
+        ...     writer.save(snapshot(model.state_dict()), "1epoch.pth")
+
+    """
+
+    def __init__(self, asynchronous: bool = True):
+        assert check_argument_types()
+        self.asynchronous = asynchronous
+        self._queue = queue.Queue()
+        self._error: Optional[BaseException] = None
+        self._thread = None
+        if asynchronous:
+            # Daemon thread: If the training is aborted, only *.tmp files remain
+            self._thread = threading.Thread(target=self._worker, daemon=True)
+            self._thread.start()
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                if self._error is None:
+                    job()
+            except BaseException as e:
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _raise_error(self):
+        if self._error is not None:
+            e, self._error = self._error, None
+            raise RuntimeError("Failed to save the checkpoint") from e
+
+    def submit(self, fn: Callable[[], Any]):
+        """Run fn after the previously submitted jobs."""
+        self._raise_error()
+        if self.asynchronous:
+            self._queue.put(fn)
+        else:
+            fn()
+
+    def save(
+        self,
+        obj: Any,
+        path: Union[str, Path],
+        convert: Optional[Callable[[Any], Any]] = None,
+    ):
+        """Save obj to path atomically.
+
+        Args:
+            obj: The snapshot to be saved.
+            path: Output file path.
+            convert: If given, convert(obj) is saved instead of obj. It is also
+                called in the background thread.
+
+        """
+
+        def _save():
+            start = time.perf_counter()
+            atomic_save(obj if convert is None else convert(obj), path)
+            logging.debug(f"Saved {path} in {time.perf_counter() - start:.2f} sec")
+
+        self.submit(_save)
+
+    def wait(self):
+        """Block until all the submitted jobs are done."""
+        if self.asynchronous:
+            self._queue.join()
+        self._raise_error()
+
+    def close(self):
+        """Wait for the submitted jobs and stop the thread."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+            self.asynchronous = False
+        self._raise_error()
+
+    def __enter__(self) -> "CheckpointWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+            return
+        # Don't hide the original exception by the error of the writer
+        try:
+            self.close()
+        except RuntimeError:
+            logging.exception("Failed to save the checkpoint")
@@ -16,6 +16,7 @@ from torch.utils.data.dataset import Dataset
 from typeguard import check_argument_types, check_return_type
 
 from espnet2.fileio.npy_scp import NpyScpReader
+from espnet2.fileio.packed_npy import PackedNpyReader, PackedSoundReader
 from espnet2.fileio.rand_gen_dataset import (
     FloatRandomGenerateDataset,
     IntRandomGenerateDataset,
@@ -181,6 +182,16 @@ def multi_columns_sound_loader(path, float_dtype=None):
     return sound_loader(path, float_dtype, multi_columns=True)
 
 
+def packed_sound_loader(path, float_dtype=None):
+    # The file is as follows:
+    #   utterance_id_A /some/where/wav.npy:0:44100
+    #   utterance_id_B /some/where/wav.npy:44100:132300
+
+    # NOTE: Unlike sound_loader, no file is opened per utterance.
+    # The waveforms are read from a single mmapped npy file.
+    return PackedSoundReader(path, dtype=float_dtype)
+
+
 def score_loader(path):
     loader = SingingScoreReader(fname=path)
     return AdapterForSingingScoreScpReader(loader)
@@ -225,6 +236,16 @@ DATA_TYPES = {
         "   utterance_id_b b.wav b2.wav\n"
         "   ...",
     ),
+    "packed_sound": dict(
+        func=packed_sound_loader,
+        kwargs=["float_dtype"],
+        help="Waveforms packed into a single npy file (int16 or float), "
+        "which is read with mmap. Each line indicates the range of samples."
+        "\n\n"
+        "   utterance_id_a /some/where/wav.npy:0:44100\n"
+        "   utterance_id_b /some/where/wav.npy:44100:132300\n"
+        "   ...",
+    ),
     "score": dict(
         func=score_loader,
         kwargs=[],
@@ -263,6 +284,16 @@ DATA_TYPES = {
         "   utterance_id_B /some/where/b.npy\n"
         "   ...",
     ),
+    "packed_npy": dict(
+        func=PackedNpyReader,
+        kwargs=[],
+        help="Arrays packed into a single npy file, which is read with mmap. "
+        "Each line indicates the range of the first axis."
+        "\n\n"
+        "   utterance_id_A /some/where/feats.npy:0:120\n"
+        "   utterance_id_B /some/where/feats.npy:120:305\n"
+        "   ...",
+    ),
     "text_int": dict(
         func=functools.partial(load_num_sequence_text, loader_type="text_int"),
         kwargs=[],
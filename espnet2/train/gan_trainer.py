@@ -47,6 +47,8 @@ class GANTrainerOptions(TrainerOptions):
     """Trainer option dataclass for GANTrainer."""
 
     generator_first: bool
+    freeze_inactive_params: bool
+    log_peak_memory: bool
 
 
 class GANTrainer(Trainer):
@@ -55,6 +57,24 @@ class GANTrainer(Trainer):
     If you'd like to use this trainer, the model must inherit
     espnet.train.abs_gan_espnet_model.AbsGANESPnetModel.
 
+    With accum_grad > 1, both turns run on every mini-batch, and each optimizer
+    steps once after the last mini-batch of a window of accum_grad mini-batches.
+    The updates are therefore not interleaved mini-batch by mini-batch:
+
+    - With generator_first=False (default), every discriminator turn in a window
+      uses outputs of the generator weights from before the window, i.e. they
+      are up to accum_grad - 1 generator updates staler than with
+      accum_grad == 1. The generator turns see the discriminator from before
+      the window, except the last one, which runs after the discriminator step.
+    - With generator_first=True, it is the other way round: the generator turns
+      see the discriminator from before the window, and only the discriminator
+      turn of the last mini-batch sees the updated generator (unless the model
+      caches the generator outputs of the generator turn).
+
+    The accumulated gradients equal those of one large batch only while the
+    weights are unchanged within the window. test_gan_trainer.py checks this
+    for both turns.
+
     """
 
     @classmethod
@@ -72,6 +92,22 @@ class GANTrainer(Trainer):
             default=False,
             help="Whether to update generator first.",
         )
+        parser.add_argument(
+            "--freeze_inactive_params",
+            type=str2bool,
+            default=True,
+            help="Whether to freeze the discriminator parameters in the generator "
+            "turn so that the gradients are computed only for its inputs. "
+            "In distributed training, it requires --unused_parameters true.",
+        )
+        parser.add_argument(
+            "--log_peak_memory",
+            type=str2bool,
+            default=False,
+            help="Whether to report the peak GPU memory of each turn "
+            "as {turn}_peak_mem_GB. It resets the peak memory stats of CUDA "
+            "in every turn, so enable it only for measurement.",
+        )
 
     @classmethod
     def train_one_epoch(
@@ -91,21 +127,21 @@ class GANTrainer(Trainer):
 
         grad_noise = options.grad_noise
         accum_grad = options.accum_grad
-        grad_clip = options.grad_clip
-        grad_clip_type = options.grad_clip_type
         log_interval = options.log_interval
         no_forward_run = options.no_forward_run
         ngpu = options.ngpu
         use_wandb = options.use_wandb
         generator_first = options.generator_first
         distributed = distributed_option.distributed
+        # NOTE: DistributedDataParallel expects the gradients of all the parameters
+        #   unless it is built with find_unused_parameters=True
+        freeze_inactive_params = options.freeze_inactive_params and (
+            not distributed or options.unused_parameters
+        )
+        log_peak_memory = options.log_peak_memory and ngpu > 0
 
         # Check unavailable options
         # TODO(kan-bayashi): Support the use of these options
-        if accum_grad > 1:
-            raise NotImplementedError(
-                "accum_grad > 1 is not supported in GAN-based training."
-            )
         if grad_noise:
             raise NotImplementedError(
                 "grad_noise is not supported in GAN-based training."
@@ -145,132 +181,104 @@ class GANTrainer(Trainer):
             else:
                 turns = ["discriminator", "generator"]
             for turn in turns:
-                with autocast(scaler is not None):
-                    with reporter.measure_time(f"{turn}_forward_time"):
-                        retval = model(forward_generator=turn == "generator", **batch)
-
-                        # Note(kamo):
-                        # Supporting two patterns for the returned value from the model
-                        #   a. dict type
-                        if isinstance(retval, dict):
-                            loss = retval["loss"]
-                            stats = retval["stats"]
-                            weight = retval["weight"]
-                            optim_idx = retval.get("optim_idx")
-                            if optim_idx is not None and not isinstance(optim_idx, int):
-                                if not isinstance(optim_idx, torch.Tensor):
-                                    raise RuntimeError(
-                                        "optim_idx must be int or 1dim torch.Tensor, "
-                                        f"but got {type(optim_idx)}"
-                                    )
-                                if optim_idx.dim() >= 2:
-                                    raise RuntimeError(
-                                        "optim_idx must be int or 1dim torch.Tensor, "
-                                        f"but got {optim_idx.dim()}dim tensor"
-                                    )
-                                if optim_idx.dim() == 1:
-                                    for v in optim_idx:
-                                        if v != optim_idx[0]:
-                                            raise RuntimeError(
-                                                "optim_idx must be 1dim tensor "
-                                                "having same values for all entries"
-                                            )
-                                    optim_idx = optim_idx[0].item()
-                                else:
-                                    optim_idx = optim_idx.item()
-
-                        # b. tuple or list type
-                        else:
-                            raise RuntimeError("model output must be dict.")
-
-                    stats = {k: v for k, v in stats.items() if v is not None}
-                    if ngpu > 1 or distributed:
-                        # Apply weighted averaging for loss and stats
-                        loss = (loss * weight.type(loss.dtype)).sum()
-
-                        # if distributed, this method can also apply all_reduce()
-                        stats, weight = recursive_average(stats, weight, distributed)
-
-                        # Now weight is summation over all workers
-                        loss /= weight
-
-                    if distributed:
-                        # NOTE(kamo): Multiply world_size since DistributedDataParallel
-                        # automatically normalizes the gradient by world_size.
-                        loss *= torch.distributed.get_world_size()
+                if log_peak_memory:
+                    torch.cuda.reset_peak_memory_stats()
+                with cls._freeze_inactive_params(
+                    optimizers, turn, freeze_inactive_params
+                ):
+                    with autocast(scaler is not None):
+                        with reporter.measure_time(f"{turn}_forward_time"):
+                            retval = model(
+                                forward_generator=turn == "generator", **batch
+                            )
+
+                            # Note(kamo):
+                            # Supporting two patterns for the returned value from the model
+                            #   a. dict type
+                            if isinstance(retval, dict):
+                                loss = retval["loss"]
+                                stats = retval["stats"]
+                                weight = retval["weight"]
+                                optim_idx = retval.get("optim_idx")
+                                if optim_idx is not None and not isinstance(
+                                    optim_idx, int
+                                ):
+                                    if not isinstance(optim_idx, torch.Tensor):
+                                        raise RuntimeError(
+                                            "optim_idx must be int or 1dim torch.Tensor, "
+                                            f"but got {type(optim_idx)}"
+                                        )
+                                    if optim_idx.dim() >= 2:
+                                        raise RuntimeError(
+                                            "optim_idx must be int or 1dim torch.Tensor, "
+                                            f"but got {optim_idx.dim()}dim tensor"
+                                        )
+                                    if optim_idx.dim() == 1:
+                                        for v in optim_idx:
+                                            if v != optim_idx[0]:
+                                                raise RuntimeError(
+                                                    "optim_idx must be 1dim tensor "
+                                                    "having same values for all entries"
+                                                )
+                                        optim_idx = optim_idx[0].item()
+                                    else:
+                                        optim_idx = optim_idx.item()
+
+                            # b. tuple or list type
+                            else:
+                                raise RuntimeError("model output must be dict.")
 
-                reporter.register(stats, weight)
+                        stats = {k: v for k, v in stats.items() if v is not None}
+                        if ngpu > 1 or distributed:
+                            # Apply weighted averaging for loss and stats
+                            loss = (loss * weight.type(loss.dtype)).sum()
 
-                with reporter.measure_time(f"{turn}_backward_time"):
-                    if scaler is not None:
-                        # Scales loss.  Calls backward() on scaled loss
-                        # to create scaled gradients.
-                        # Backward passes under autocast are not recommended.
-                        # Backward ops run in the same dtype autocast chose
-                        # for corresponding forward ops.
-                        scaler.scale(loss).backward()
-                    else:
-                        loss.backward()
-
-                if scaler is not None:
-                    # Unscales the gradients of optimizer's assigned params in-place
-                    for iopt, optimizer in enumerate(optimizers):
-                        if optim_idx is not None and iopt != optim_idx:
-                            continue
-                        scaler.unscale_(optimizer)
-
-                # TODO(kan-bayashi): Compute grad norm without clipping
-                grad_norm = None
-                if grad_clip > 0.0:
-                    # compute the gradient norm to check if it is normal or not
-                    grad_norm = torch.nn.utils.clip_grad_norm_(
-                        model.parameters(),
-                        max_norm=grad_clip,
-                        norm_type=grad_clip_type,
-                    )
-                    # PyTorch<=1.4, clip_grad_norm_ returns float value
-                    if not isinstance(grad_norm, torch.Tensor):
-                        grad_norm = torch.tensor(grad_norm)
-
-                if grad_norm is None or torch.isfinite(grad_norm):
-                    all_steps_are_invalid = False
-                    with reporter.measure_time(f"{turn}_optim_step_time"):
-                        for iopt, (optimizer, scheduler) in enumerate(
-                            zip(optimizers, schedulers)
+                            # if distributed, this method can also apply all_reduce()
+                            stats, weight = recursive_average(
+                                stats, weight, distributed
+                            )
+
+                            # Now weight is summation over all workers
+                            loss /= weight
+
+                        if distributed:
+                            # NOTE(kamo): Multiply world_size since DistributedDataParallel
+                            # automatically normalizes the gradient by world_size.
+                            loss *= torch.distributed.get_world_size()
+
+                        loss /= accum_grad
+
+                    reporter.register(stats, weight)
+
+                    with reporter.measure_time(f"{turn}_backward_time"):
+                        with cls._keep_other_grads(
+                            optimizers, optim_idx, accum_grad > 1
                         ):
-                            if optim_idx is not None and iopt != optim_idx:
-                                continue
                             if scaler is not None:
-                                # scaler.step() first unscales the gradients of
-                                # the optimizer's assigned params.
-                                scaler.step(optimizer)
-                                # Updates the scale for next iteration.
-                                scaler.update()
+                                # Scales loss.  Calls backward() on scaled loss
+                                # to create scaled gradients.
+                                # Backward passes under autocast are not recommended.
+                                # Backward ops run in the same dtype autocast chose
+                                # for corresponding forward ops.
+                                scaler.scale(loss).backward()
                             else:
-                                optimizer.step()
-                            if isinstance(scheduler, AbsBatchStepScheduler):
-                                scheduler.step()
-                else:
-                    logging.warning(
-                        f"The grad norm is {grad_norm}. " "Skipping updating the model."
+                                loss.backward()
+                if log_peak_memory:
+                    peak_mem = torch.cuda.max_memory_allocated() / 2**30
+                    reporter.register({f"{turn}_peak_mem_GB": peak_mem})
+
+                if iiter % accum_grad == 0:
+                    all_steps_are_invalid = cls._step_turn(
+                        model,
+                        optimizers,
+                        schedulers,
+                        scaler,
+                        reporter,
+                        options,
+                        turn,
+                        optim_idx,
+                        all_steps_are_invalid,
                     )
-                    # Must invoke scaler.update() if unscale_() is used in the
-                    # iteration to avoid the following error:
-                    #   RuntimeError: unscale_() has already been called
-                    #   on this optimizer since the last update().
-                    # Note that if the gradient has inf/nan values,
-                    # scaler.step skips optimizer.step().
-                    if scaler is not None:
-                        for iopt, optimizer in enumerate(optimizers):
-                            if optim_idx is not None and iopt != optim_idx:
-                                continue
-                            scaler.step(optimizer)
-                            scaler.update()
-
-                for iopt, optimizer in enumerate(optimizers):
-                    # NOTE(kan-bayashi): In the case of GAN, we need to clear
-                    #   the gradient of both optimizers after every update.
-                    optimizer.zero_grad()
 
                 # Register lr and train/load time[sec/step],
                 # where step refers to accum_grad * mini-batch
@@ -286,6 +294,11 @@ class GANTrainer(Trainer):
                 )
                 turn_start_time = time.perf_counter()
 
+            if scaler is not None and accum_grad > 1 and iiter % accum_grad == 0:
+                # NOTE: The gradients of both turns are accumulated with the same
+                #   scale, so the scale is updated once after both are stepped.
+                scaler.update()
+
             reporter.register({"train_time": time.perf_counter() - start_time})
             start_time = time.perf_counter()
 
@@ -305,6 +318,181 @@ class GANTrainer(Trainer):
 
         return all_steps_are_invalid
 
+    @staticmethod
+    @contextmanager
+    def _freeze_inactive_params(
+        optimizers: Sequence[torch.optim.Optimizer],
+        turn: str,
+        enabled: bool = True,
+    ):
+        """Freeze the discriminator parameters during the generator turn.
+
+        The generator loss is back-propagated through the discriminator, but only
+        the gradients for its inputs are needed. Freezing its parameters before
+        the forward skips computing (and then discarding) their gradients. The
+        generator is not frozen in the discriminator turn because its outputs
+        may be cached there and back-propagated in the generator turn. The
+        parameters are unfrozen on exit, even if the forward or backward fails.
+
+        """
+        if not enabled or turn != "generator":
+            yield
+            return
+        # NOTE: The optimizer index is 0 for the generator and 1 for the
+        #   discriminator in GAN models (see optim_idx of the model outputs)
+        params = [
+            p
+            for optimizer in optimizers[1:]
+            for group in optimizer.param_groups
+            for p in group["params"]
+            if p.requires_grad
+        ]
+        for p in params:
+            p.requires_grad_(False)
+        try:
+            yield
+        finally:
+            for p in params:
+                p.requires_grad_(True)
+
+    @staticmethod
+    @contextmanager
+    def _keep_other_grads(
+        optimizers: Sequence[torch.optim.Optimizer],
+        optim_idx: Optional[int],
+        enabled: bool = True,
+    ):
+        """Keep the gradients of the parameters not updated in this turn.
+
+        Unless the discriminator is frozen (see _freeze_inactive_params), the
+        generator loss is also back-propagated to the discriminator parameters.
+        Without gradient accumulation, such gradients are cleared after every
+        turn, but with it they must not be mixed into the gradients accumulated
+        by the other turn. So the gradients of the other optimizers are put
+        aside during backward and restored afterwards.
+
+        """
+        if not enabled or optim_idx is None:
+            yield
+            return
+        params = [
+            p
+            for iopt, optimizer in enumerate(optimizers)
+            if iopt != optim_idx
+            for group in optimizer.param_groups
+            for p in group["params"]
+        ]
+        grads = [p.grad for p in params]
+        for p in params:
+            p.grad = None
+        try:
+            yield
+        finally:
+            for p, grad in zip(params, grads):
+                p.grad = grad
+
+    @classmethod
+    def _step_turn(
+        cls,
+        model: torch.nn.Module,
+        optimizers: Sequence[torch.optim.Optimizer],
+        schedulers: Sequence[Optional[AbsScheduler]],
+        scaler: Optional[GradScaler],
+        reporter: SubReporter,
+        options: GANTrainerOptions,
+        turn: str,
+        optim_idx: Optional[int],
+        all_steps_are_invalid: bool,
+    ) -> bool:
+        """Update the parameters of the optimizer used in this turn.
+
+        Returns:
+            bool: Updated all_steps_are_invalid.
+
+        """
+        accum_grad = options.accum_grad
+        grad_clip = options.grad_clip
+        grad_clip_type = options.grad_clip_type
+        # With accum_grad > 1, the parameters of the other optimizers hold their
+        # own accumulated gradients, so only this turn's parameters are clipped
+        if accum_grad > 1 and optim_idx is not None:
+            params = [
+                p
+                for group in optimizers[optim_idx].param_groups
+                for p in group["params"]
+            ]
+        else:
+            params = model.parameters()
+
+        if scaler is not None:
+            # Unscales the gradients of optimizer's assigned params in-place
+            for iopt, optimizer in enumerate(optimizers):
+                if optim_idx is not None and iopt != optim_idx:
+                    continue
+                scaler.unscale_(optimizer)
+
+        # TODO(kan-bayashi): Compute grad norm without clipping
+        grad_norm = None
+        if grad_clip > 0.0:
+            # compute the gradient norm to check if it is normal or not
+            grad_norm = torch.nn.utils.clip_grad_norm_(
+                params,
+                max_norm=grad_clip,
+                norm_type=grad_clip_type,
+            )
+            # PyTorch<=1.4, clip_grad_norm_ returns float value
+            if not isinstance(grad_norm, torch.Tensor):
+                grad_norm = torch.tensor(grad_norm)
+
+        if grad_norm is None or torch.isfinite(grad_norm):
+            all_steps_are_invalid = False
+            with reporter.measure_time(f"{turn}_optim_step_time"):
+                for iopt, (optimizer, scheduler) in enumerate(
+                    zip(optimizers, schedulers)
+                ):
+                    if optim_idx is not None and iopt != optim_idx:
+                        continue
+                    if scaler is not None:
+                        # scaler.step() first unscales the gradients of
+                        # the optimizer's assigned params.
+                        scaler.step(optimizer)
+                        # Updates the scale for next iteration.
+                        # (With accum_grad > 1, it is updated after both turns)
+                        if accum_grad == 1:
+                            scaler.update()
+                    else:
+                        optimizer.step()
+                    if isinstance(scheduler, AbsBatchStepScheduler):
+                        scheduler.step()
+        else:
+            logging.warning(
+                f"The grad norm is {grad_norm}. " "Skipping updating the model."
+            )
+            # Must invoke scaler.update() if unscale_() is used in the
+            # iteration to avoid the following error:
+            #   RuntimeError: unscale_() has already been called
+            #   on this optimizer since the last update().
+            # Note that if the gradient has inf/nan values,
+            # scaler.step skips optimizer.step().
+            if scaler is not None:
+                for iopt, optimizer in enumerate(optimizers):
+                    if optim_idx is not None and iopt != optim_idx:
+                        continue
+                    scaler.step(optimizer)
+                    if accum_grad == 1:
+                        scaler.update()
+
+        for iopt, optimizer in enumerate(optimizers):
+            # NOTE(kan-bayashi): In the case of GAN, we need to clear
+            #   the gradient of both optimizers after every update.
+            # With accum_grad > 1, the gradients of the other optimizers are
+            # still being accumulated (see _keep_other_grads), so keep them.
+            if accum_grad > 1 and optim_idx is not None and iopt != optim_idx:
+                continue
+            optimizer.zero_grad(set_to_none=True)
+
+        return all_steps_are_invalid
+
     @classmethod
     @torch.no_grad()
     def validate_one_epoch(
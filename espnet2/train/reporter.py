@@ -21,17 +21,28 @@ Num = Union[float, int, complex, torch.Tensor, np.ndarray]
 _reserved = {"time", "total_count"}
 
 
-def to_reported_value(v: Num, weight: Num = None) -> "ReportedValue":
+def to_reported_value(
+    v: Num, weight: Num = None, defer: bool = False
+) -> "ReportedValue":
+    """Convert a value to ReportedValue.
+
+    If defer is True, torch.Tensor is kept as a detached tensor instead of
+    calling item(), which synchronizes with the device. Such values must be
+    converted by SubReporter.materialize() before aggregation.
+    """
     assert check_argument_types()
     if isinstance(v, (torch.Tensor, np.ndarray)):
         if np.prod(v.shape) != 1:
             raise ValueError(f"v must be 0 or 1 dimension: {len(v.shape)}")
-        v = v.item()
+        v = v.detach() if defer and isinstance(v, torch.Tensor) else v.item()
 
     if isinstance(weight, (torch.Tensor, np.ndarray)):
         if np.prod(weight.shape) != 1:
             raise ValueError(f"weight must be 0 or 1 dimension: {len(weight.shape)}")
-        weight = weight.item()
+        if defer and isinstance(weight, torch.Tensor):
+            weight = weight.detach()
+        else:
+            weight = weight.item()
 
     if weight is not None:
         retval = WeightedAverage(v, weight)
@@ -116,7 +127,9 @@ class SubReporter:
     See the docstring of Reporter for the usage.
     """
 
-    def __init__(self, key: str, epoch: int, total_count: int):
+    def __init__(
+        self, key: str, epoch: int, total_count: int, defer_stats: bool = False
+    ):
         assert check_argument_types()
         self.key = key
         self.epoch = epoch
@@ -126,6 +139,9 @@ class SubReporter:
         self.total_count = total_count
         self.count = 0
         self._seen_keys_in_the_step = set()
+        self.defer_stats = defer_stats
+        # (stats_list, index) of the values still holding tensors
+        self._deferred = []
 
     def get_total_count(self) -> int:
         """Returns the number of iterations over all epochs."""
@@ -170,7 +186,7 @@ class SubReporter:
                 raise RuntimeError(f"{key2} is registered twice.")
             if v is None:
                 v = np.nan
-            r = to_reported_value(v, weight)
+            r = to_reported_value(v, weight, defer=self.defer_stats)
 
             if key2 not in self.stats:
                 # If it's the first time to register the key,
@@ -185,8 +201,41 @@ class SubReporter:
                 )
             else:
                 self.stats[key2].append(r)
+            if self.defer_stats:
+                self._deferred.append((self.stats[key2], self.count - 1))
             self._seen_keys_in_the_step.add(key2)
 
+    def materialize(self) -> None:
+        """Convert the deferred tensors to Python numbers.
+
+        The tensors are stacked for each device and dtype, so this synchronizes
+        only once per device instead of once per value.
+        """
+        if len(self._deferred) == 0:
+            return
+
+        tensors = defaultdict(dict)
+        for stats_list, i in self._deferred:
+            r = stats_list[i]
+            for t in (r.value, getattr(r, "weight", None)):
+                if isinstance(t, torch.Tensor):
+                    tensors[t.device, t.dtype][id(t)] = t
+        numbers = {}
+        for group in tensors.values():
+            values = torch.stack([t.reshape(()) for t in group.values()]).tolist()
+            numbers.update(zip(group.keys(), values))
+
+        def to_number(t):
+            return numbers[id(t)] if isinstance(t, torch.Tensor) else t
+
+        for stats_list, i in self._deferred:
+            r = stats_list[i]
+            if isinstance(r, WeightedAverage):
+                stats_list[i] = WeightedAverage(to_number(r.value), to_number(r.weight))
+            else:
+                stats_list[i] = Average(to_number(r.value))
+        self._deferred = []
+
     def log_message(self, start: int = None, end: int = None) -> str:
         if self._finished:
             raise RuntimeError("Already finished")
@@ -199,6 +248,7 @@ class SubReporter:
 
         if self.count == 0 or start == end:
             return ""
+        self.materialize()
 
         message = f"{self.epoch}epoch:{self.key}:" f"{start + 1}-{end}batch: "
 
@@ -223,6 +273,7 @@ class SubReporter:
             start = 0
         if start < 0:
             start = self.count + start
+        self.materialize()
 
         for key2, stats_list in self.stats.items():
             assert len(stats_list) == self.count, (len(stats_list), self.count)
@@ -238,6 +289,7 @@ class SubReporter:
             start = 0
         if start < 0:
             start = self.count + start
+        self.materialize()
 
         d = {}
         for key2, stats_list in self.stats.items():
@@ -260,12 +312,22 @@ class SubReporter:
         self.register({name: t})
 
     def measure_iter_time(self, iterable, name: str):
+        # The first measurement includes iter(), where DataLoader starts the workers
+        start = time.perf_counter()
         iterator = iter(iterable)
+        first = True
         while True:
             try:
-                start = time.perf_counter()
+                if not first:
+                    start = time.perf_counter()
                 retval = next(iterator)
                 t = time.perf_counter() - start
+                if first:
+                    logging.info(
+                        f"{self.epoch}epoch:{self.key}: "
+                        f"the first batch is ready in {t:.3f} sec"
+                    )
+                    first = False
                 self.register({name: t})
                 yield retval
             except StopIteration:
@@ -285,11 +347,14 @@ class Reporter:
 
     """
 
-    def __init__(self, epoch: int = 0):
+    def __init__(self, epoch: int = 0, defer_stats: bool = False):
         assert check_argument_types()
         if epoch < 0:
             raise ValueError(f"epoch must be 0 or more: {epoch}")
         self.epoch = epoch
+        # If True, tensors are registered without item() and converted to
+        # Python numbers only when the logs are written
+        self.defer_stats = defer_stats
         # stats: Dict[int, Dict[str, Dict[str, float]]]
         # e.g. self.stats[epoch]['train']['loss']
         self.stats = {}
@@ -327,7 +392,9 @@ class Reporter:
         else:
             total_count = self.stats[self.epoch - 1][key]["total_count"]
 
-        sub_reporter = SubReporter(key, self.epoch, total_count)
+        sub_reporter = SubReporter(
+            key, self.epoch, total_count, defer_stats=self.defer_stats
+        )
         # Clear the stats for the next epoch if it exists
         self.stats.pop(epoch, None)
         return sub_reporter
@@ -340,6 +407,7 @@ class Reporter:
             )
 
         # Calc mean of current stats and set it as previous epochs stats
+        sub_reporter.materialize()
         stats = {}
         for key2, values in sub_reporter.stats.items():
             v = aggregate(values)
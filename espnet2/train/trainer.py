@@ -2,6 +2,8 @@
 import argparse
 import dataclasses
 import logging
+import os
+import shutil
 import time
 from contextlib import contextmanager
 from dataclasses import is_dataclass
@@ -13,9 +15,14 @@ import numpy as np
 import torch
 import torch.nn
 import torch.optim
+import yaml
 from packaging.version import parse as V
 from typeguard import check_argument_types
 
+from espnet2.gan_tts.vits.inference_snapshot import (
+    SNAPSHOT_SUFFIX,
+    inference_snapshot,
+)
 from espnet2.iterators.abs_iter_factory import AbsIterFactory
 from espnet2.main_funcs.average_nbest_models import average_nbest_models
 from espnet2.main_funcs.calculate_all_attentions import calculate_all_attentions
@@ -30,6 +37,7 @@ from espnet2.torch_utils.device_funcs import to_device
 from espnet2.torch_utils.recursive_op import recursive_average
 from espnet2.torch_utils.set_all_random_seed import set_all_random_seed
 from espnet2.train.abs_espnet_model import AbsESPnetModel
+from espnet2.train.checkpoint_writer import CheckpointWriter, snapshot
 from espnet2.train.distributed_utils import DistributedOption
 from espnet2.train.reporter import Reporter, SubReporter
 from espnet2.utils.build_dataclass import build_dataclass
@@ -73,6 +81,7 @@ class TrainerOptions:
     grad_clip: float
     grad_clip_type: float
     log_interval: Optional[int]
+    defer_stats: bool
     no_forward_run: bool
     use_matplotlib: bool
     use_tensorboard: bool
@@ -84,6 +93,8 @@ class TrainerOptions:
     patience: Optional[int]
     keep_nbest_models: Union[int, List[int]]
     nbest_averaging_interval: int
+    async_checkpoint: bool
+    inference_snapshot_dir: Optional[Union[Path, str]]
     early_stopping_criterion: Sequence[str]
     best_model_criterion: Sequence[Sequence[str]]
     val_scheduler_criterion: Sequence[str]
@@ -171,6 +182,37 @@ class Trainer:
         distributed_option: DistributedOption,
     ) -> None:
         """Perform training. This method performs the main process of training."""
+        # The writer runs in a daemon thread, so wait for the last checkpoint
+        # even if the training is interrupted by an exception
+        with CheckpointWriter(
+            asynchronous=trainer_options.async_checkpoint
+        ) as checkpoint_writer:
+            cls._run(
+                model=model,
+                optimizers=optimizers,
+                schedulers=schedulers,
+                train_iter_factory=train_iter_factory,
+                valid_iter_factory=valid_iter_factory,
+                plot_attention_iter_factory=plot_attention_iter_factory,
+                trainer_options=trainer_options,
+                distributed_option=distributed_option,
+                checkpoint_writer=checkpoint_writer,
+            )
+
+    @classmethod
+    def _run(
+        cls,
+        model: AbsESPnetModel,
+        optimizers: Sequence[torch.optim.Optimizer],
+        schedulers: Sequence[Optional[AbsScheduler]],
+        train_iter_factory: AbsIterFactory,
+        valid_iter_factory: AbsIterFactory,
+        plot_attention_iter_factory: Optional[AbsIterFactory],
+        trainer_options,
+        distributed_option: DistributedOption,
+        checkpoint_writer: CheckpointWriter,
+    ) -> None:
+        """The main process of run() with the checkpoint writer."""
         assert check_argument_types()
         # NOTE(kamo): Don't check the type more strictly as far trainer_options
         assert is_dataclass(trainer_options), type(trainer_options)
@@ -185,7 +227,7 @@ class Trainer:
             keep_nbest_models = trainer_options.keep_nbest_models
 
         output_dir = Path(trainer_options.output_dir)
-        reporter = Reporter()
+        reporter = Reporter(defer_stats=trainer_options.defer_stats)
         if trainer_options.use_amp:
             if V(torch.__version__) < V("1.6.0"):
                 raise RuntimeError(
@@ -266,6 +308,21 @@ class Trainer:
         else:
             train_summary_writer = None
 
+        snapshot_dir = None
+        # The inference snapshot written by this training, which is the only one to
+        # be removed when the next one is saved. When resumed, the snapshot of the
+        # epoch resumed from is regarded as written by this training.
+        last_snapshot = None
+        if start_epoch > 1:
+            last_snapshot = f"{start_epoch - 1}epoch{SNAPSHOT_SUFFIX}"
+        if trainer_options.inference_snapshot_dir is not None and (
+            not distributed_option.distributed or distributed_option.dist_rank == 0
+        ):
+            snapshot_dir = Path(trainer_options.inference_snapshot_dir)
+            snapshot_config = cls.prepare_inference_snapshot_dir(
+                model, output_dir, snapshot_dir
+            )
+
         start_time = time.perf_counter()
         for iepoch in range(start_epoch, trainer_options.max_epoch + 1):
             if iepoch != start_epoch:
@@ -345,23 +402,54 @@ class Trainer:
                     reporter.wandb_log()
 
                 # 4. Save/Update the checkpoint
-                torch.save(
-                    {
-                        "model": model.state_dict(),
-                        "reporter": reporter.state_dict(),
-                        "optimizers": [o.state_dict() for o in optimizers],
-                        "schedulers": [
-                            s.state_dict() if s is not None else None
-                            for s in schedulers
-                        ],
-                        "scaler": scaler.state_dict() if scaler is not None else None,
-                    },
-                    output_dir / "checkpoint.pth",
+                # NOTE: Only copying the states to CPU blocks the training.
+                #   The files are written in the background and renamed atomically.
+                with reporter.observe("checkpoint") as sub_reporter:
+                    with sub_reporter.measure_time("blocked_time"):
+                        # Wait for the previous epoch to keep one snapshot in memory
+                        checkpoint_writer.wait()
+                        model_state = snapshot(model.state_dict())
+                        states = {
+                            "model": model_state,
+                            "optimizers": snapshot(
+                                [o.state_dict() for o in optimizers]
+                            ),
+                            "schedulers": snapshot(
+                                [
+                                    s.state_dict() if s is not None else None
+                                    for s in schedulers
+                                ]
+                            ),
+                            "scaler": (
+                                snapshot(scaler.state_dict())
+                                if scaler is not None
+                                else None
+                            ),
+                        }
+                # NOTE: The reporter is saved after observe() has finished,
+                #   so that the stats of "checkpoint" for this epoch are included
+                #   and the next epoch can be resumed without a missing key.
+                states["reporter"] = snapshot(reporter.state_dict())
+                checkpoint_writer.save(states, output_dir / "checkpoint.pth")
+
+                # 5. Save the model and the snapshot for the inference
+                checkpoint_writer.save(model_state, output_dir / f"{iepoch}epoch.pth")
+                if snapshot_dir is not None:
+                    cls.save_inference_snapshot(
+                        checkpoint_writer,
+                        model_state,
+                        snapshot_dir,
+                        iepoch,
+                        previous=last_snapshot,
+                        **snapshot_config,
+                    )
+                    last_snapshot = f"{iepoch}epoch{SNAPSHOT_SUFFIX}"
+                blocked_time = reporter.get_value("checkpoint", "blocked_time")
+                logging.info(
+                    f"The training was blocked for {blocked_time:.2f} sec "
+                    "to save the checkpoint"
                 )
 
-                # 5. Save and log the model and update the link to the best model
-                torch.save(model.state_dict(), output_dir / f"{iepoch}epoch.pth")
-                
                 # Disable symlink for Windows!
 
                 # # Creates a sym link latest.pth -> {iepoch}epoch.pth
@@ -397,6 +485,7 @@ class Trainer:
                 if log_model and trainer_options.use_wandb:
                     import wandb
 
+                    checkpoint_writer.wait()
                     logging.info("Logging Model on this epoch :::::")
                     artifact = wandb.Artifact(
                         name=f"model_{wandb.run.id}",
@@ -426,6 +515,7 @@ class Trainer:
                     trainer_options.nbest_averaging_interval > 0
                     and iepoch % trainer_options.nbest_averaging_interval == 0
                 ):
+                    checkpoint_writer.wait()
                     average_nbest_models(
                         reporter=reporter,
                         output_dir=output_dir,
@@ -462,6 +552,8 @@ class Trainer:
                 f"The training was finished at {trainer_options.max_epoch} epochs "
             )
 
+        checkpoint_writer.close()
+
         # Generated n-best averaged model
         if not distributed_option.distributed or distributed_option.dist_rank == 0:
             average_nbest_models(
@@ -471,6 +563,80 @@ class Trainer:
                 nbest=keep_nbest_models,
             )
 
+    @staticmethod
+    def prepare_inference_snapshot_dir(
+        model: AbsESPnetModel, output_dir: Path, snapshot_dir: Path
+    ) -> Dict:
+        """Copy config.yaml to snapshot_dir and return the snapshot arguments.
+
+        The snapshot is supported only for VITS (see inference_snapshot()).
+        An existing config.yaml in snapshot_dir is never overwritten: if it is
+        not the same as the one of this training, an error is raised.
+
+        """
+        config_path = output_dir / "config.yaml"
+        with config_path.open("r", encoding="utf-8") as f:
+            config = yaml.safe_load(f)
+        if config.get("tts") != "vits":
+            raise ValueError("--inference_snapshot_dir is supported only for VITS")
+        snapshot_dir.mkdir(parents=True, exist_ok=True)
+        snapshot_config_path = snapshot_dir / "config.yaml"
+        if not snapshot_config_path.exists():
+            tmp_path = snapshot_dir / "config.yaml.tmp"
+            shutil.copyfile(config_path, tmp_path)
+            os.replace(tmp_path, snapshot_config_path)
+        elif snapshot_config_path.read_bytes() != config_path.read_bytes():
+            raise RuntimeError(
+                f"{snapshot_config_path} differs from {config_path}. "
+                "Set --inference_snapshot_dir to another directory."
+            )
+        if config.get("odim") is None:
+            aux_channels = model.feats_extract.output_size()
+        else:
+            aux_channels = config["odim"]
+        return dict(config=config, aux_channels=aux_channels, fs=model.tts.fs)
+
+    @staticmethod
+    def save_inference_snapshot(
+        checkpoint_writer: CheckpointWriter,
+        model_state: Dict[str, torch.Tensor],
+        snapshot_dir: Path,
+        iepoch: int,
+        config: Dict,
+        aux_channels: int,
+        fs: int,
+        previous: Optional[str] = None,
+    ):
+        """Save the generator-only snapshot and remove the previous one.
+
+        Only the file named previous, i.e. the snapshot saved by this training in
+        the previous epoch, is removed. The other files in snapshot_dir (e.g. the
+        ones made by slim_model.py or by another training) are never touched.
+
+        """
+        name = f"{iepoch}epoch{SNAPSHOT_SUFFIX}"
+        checkpoint_writer.save(
+            model_state,
+            snapshot_dir / name,
+            convert=lambda s: inference_snapshot(
+                s, config, aux_channels, fs, f"{iepoch}epoch.pth"
+            ),
+        )
+
+        if previous is not None and previous != name:
+
+            def _remove_previous_snapshot():
+                p = snapshot_dir / previous
+                try:
+                    if p.exists():
+                        p.unlink()
+                except OSError as e:
+                    # e.g. On Windows, the file memory-mapped by the inference
+                    # can't be removed. Keep training and leave it to the user.
+                    logging.warning(f"Failed to remove {p}: {e}")
+
+            checkpoint_writer.submit(_remove_previous_snapshot)
+
     @classmethod
     def train_one_epoch(
         cls,
@@ -0,0 +1,110 @@
+"""
+`weights/{model_name}`のモデルの推論部分をONNX（またはTorchScript）に書き出す。
+
+python export_model.py --model-name {model_name} [--format onnx]
+
+`weights/{model_name}/export/`に書き出され、`VITSJaProsModel(..., backend="onnx")`や
+`python server_infer.py --backend onnx`で使える。`pth`ファイルを入れ替えたら書き出し直すこと。
+書き出した後、同じ文をPyTorchと書き出したモデルで同じ乱数シードで（ノイズ有りで）合成し、
+波形の誤差とCPUでの合成時間を比べて表示する。
+"""
+import argparse
+import os
+import time
+from typing import List
+
+import numpy as np
+
+from espnet2.torch_utils.set_all_random_seed import set_all_random_seed
+from exported_generator import EXPORT_FORMATS, export_generator
+from model import VITSJaProsModel, find_model_files
+from text import g2tokens
+
+check_texts = [
+    "こんにちは。",
+    "今日はいい天気ですね、散歩にでも行きましょうか？",
+    "音声合成のモデルを書き出して、元のモデルと比べて誤差と速さを確かめます。"
+    "長めの文章でも同じように合成できるかどうかも見ておきます。",
+]
+
+
+def compare(
+    reference: VITSJaProsModel,
+    exported: VITSJaProsModel,
+    texts: List[str],
+    num_runs: int = 5,
+):
+    """
+    同じ乱数シードで（既定のnoise_scaleで）合成して、誤差と合成時間を表示する。
+    乱数は同じ順番で作るので、ノイズ有りでも長さと波形が一致するはず。
+    """
+    for text in texts:
+        tokens = g2tokens(text)
+        set_all_random_seed(0)
+        _, ref = reference.tokens2speech(tokens)
+        set_all_random_seed(0)
+        fs, wave = exported.tokens2speech(tokens)
+        print(f"---\n{text}")
+        if len(ref) != len(wave):
+            print(f"長さが違います: PyTorch {len(ref)}、書き出し {len(wave)}")
+            continue
+        diff = np.abs(ref - wave)
+        snr = 10 * np.log10(np.sum(ref**2) / max(np.sum(diff**2), 1e-20))
+        print(f"誤差: 最大 {diff.max():.2e}、平均 {diff.mean():.2e}、SNR {snr:.1f}dB")
+
+        times = []
+        for model in [reference, exported]:
+            model.tokens2speech(tokens)  # 1回目は準備に時間がかかるので除く
+            start = time.perf_counter()
+            for _ in range(num_runs):
+                model.tokens2speech(tokens)
+            times.append((time.perf_counter() - start) / num_runs)
+        duration = len(wave) / fs
+        print(
+            f"合成時間（{duration:.2f}秒の音声）: PyTorch {times[0] * 1000:.0f}ミリ秒、"
+            f"{exported.backend} {times[1] * 1000:.0f}ミリ秒"
+            f"（{times[0] / times[1]:.2f}倍速）"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model-root", type=str, default="weights")
+    parser.add_argument("--model-name", type=str, required=True)
+    parser.add_argument("--format", type=str, default="onnx", choices=EXPORT_FORMATS)
+    parser.add_argument("--opset-version", type=int, default=15)
+    parser.add_argument(
+        "--num-runs", type=int, default=5, help="合成時間を測るときの繰り返し回数"
+    )
+    parser.add_argument(
+        "--no-check", action="store_true", help="書き出した後の比較をしない"
+    )
+    args = parser.parse_args()
+
+    model_dir = os.path.join(args.model_root, args.model_name)
+    model_path, config_path = find_model_files(model_dir)
+    reference = VITSJaProsModel(args.model_name, model_path, config_path, device="cpu")
+
+    print("---")
+    print(f"{args.format}形式で書き出しています...")
+    export_generator(
+        reference.generator,
+        os.path.join(model_dir, "export"),
+        fs=reference.fs,
+        checkpoint=os.path.basename(model_path),
+        export_format=args.format,
+        opset_version=args.opset_version,
+    )
+    print("完了！")
+    if not args.no_check:
+        print("PyTorchのモデルと比べています...")
+        exported = VITSJaProsModel(
+            args.model_name,
+            model_path,
+            config_path,
+            device="cpu",
+            backend=args.format,
+        )
+        compare(reference, exported, check_texts, num_runs=args.num_runs)
+        print("---")
+    print(f"{os.path.join(model_dir, 'export')}に書き出しました。")
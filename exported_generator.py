@@ -0,0 +1,288 @@
+"""
+VITSGeneratorの推論に使う部分だけをONNXかTorchScriptに書き出し、それで合成する。
+
+書き出すのは次の3つで、どれもweight normを外してから書き出す。
+- `encoder`: テキストエンコーダと、確率的duration predictor（逆方向）
+- `flow`: flow（逆方向）
+- `decoder`: HiFiGANデコーダ
+
+各音素をdurationだけ伸ばす部分と乱数の生成は、長さがデータで決まってトレースしにくいので
+書き出さずにtorchで行う。乱数はPyTorchで合成するときと同じ順番・形でtorchで作るので、
+シードを固定すればPyTorchで合成したとき（CPU）と同じノイズ・長さになる。
+"""
+import copy
+import json
+import os
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+from espnet2.gan_tts.vits.generator import VITSGenerator
+from espnet.nets.pytorch_backend.nets_utils import make_non_pad_mask
+from torch.nn.utils.weight_norm import WeightNorm
+
+from slim_model import remove_weight_norm
+
+EXPORT_FORMATS = ("onnx", "torchscript")
+_EXTENSIONS = {"onnx": "onnx", "torchscript": "pt"}
+_PARTS = ("encoder", "flow", "decoder")
+
+
+class _Encoder(torch.nn.Module):
+    def __init__(self, generator: VITSGenerator):
+        super().__init__()
+        self.text_encoder = generator.text_encoder
+        self.duration_predictor = generator.duration_predictor
+
+    def forward(
+        self, text: torch.Tensor, text_lengths: torch.Tensor, noise_dur: torch.Tensor
+    ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor]:
+        x, m_p, logs_p, x_mask = self.text_encoder(text, text_lengths)
+        # StochasticDurationPredictorの逆方向と同じ計算だが、乱数は外から受け取る
+        dp = self.duration_predictor
+        x = dp.proj(dp.dds(dp.pre(x), x_mask)) * x_mask
+        flows = list(reversed(dp.flows))
+        flows = flows[:-2] + [flows[-1]]
+        z = noise_dur
+        for flow in flows:
+            z = flow(z, x_mask, g=x, inverse=True)
+        logw = z[:, :1]
+        return m_p, logs_p, x_mask, logw
+
+
+class _Flow(torch.nn.Module):
+    def __init__(self, generator: VITSGenerator):
+        super().__init__()
+        self.flow = generator.flow
+
+    def forward(self, z_p: torch.Tensor, y_mask: torch.Tensor) -> torch.Tensor:
+        return self.flow(z_p, y_mask, inverse=True) * y_mask
+
+
+class _Decoder(torch.nn.Module):
+    def __init__(self, generator: VITSGenerator):
+        super().__init__()
+        self.decoder = generator.decoder
+
+    def forward(self, z: torch.Tensor) -> torch.Tensor:
+        return self.decoder(z)
+
+
+def _copy_without_weight_norm(generator: VITSGenerator) -> VITSGenerator:
+    """
+    weight normを外した`generator`の複製を作る（元のモデルはそのまま）。
+    weight normの層の`weight`は計算で作られたテンソルなのでそのままではdeepcopyできず、
+    その時点の値を切り離したものに置き換えて複製してから、複製のweight normを外す。
+    """
+    memo = {}
+    for m in generator.modules():
+        for hook in m._forward_pre_hooks.values():
+            if isinstance(hook, WeightNorm):
+                weight = getattr(m, hook.name)
+                memo[id(weight)] = weight.detach().clone()
+    generator = copy.deepcopy(generator, memo)
+    remove_weight_norm(generator)
+    return generator
+
+
+def export_generator(
+    generator: VITSGenerator,
+    export_dir: str,
+    fs: int,
+    checkpoint: str,
+    export_format: str = "onnx",
+    opset_version: int = 15,
+):
+    """
+    `generator`を`export_dir`に書き出す。`checkpoint`は書き出し元の`pth`ファイル名で、
+    読み込むときに食い違っていないかの確認に使う。
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError("export_formatはonnxかtorchscriptである必要があります。")
+    if any(
+        x is not None
+        for x in (generator.spks, generator.spk_embed_dim, generator.langs)
+    ):
+        raise ValueError("話者・言語の埋め込みがあるモデルの書き出しには対応していません。")
+
+    # 元のモデルはそのまま使えるように、weight normを外した複製を書き出す
+    generator = _copy_without_weight_norm(generator).float().cpu().eval()
+
+    num_tokens = generator.text_encoder.emb.num_embeddings
+    text = torch.randint(1, num_tokens, (1, 20))
+    text_lengths = torch.tensor([20])
+    noise_dur = torch.zeros(1, 2, 20)
+    z = torch.randn(1, generator.text_encoder.attention_dim, 50)
+    y_mask = torch.ones(1, 1, 50)
+    modules = dict(
+        encoder=(
+            _Encoder(generator),
+            (text, text_lengths, noise_dur),
+            dict(
+                text={0: "batch", 1: "text_length"},
+                text_lengths={0: "batch"},
+                noise_dur={0: "batch", 2: "text_length"},
+                m_p={0: "batch", 2: "text_length"},
+                logs_p={0: "batch", 2: "text_length"},
+                x_mask={0: "batch", 2: "text_length"},
+                logw={0: "batch", 2: "text_length"},
+            ),
+        ),
+        flow=(
+            _Flow(generator),
+            (z, y_mask),
+            dict(
+                z_p={0: "batch", 2: "feats_length"},
+                y_mask={0: "batch", 2: "feats_length"},
+                z={0: "batch", 2: "feats_length"},
+            ),
+        ),
+        decoder=(
+            _Decoder(generator),
+            (z,),
+            dict(z={0: "batch", 2: "feats_length"}, wav={0: "batch", 2: "wav_length"}),
+        ),
+    )
+
+    os.makedirs(export_dir, exist_ok=True)
+    with torch.no_grad():
+        for name, (module, args, dynamic_axes) in modules.items():
+            path = os.path.join(export_dir, f"{name}.{_EXTENSIONS[export_format]}")
+            if export_format == "onnx":
+                torch.onnx.export(
+                    module,
+                    args,
+                    path,
+                    input_names=list(dynamic_axes)[: len(args)],
+                    output_names=list(dynamic_axes)[len(args) :],
+                    dynamic_axes=dynamic_axes,
+                    opset_version=opset_version,
+                )
+            else:
+                torch.jit.trace(module, args).save(path)
+
+    meta = dict(
+        format=export_format,
+        checkpoint=checkpoint,
+        fs=fs,
+        upsample_factor=generator.upsample_factor,
+        receptive_field=generator.decoder.receptive_field,
+        text_encoder_blocks=len(generator.text_encoder.encoder.encoders),
+    )
+    with open(os.path.join(export_dir, "export.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+
+class ExportedGenerator:
+    """
+    `export_generator`で書き出したモデルで、`VITSGenerator.inference`と同じ合成をする。
+    `backend`は"onnx"（ONNX Runtimeで実行）か"torchscript"。
+    """
+
+    def __init__(self, export_dir: str, backend: str = "onnx", device: str = "cpu"):
+        with open(os.path.join(export_dir, "export.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta["format"] != backend:
+            raise ValueError(
+                f"`{export_dir}`は{self.meta['format']}形式で書き出されています。"
+            )
+        self.backend = backend
+        self.fs: int = self.meta["fs"]
+        self.upsample_factor: int = self.meta["upsample_factor"]
+        self.receptive_field: int = self.meta["receptive_field"]
+        self.text_encoder_blocks: int = self.meta["text_encoder_blocks"]
+        paths = {
+            name: os.path.join(export_dir, f"{name}.{_EXTENSIONS[backend]}")
+            for name in _PARTS
+        }
+        if backend == "onnx":
+            import onnxruntime as ort
+
+            providers = ["CPUExecutionProvider"]
+            if device == "cuda":
+                providers.insert(0, "CUDAExecutionProvider")
+            self.sessions = {
+                name: ort.InferenceSession(path, providers=providers)
+                for name, path in paths.items()
+            }
+            # ONNX Runtimeにはnumpyで渡すので、前後の処理はCPUで行う
+            self.device = "cpu"
+        else:
+            self.modules: Dict[str, torch.jit.ScriptModule] = {
+                name: torch.jit.load(path, map_location=device)
+                for name, path in paths.items()
+            }
+            self.device = device
+
+    def _run(self, name: str, *args: torch.Tensor):
+        if self.backend == "torchscript":
+            return self.modules[name](*args)
+        session = self.sessions[name]
+        inputs = {
+            x.name: np.ascontiguousarray(arg.cpu().numpy())
+            for x, arg in zip(session.get_inputs(), args)
+        }
+        outputs = [torch.from_numpy(x) for x in session.run(None, inputs)]
+        return outputs[0] if len(outputs) == 1 else outputs
+
+    def inference(
+        self,
+        text: torch.Tensor,
+        text_lengths: torch.Tensor,
+        noise_scale: float = 0.667,
+        noise_scale_dur: float = 0.8,
+        alpha: float = 1.0,
+        max_len: Optional[int] = None,
+        decoder_chunk_size: Optional[int] = None,
+        latent_stretch: float = 1.0,
+    ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        """引数と返り値は`VITSGenerator.inference`と同じ"""
+        text = text.to(self.device)
+        text_lengths = text_lengths.to(self.device)
+        # VITSGeneratorと同じ順番・形で乱数を作る。テキストエンコーダは
+        # duration predictorのノイズより先に、層ごとのlayer dropの乱数を1つずつ引く
+        # （推論時は使わないので書き出したモデルには入っていない）
+        torch.empty(self.text_encoder_blocks).uniform_()
+        noise_dur = (
+            torch.randn(text.size(0), 2, text.size(1)).to(self.device) * noise_scale_dur
+        )
+        m_p, logs_p, x_mask, logw = self._run("encoder", text, text_lengths, noise_dur)
+        w = torch.exp(logw) * x_mask * alpha
+        dur = torch.ceil(w)
+        y_lengths = torch.clamp_min(torch.sum(dur, [1, 2]), 1).long()
+        y_mask = make_non_pad_mask(y_lengths).unsqueeze(1).to(m_p)
+        attn_mask = torch.unsqueeze(x_mask, 2) * torch.unsqueeze(y_mask, -1)
+        attn = VITSGenerator._generate_path(dur, attn_mask)
+        m_p = torch.matmul(attn.squeeze(1), m_p.transpose(1, 2)).transpose(1, 2)
+        logs_p = torch.matmul(attn.squeeze(1), logs_p.transpose(1, 2)).transpose(1, 2)
+
+        z_p = m_p + torch.randn_like(m_p) * torch.exp(logs_p) * noise_scale
+        z = self._run("flow", z_p, y_mask)[:, :, :max_len]
+        if latent_stretch != 1.0:
+            z = F.interpolate(
+                z,
+                size=max(int(z.size(2) * latent_stretch), 1),
+                mode="linear",
+                align_corners=False,
+            )
+        wav = self._decode(z, chunk_size=decoder_chunk_size)
+        return wav.squeeze(1), attn.squeeze(1), dur.squeeze(1)
+
+    def _decode(self, z: torch.Tensor, chunk_size: Optional[int] = None):
+        """HiFiGANGenerator.chunked_forwardと同じように区間に分けてデコードする"""
+        context = self.receptive_field
+        total_len = z.size(2)
+        if chunk_size is None or total_len <= chunk_size + 2 * context:
+            return self._run("decoder", z)
+
+        outs = []
+        for start in range(0, total_len, chunk_size):
+            end = min(start + chunk_size, total_len)
+            left = min(context, start)
+            right = min(context, total_len - end)
+            out = self._run("decoder", z[:, :, start - left : end + right])
+            out_start = left * self.upsample_factor
+            out_end = out_start + (end - start) * self.upsample_factor
+            outs += [out[:, :, out_start:out_end]]
+        return torch.cat(outs, dim=2)
@@ -1,13 +1,25 @@
-from typing import List, Optional, Tuple
+import gc
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 
+import librosa
 import numpy as np
 import pyworld
 import torch
 import yaml
 from espnet2.bin.tts_inference import Text2Speech
 from espnet2.text.token_id_converter import TokenIDConverter
+from espnet2.torch_utils.set_all_random_seed import set_all_random_seed
+from espnet.nets.pytorch_backend.nets_utils import pad_list
 
-from text import p2tokens
+from exported_generator import EXPORT_FORMATS, ExportedGenerator
+from precision import set_precision
+from slim_model import SLIM_SUFFIX, load_slim_generator
+from synthesis_cache import SynthesisCache, file_hash
+from text import p2tokens, split_p
 
 
 class VITSJaProsModel:
@@ -17,8 +29,50 @@ class VITSJaProsModel:
         model_path: str,
         config_path: Optional[str] = None,
         device: str = "gpu",
+        dtype: str = "float32",
+        decoder_chunk_size: Optional[int] = None,
+        f0_method: str = "harvest",
+        pitch_method: str = "world",
+        seed: Optional[int] = None,
+        cache: Optional[SynthesisCache] = None,
+        backend: str = "torch",
+        export_dir: Optional[str] = None,
+        precision: str = "fp32",
+        keep_fp32: Optional[Sequence[str]] = None,
     ):
+        """
+        `decoder_chunk_size`を指定すると、デコーダをその長さ（フレーム数）ごとの
+        重なりのある区間に分けて実行し、長い文章でもメモリ使用量が増えないようにする。
+        `f0_method`は音程・抑揚調整に使うf0推定方法で、"harvest"か"dio"
+        （dio+stonemask、harvestより速いが少し荒い）。
+        `pitch_method`は音程の変え方で、"world"（pyworldで分析・再合成）か"latent"
+        （デコーダの入力を時間方向に伸縮して合成し、元の長さにリサンプリングする。
+        pyworldを通さないので速いが、声質も少し変わる）。
+        "latent"でも抑揚の調整にはpyworldを使う。
+        `seed`を指定すると毎回その乱数シードで合成する
+        （noise_scaleが0以外でも同じ結果になる）。
+        `cache`を指定すると、同じ文・同じ設定の合成結果を使いまわす。ただしnoise_scaleか
+        noise_scale_durが0以外で`seed`も無いときは、毎回結果が変わるので使わない。
+        `backend`を"onnx"か"torchscript"にすると、`export_model.py`で書き出したモデル
+        （`export_dir`、省略時は`pth`ファイルと同じフォルダの`export`）で合成する。
+        この場合、`model_path`はキャッシュのキーと書き出し元の確認にだけ使う。
+        `model_path`が`slim_model.py`で作った`*.slim.pth`のときは、学習時のモデル全体を
+        組み立てずに、合成に使う部分だけを読み込む。
+        `precision`を"bf16"か"int8"（動的量子化、CPUのみ）にすると、一部の層をその精度で
+        計算する。`keep_fp32`はそのときfloat32のままにする層（`precision.py`を参照）。
+        """
         self.name = name
+        self.model_path = model_path
+        self.seed = seed
+        self.cache = cache
+        self._checkpoint_hash: Optional[str] = None
+        self.decoder_chunk_size = decoder_chunk_size
+        if f0_method not in ("harvest", "dio"):
+            raise ValueError("f0_methodはharvestかdioである必要があります。")
+        self.f0_method = f0_method
+        if pitch_method not in ("world", "latent"):
+            raise ValueError("pitch_methodはworldかlatentである必要があります。")
+        self.pitch_method = pitch_method
         if config_path is None:
             config_path = "conf/config.yaml"
         if torch.cuda.is_available() and device == "gpu":
@@ -27,9 +81,45 @@ class VITSJaProsModel:
             self.device = "cpu"
         else:
             raise ValueError("deviceはgpuかcpuである必要があります。")
-        self.model = Text2Speech(
-            train_config=config_path, model_file=model_path, device=self.device
-        )
+        self.dtype = dtype
+        if backend not in ("torch", *EXPORT_FORMATS):
+            raise ValueError("backendはtorchかonnxかtorchscriptである必要があります。")
+        self.backend = backend
+        if precision != "fp32" and (backend != "torch" or dtype != "float32"):
+            raise ValueError(
+                "precisionはbackendがtorchでdtypeがfloat32のときだけ指定できます。"
+            )
+        if precision == "int8" and self.device != "cpu":
+            raise ValueError("precisionがint8のときはdeviceはcpuである必要があります。")
+        self.precision = precision
+        self.keep_fp32 = keep_fp32
+        if backend == "torch" and model_path.endswith(SLIM_SUFFIX):
+            self.generator, meta = load_slim_generator(model_path, self.device, dtype)
+            self.fs = meta["fs"]
+        elif backend == "torch":
+            self.model = Text2Speech(
+                train_config=config_path,
+                model_file=model_path,
+                device=self.device,
+                dtype=dtype,
+                seed=seed if seed is not None else 777,
+                always_fix_seed=seed is not None,
+            )
+            self.generator = self.model.tts.generator
+            self.fs = self.model.fs
+        else:
+            if dtype != "float32":
+                raise ValueError("書き出したモデルはfloat32でしか使えません。")
+            if export_dir is None:
+                export_dir = os.path.join(os.path.dirname(model_path), "export")
+            self.generator = ExportedGenerator(export_dir, backend, self.device)
+            if self.generator.meta["checkpoint"] != os.path.basename(model_path):
+                raise ValueError(
+                    f"`{export_dir}`は`{self.generator.meta['checkpoint']}`から"
+                    "書き出されています。`export_model.py`で書き出し直してください。"
+                )
+            self.fs = self.generator.fs
+        set_precision(self.generator, precision, keep_fp32)
 
         with open(config_path, "r") as f:
             config = yaml.safe_load(f)
@@ -45,16 +135,124 @@ class VITSJaProsModel:
         speed_scale: float = 1,
         noise_scale: float = 0.667,
         noise_scale_dur: float = 0.8,
+        latent_stretch: float = 1,
     ) -> Tuple[int, np.ndarray]:
-        self.model.decode_conf.update(
-            alpha=1 / speed_scale,
-            noise_scale=noise_scale,
-            noise_scale_dur=noise_scale_dur,
-        )
-        int_tensor = np.array(self.converter.tokens2ids(tokens))
+        ids = self.converter.tokens2ids(tokens)
+        text = torch.tensor([ids], dtype=torch.long, device=self.device)
+        text_lengths = torch.tensor([len(ids)], dtype=torch.long, device=self.device)
+        if self.seed is not None:
+            set_all_random_seed(self.seed)
         with torch.no_grad():
-            tensor = self.model(int_tensor)["wav"]
-        return self.model.fs, tensor.view(-1).cpu().numpy()
+            wav, _, _ = self.generator.inference(
+                text=text,
+                text_lengths=text_lengths,
+                noise_scale=noise_scale,
+                noise_scale_dur=noise_scale_dur,
+                alpha=1 / speed_scale,
+                decoder_chunk_size=self.decoder_chunk_size,
+                latent_stretch=latent_stretch,
+            )
+        return self.fs, wav.view(-1).cpu().numpy()
+
+    def tokens2speech_batch(
+        self,
+        tokens_list: List[List[str]],
+        speed_scale: float = 1,
+        noise_scale: float = 0.667,
+        noise_scale_dur: float = 0.8,
+        batch_size: int = 16,
+        latent_stretch: float = 1,
+    ) -> Tuple[int, List[np.ndarray]]:
+        """
+        複数のトークン列をまとめて音声合成する。
+        長さ順に並べてから`batch_size`ずつパディングしてVITSGeneratorに通し、
+        予測された長さで各音声を切り出して、入力と同じ順番で返す。
+        デコーダの畳み込みには後ろのパディングが入り込むので、短い文の末尾
+        （デコーダの受容野の分）は1文ずつ合成したときとわずかに異なる。
+        テキストエンコーダの位置ごとの畳み込みのカーネルが1より大きい場合
+        （`conf/finetune.yaml`では3）は最後の音素にも入り込み、長さが変わることもある。
+        """
+        generator = self.generator
+        ids_list = [self.converter.tokens2ids(tokens) for tokens in tokens_list]
+        # パディングを減らすため、長い順に並べてからバッチを作る
+        order = sorted(range(len(ids_list)), key=lambda i: -len(ids_list[i]))
+        waves: List[Optional[np.ndarray]] = [None] * len(ids_list)
+        if self.seed is not None:
+            set_all_random_seed(self.seed)
+        with torch.no_grad():
+            for start in range(0, len(order), batch_size):
+                indices = order[start : start + batch_size]
+                text = pad_list(
+                    [torch.tensor(ids_list[i], dtype=torch.long) for i in indices], 0
+                ).to(self.device)
+                text_lengths = torch.tensor(
+                    [len(ids_list[i]) for i in indices],
+                    dtype=torch.long,
+                    device=self.device,
+                )
+                wav, _, dur = generator.inference(
+                    text=text,
+                    text_lengths=text_lengths,
+                    noise_scale=noise_scale,
+                    noise_scale_dur=noise_scale_dur,
+                    alpha=1 / speed_scale,
+                    decoder_chunk_size=self.decoder_chunk_size,
+                    latent_stretch=latent_stretch,
+                )
+                # 予測された長さ（フレーム数）からパディング部分を落とす
+                feats_lengths = torch.clamp_min(dur.sum(1), 1).long()
+                if latent_stretch != 1:
+                    feats_lengths = (feats_lengths * latent_stretch).long()
+                wav_lengths = feats_lengths * generator.upsample_factor
+                wav = wav.cpu().numpy()
+                for j, i in enumerate(indices):
+                    waves[i] = wav[j, : wav_lengths[j]]
+        return self.fs, waves
+
+    def p2speech_batch(
+        self,
+        p_list: List[str],
+        speed_scale: float = 1,
+        pitch_scale: float = 1,
+        intonation_scale: float = 1,
+        noise_scale: float = 0.667,
+        noise_scale_dur: float = 0.8,
+        batch_size: int = 16,
+    ) -> Tuple[int, List[np.ndarray]]:
+        tokens_list = [p2tokens(p) for p in p_list]
+        # バッチの組み方で乱数の使われ方が変わるので、シードがあってもノイズがあれば
+        # キャッシュしない
+        keys = [
+            self._cache_key(
+                tokens,
+                speed_scale,
+                pitch_scale,
+                intonation_scale,
+                noise_scale,
+                noise_scale_dur,
+                batched=True,
+            )
+            for tokens in tokens_list
+        ]
+        waves = [None if key is None else self.cache.get(key) for key in keys]
+        missing = [i for i, wave in enumerate(waves) if wave is None]
+        if len(missing) == 0:
+            return self.fs, waves
+
+        fs, new_waves = self.tokens2speech_batch(
+            [tokens_list[i] for i in missing],
+            speed_scale,
+            noise_scale,
+            noise_scale_dur,
+            batch_size,
+            latent_stretch=self._latent_stretch(pitch_scale),
+        )
+        for i, wave in zip(missing, new_waves):
+            wave = self.change_pitch(fs, wave, pitch_scale, intonation_scale)
+            if keys[i] is not None:
+                self.cache.put(keys[i], wave)
+            waves[i] = wave
+        return fs, waves
 
     def p2speech(
         self,
@@ -65,30 +263,377 @@ class VITSJaProsModel:
         noise_scale: float = 0.667,
         noise_scale_dur: float = 0.8,
     ) -> Tuple[int, np.ndarray]:
+        tokens = p2tokens(p)
+        key = self._cache_key(
+            tokens,
+            speed_scale,
+            pitch_scale,
+            intonation_scale,
+            noise_scale,
+            noise_scale_dur,
+        )
+        if key is not None:
+            wave = self.cache.get(key)
+            if wave is not None:
+                return self.fs, wave
+
         fs, wave = self.tokens2speech(
-            p2tokens(p), speed_scale, noise_scale, noise_scale_dur
+            tokens,
+            speed_scale,
+            noise_scale,
+            noise_scale_dur,
+            latent_stretch=self._latent_stretch(pitch_scale),
         )
+        wave = self.change_pitch(fs, wave, pitch_scale, intonation_scale)
+        if key is not None:
+            self.cache.put(key, wave)
+        return fs, wave
+
+    def _cache_key(
+        self,
+        tokens: List[str],
+        speed_scale: float,
+        pitch_scale: float,
+        intonation_scale: float,
+        noise_scale: float,
+        noise_scale_dur: float,
+        batched: bool = False,
+    ) -> Optional[str]:
+        """キャッシュを使えないときは`None`を返す"""
+        if self.cache is None:
+            return None
+        use_noise = noise_scale != 0 or noise_scale_dur != 0
+        if use_noise and (self.seed is None or batched):
+            return None
+        params = dict(
+            alpha=1 / speed_scale,
+            noise_scale=noise_scale,
+            noise_scale_dur=noise_scale_dur,
+            pitch_scale=pitch_scale,
+            intonation_scale=intonation_scale,
+            pitch_method=self.pitch_method,
+            f0_method=self.f0_method,
+            dtype=self.dtype,
+            backend=self.backend,
+            precision=self.precision,
+            keep_fp32=None if self.keep_fp32 is None else list(self.keep_fp32),
+            seed=self.seed if use_noise else None,
+        )
+        return self.cache.make_key(self.checkpoint_hash(), tokens, params)
+
+    def checkpoint_hash(self) -> str:
+        """キャッシュのキーに使う`pth`ファイルのハッシュ（最初に呼ばれたときに計算する）"""
+        if self._checkpoint_hash is None:
+            self._checkpoint_hash = file_hash(self.model_path)
+        return self._checkpoint_hash
+
+    def p2speech_stream(
+        self,
+        p: str,
+        speed_scale: float = 1,
+        pitch_scale: float = 1,
+        intonation_scale: float = 1,
+        noise_scale: float = 0.667,
+        noise_scale_dur: float = 0.8,
+        crossfade_ms: float = 10,
+    ) -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        音素列をポーズ・文末ごとに区切って順に合成し、できた分から返すジェネレータ。
+        つなぎ目は`crossfade_ms`ミリ秒だけクロスフェードするので、
+        最後の部分は次の塊ができるまで手元に残しておく。
+        """
+        tail = None
+        for chunk in split_p(p):
+            fs, wave = self.p2speech(
+                chunk,
+                speed_scale,
+                pitch_scale,
+                intonation_scale,
+                noise_scale,
+                noise_scale_dur,
+            )
+            fade_len = int(fs * crossfade_ms / 1000)
+            if tail is not None:
+                n = min(fade_len, len(tail), len(wave))
+                fade_in = np.linspace(0, 1, n, dtype=wave.dtype)
+                head = tail[len(tail) - n :] * (1 - fade_in) + wave[:n] * fade_in
+                wave = np.concatenate([tail[: len(tail) - n], head, wave[n:]])
+            keep = min(fade_len, len(wave) // 2)
+            tail = wave[len(wave) - keep :]
+            wave = wave[: len(wave) - keep]
+            yield fs, wave
+        if tail is not None and len(tail) > 0:
+            yield fs, tail
+
+    def _latent_stretch(self, pitch_scale: float) -> float:
+        return pitch_scale if self.pitch_method == "latent" else 1
+
+    def change_pitch(
+        self,
+        fs: int,
+        wave: np.ndarray,
+        pitch_scale: float = 1,
+        intonation_scale: float = 1,
+    ) -> np.ndarray:
+        """
+        音程・抑揚を変える。`pitch_method`が"latent"のときは、`wave`は
+        `latent_stretch=pitch_scale`で合成されたものとする。
+        """
+        if self.pitch_method == "latent" and pitch_scale != 1:
+            # 伸ばして合成した音声を元の長さに戻すと、音程がpitch_scale倍になる
+            wave = librosa.resample(
+                wave, orig_sr=round(fs * pitch_scale), target_sr=fs
+            )
+            pitch_scale = 1
 
         if pitch_scale == 1 and intonation_scale == 1:
-            return fs, wave
+            return wave
 
         # pyworldでf0を加工して合成
         # pyworldよりもよいのがあるかもしれないが……
 
-        wave = wave.astype(np.double)
-        f0, t = pyworld.harvest(wave, fs)
-        # 質が高そうだしとりあえずharvestにしておく
-        # rmvpeが使えたらそれがいいのかも……？
+        # float32からfloat64への変換だけで済ませ、既にfloat64なら複製しない
+        wave = np.ascontiguousarray(wave, dtype=np.float64)
+        if self.f0_method == "dio":
+            f0, t = pyworld.dio(wave, fs)
+            f0 = pyworld.stonemask(wave, f0, t, fs)
+        else:
+            # 質が高そうだしとりあえずharvestにしておく
+            # rmvpeが使えたらそれがいいのかも……？
+            f0, t = pyworld.harvest(wave, fs)
         sp = pyworld.cheaptrick(wave, f0, t, fs)
         ap = pyworld.d4c(wave, f0, t, fs)
 
-        non_zero_f0 = [f for f in f0 if f != 0]
-        f0_mean = sum(non_zero_f0) / len(non_zero_f0)
+        if not (f0 != 0).any():
+            return wave
+        f0 = scale_f0(f0, pitch_scale, intonation_scale)
 
-        for i, f in enumerate(f0):
-            if f == 0:
-                continue
-            f0[i] = pitch_scale * f0_mean + intonation_scale * (f - f0_mean)
+        return pyworld.synthesize(f0, sp, ap, fs)
 
-        wave = pyworld.synthesize(f0, sp, ap, fs)
-        return fs, wave
+
+def scale_f0(
+    f0: np.ndarray, pitch_scale: float = 1, intonation_scale: float = 1
+) -> np.ndarray:
+    """
+    有声部分（0でないところ）のf0を、平均をpitch_scale倍に、平均からの差を
+    intonation_scale倍にする（`f0`をその場で書き換える）。
+    """
+    voiced = f0 != 0
+    if not voiced.any():
+        return f0
+    f0_mean = f0[voiced].mean()
+    f0[voiced] = pitch_scale * f0_mean + intonation_scale * (f0[voiced] - f0_mean)
+    return f0
+
+
+def find_model_files(
+    model_dir: str, prefer_slim: bool = True
+) -> Tuple[str, Optional[str]]:
+    """
+    モデルディレクトリから`pth`ファイルと（あれば）`config.yaml`のパスを探す。
+    `prefer_slim`なら、`slim_model.py`で作った`*.slim.pth`があればそちらを返す。
+    """
+    files = os.listdir(model_dir)
+    slim_files = [f for f in files if f.endswith(SLIM_SUFFIX)]
+    pth_files = [f for f in files if f.endswith(".pth") and f not in slim_files]
+    if prefer_slim and len(slim_files) > 0:
+        pth_files = slim_files
+    if len(pth_files) == 0:
+        raise ValueError(f"`{model_dir}`に`pth`ファイルがありません。")
+    elif len(pth_files) > 1:
+        raise ValueError(f"`{model_dir}`に`pth`ファイルが複数あります。")
+    yaml_file = os.path.join(model_dir, "config.yaml")
+    if not os.path.exists(yaml_file):
+        yaml_file = None
+    return os.path.join(model_dir, pth_files[0]), yaml_file
+
+
+class ModelRegistry:
+    """
+    読み込んだモデルを(モデルディレクトリ, デバイス, dtype)ごとに保持するLRUキャッシュ。
+    最近使ったモデルに切り替えるときは読み込みし直さずに済む。
+    `max_models`個を超えたら最も長く使われていないものを捨てる。
+    `backend`と`precision`は全てのモデルで共通（`VITSJaProsModel`を参照）。
+    ただし`precision`がint8でもGPUで読み込むモデルはfloat32にする。
+    `swap`を使うと、合成を止めずにモデルを読み込み直せる。
+    `swap`で`model_root`以外のファイル（学習中のチェックポイント等）に差し替えたモデルは、
+    捨てられた後に`get`で読み込み直すときもそのファイルを使う。
+    `get`での読み込みはロックの外で行うので、その間も他のモデルは使え、
+    同じモデルを同時に要求したときは1回だけ読み込んでその結果を待つ。
+    """
+
+    def __init__(
+        self,
+        model_root: str = "weights",
+        max_models: int = 2,
+        cache: Optional[SynthesisCache] = None,
+        backend: str = "torch",
+        precision: str = "fp32",
+    ):
+        self.model_root = model_root
+        self.max_models = max_models
+        self.cache = cache
+        self.backend = backend
+        self.precision = precision
+        self.models: "OrderedDict[Tuple[str, str, str], VITSJaProsModel]" = (
+            OrderedDict()
+        )
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.RLock()
+        # `swap`で差し替えたモデルの(model_path, config_path)
+        self.overrides: Dict[Tuple[str, str, str], Tuple[str, Optional[str]]] = {}
+        # `get`で読み込み中のモデル
+        self._loading: Dict[Tuple[str, str, str], Future] = {}
+        # `swap`するたびに増やし、`get`の読み込み中に差し替えられたかを調べる
+        self._swap_count: Dict[Tuple[str, str, str], int] = {}
+
+    def get(
+        self,
+        model_name: str,
+        device: str = "cpu",
+        dtype: str = "float32",
+        reload: bool = False,
+    ) -> VITSJaProsModel:
+        """
+        モデルを返す。無ければ（`reload`なら常に）読み込む。`reload`のときは、
+        読み込み終わるまで今のモデルを残しておくので、その分メモリを多く使う。
+        """
+        key = self._key(model_name, device, dtype)
+        with self.lock:
+            if key in self.models and not reload:
+                self.hits += 1
+                self.models.move_to_end(key)
+                return self.models[key]
+            future = self._loading.get(key)
+            if future is None:
+                self.misses += 1
+                future = self._loading[key] = Future()
+                swap_count = self._swap_count.get(key, 0)
+                model_path, config_path = self.overrides.get(key, (None, None))
+                loading = True
+            else:
+                loading = False
+        if not loading:
+            # 他のスレッドが読み込み中なので、それを待つ
+            return future.result()
+
+        try:
+            if model_path is None:
+                model_path, config_path = find_model_files(key[0])
+            model = self._create(model_name, model_path, config_path, device, dtype)
+        except BaseException as e:
+            with self.lock:
+                del self._loading[key]
+            future.set_exception(e)
+            raise
+        with self.lock:
+            del self._loading[key]
+            if self._swap_count.get(key, 0) != swap_count and key in self.models:
+                # 読み込み中に`swap`で差し替えられたときは、そちらを使う
+                model = self.models[key]
+                self.models.move_to_end(key)
+            else:
+                self._put(key, model)
+        future.set_result(model)
+        return model
+
+    def swap(
+        self,
+        model_name: str,
+        device: str = "cpu",
+        dtype: str = "float32",
+        model_path: Optional[str] = None,
+        config_path: Optional[str] = None,
+    ) -> VITSJaProsModel:
+        """
+        新しいインスタンスを読み込み終わってから、`get`で返すモデルをそれに差し替える。
+        読み込みの間はロックを取らないので、他のリクエストは今のモデルで合成を続けられ、
+        差し替える前に始まった合成は古いモデルのまま最後まで行われる。
+        `model_path`を指定すると、そのファイルを`swapped_path`として覚えておき、
+        捨てられた後に`get`で読み込み直すときもそれを使う。
+        省略すると、`model_root`のモデルを読み込み直して、覚えていたファイルを忘れる。
+        """
+        key = self._key(model_name, device, dtype)
+        override = model_path is not None
+        if not override:
+            model_path, config_path = find_model_files(key[0])
+        model = self._create(model_name, model_path, config_path, device, dtype)
+        if self.cache is not None:
+            # 最初の合成で待たないように、ハッシュも先に計算しておく
+            model.checkpoint_hash()
+        with self.lock:
+            if override:
+                self.overrides[key] = (model_path, config_path)
+            else:
+                self.overrides.pop(key, None)
+            self._swap_count[key] = self._swap_count.get(key, 0) + 1
+            # 古いモデルは、使っているリクエストが終われば解放される
+            self._put(key, model)
+        return model
+
+    def swapped_path(
+        self, model_name: str, device: str = "cpu", dtype: str = "float32"
+    ) -> Optional[str]:
+        """`swap`で差し替えたファイル（`model_root`のモデルを使っているときはNone）"""
+        with self.lock:
+            override = self.overrides.get(self._key(model_name, device, dtype))
+            return None if override is None else override[0]
+
+    def _key(self, model_name: str, device: str, dtype: str) -> Tuple[str, str, str]:
+        return (os.path.join(self.model_root, model_name), device, dtype)
+
+    def _put(self, key: Tuple[str, str, str], model: VITSJaProsModel):
+        """`self.lock`を取った状態で呼ぶ"""
+        self.models.pop(key, None)
+        self.models[key] = model
+        while len(self.models) > self.max_models:
+            self.evict(next(iter(self.models)))
+
+    def _create(
+        self,
+        model_name: str,
+        model_path: str,
+        config_path: Optional[str],
+        device: str,
+        dtype: str,
+    ) -> VITSJaProsModel:
+        return VITSJaProsModel(
+            model_name,
+            model_path,
+            config_path,
+            device=device,
+            dtype=dtype,
+            cache=self.cache,
+            backend=self.backend,
+            precision=(
+                "fp32"
+                if self.precision == "int8" and device != "cpu"
+                else self.precision
+            ),
+        )
+
+    def preload(
+        self, model_names: Sequence[str], device: str = "cpu", dtype: str = "float32"
+    ):
+        for model_name in model_names:
+            self.get(model_name, device, dtype)
+
+    def evict(self, key: Tuple[str, str, str]):
+        with self.lock:
+            model = self.models.pop(key, None)
+            if model is None:
+                return
+            uses_cuda = model.device == "cuda"
+            del model
+            gc.collect()
+            if uses_cuda:
+                torch.cuda.empty_cache()
+
+    def clear(self):
+        with self.lock:
+            for key in list(self.models):
+                self.evict(key)
+
+    def stats(self) -> Dict[str, int]:
+        return dict(hits=self.hits, misses=self.misses, size=len(self.models))
@@ -0,0 +1,158 @@
+"""
+CPUでの合成を速くするため、VITSGeneratorの一部の層をbf16かint8（動的量子化）にする。
+
+対象はテキストエンコーダ（Conformer）・flow・デコーダ（HiFiGAN）の中のConv1dとLinear
+（bf16ではConvTranspose1dも）で、duration predictorとテキストエンコーダの出力層は
+音素の長さに直接効くので常にfloat32のまま。
+それ以外にもfloat32のままにしたい層は、モジュール名のパターン（fnmatch形式、
+例えば`decoder.upsamples.*`）で指定できる。
+
+python precision.py --model-name {model_name}
+
+で、float32と比べた合成時間と、スペクトル距離（対数スペクトル距離、dB）を表示する。
+"""
+import argparse
+import os
+import time
+from fnmatch import fnmatch
+from typing import List, Optional, Sequence
+
+import librosa
+import numpy as np
+import torch
+from torch.ao.nn.quantized import dynamic as nnqd
+from torch.ao.quantization import default_dynamic_qconfig, quantize_dynamic
+
+from slim_model import remove_weight_norm
+
+PRECISIONS = ("fp32", "bf16", "int8")
+TARGET_SCOPES = ("text_encoder.encoder", "flow", "decoder")
+# 波形やflowの出力を直接決める層は、既定でfloat32のままにする
+DEFAULT_KEEP_FP32 = ("decoder.output_conv.*", "flow.flows.*.proj")
+
+
+def _to_bf16(module: torch.nn.Module, args):
+    return tuple(
+        x.to(torch.bfloat16) if torch.is_tensor(x) and x.is_floating_point() else x
+        for x in args
+    )
+
+
+def _to_fp32(module: torch.nn.Module, args, output: torch.Tensor):
+    return output.float()
+
+
+def set_precision(
+    generator: torch.nn.Module,
+    precision: str = "fp32",
+    keep_fp32: Optional[Sequence[str]] = None,
+) -> List[str]:
+    """
+    `generator`の対象の層を`precision`にして（その場で書き換える）、変えた層の名前を返す。
+    `keep_fp32`はfloat32のままにする層の名前のパターンで、省略時は`DEFAULT_KEEP_FP32`。
+    bf16にした層は入力をbf16にして計算し、出力をfloat32に戻すので、
+    層の外の計算はfloat32のまま。
+    """
+    if precision not in PRECISIONS:
+        raise ValueError("precisionはfp32かbf16かint8である必要があります。")
+    if precision == "fp32":
+        return []
+    if keep_fp32 is None:
+        keep_fp32 = DEFAULT_KEEP_FP32
+    remove_weight_norm(generator)
+
+    types = (torch.nn.Conv1d, torch.nn.Linear)
+    if precision == "bf16":
+        types += (torch.nn.ConvTranspose1d,)
+    names = [
+        name
+        for name, m in generator.named_modules()
+        if isinstance(m, types)
+        and any(name.startswith(scope + ".") for scope in TARGET_SCOPES)
+        and not any(fnmatch(name, pattern) for pattern in keep_fp32)
+    ]
+
+    if precision == "int8":
+        # 名前で指定した層だけを量子化する（型で指定するとkeep_fp32の層まで変わる）
+        quantize_dynamic(
+            generator,
+            {name: default_dynamic_qconfig for name in names},
+            dtype=torch.qint8,
+            mapping={torch.nn.Linear: nnqd.Linear, torch.nn.Conv1d: nnqd.Conv1d},
+            inplace=True,
+        )
+    else:
+        for name in names:
+            m = generator.get_submodule(name)
+            m.to(torch.bfloat16)
+            m.register_forward_pre_hook(_to_bf16)
+            m.register_forward_hook(_to_fp32)
+    return names
+
+
+def log_spectral_distance(ref: np.ndarray, wave: np.ndarray) -> float:
+    """対数振幅スペクトルの二乗平均平方根誤差（dB、フレームの平均）"""
+    n = min(len(ref), len(wave))
+    ref_db, wave_db = (
+        20 * np.log10(np.abs(librosa.stft(x[:n].astype(np.float32))) + 1e-5)
+        for x in (ref, wave)
+    )
+    return float(np.mean(np.sqrt(np.mean((ref_db - wave_db) ** 2, axis=0))))
+
+
+if __name__ == "__main__":
+    from export_model import check_texts
+    from model import VITSJaProsModel, find_model_files
+    from text import g2tokens
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model-root", type=str, default="weights")
+    parser.add_argument("--model-name", type=str, required=True)
+    parser.add_argument(
+        "--precision", type=str, nargs="+", default=["bf16", "int8"], choices=PRECISIONS
+    )
+    parser.add_argument(
+        "--keep-fp32",
+        type=str,
+        nargs="*",
+        default=None,
+        help="float32のままにする層の名前のパターン",
+    )
+    parser.add_argument("--num-runs", type=int, default=5)
+    args = parser.parse_args()
+
+    model_path, config_path = find_model_files(
+        os.path.join(args.model_root, args.model_name)
+    )
+    models = {
+        precision: VITSJaProsModel(
+            args.model_name,
+            model_path,
+            config_path,
+            device="cpu",
+            precision=precision,
+            keep_fp32=args.keep_fp32,
+        )
+        for precision in ["fp32", *args.precision]
+    }
+    for text in check_texts:
+        tokens = g2tokens(text)
+        print(f"---\n{text}")
+        ref = None
+        for precision, model in models.items():
+            fs, wave = model.tokens2speech(tokens, noise_scale=0, noise_scale_dur=0)
+            start = time.perf_counter()
+            for _ in range(args.num_runs):
+                model.tokens2speech(tokens, noise_scale=0, noise_scale_dur=0)
+            elapsed = (time.perf_counter() - start) / args.num_runs
+            message = f"{precision}: {elapsed * 1000:.0f}ミリ秒"
+            if ref is None:
+                ref, ref_elapsed = wave, elapsed
+            else:
+                message += (
+                    f"（{ref_elapsed / elapsed:.2f}倍速）、"
+                    f"スペクトル距離 {log_spectral_distance(ref, wave):.2f}dB"
+                )
+                if len(wave) != len(ref):
+                    message += f"、長さ {len(wave) / fs:.2f}秒（fp32 {len(ref) / fs:.2f}秒）"
+            print(message)
@@ -1,19 +1,39 @@
 import argparse
 import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Optional
 
 import librosa
 import numpy as np
 import soundfile as sf
+import torch
 from tqdm import tqdm
 
-from espnet2.text.phoneme_tokenizer import pyopenjtalk_g2p_prosody
+from conf.train_args import train_args
+from espnet2.fileio.packed_npy import (
+    PackedNpyReader,
+    PackedNpyWriter,
+    PackedSoundReader,
+)
+from espnet2.fileio.read_text import load_num_sequence_text, read_2columns_text
+from espnet2.tasks.gan_tts import GANTTSTask
+from espnet2.train.dataset import ESPnetDataset
+from espnet2.tts.feats_extract.linear_spectrogram import LinearSpectrogram
 
 
 sampling_rate = 44100
 
 num_of_tokens = 47  # 使用される最大のトークン数、固定値
 
+# conf/train_args.pyの--feats_extract_confと同じ値
+n_fft = 2048
+hop_length = 512
+
+# WindowsのProcessPoolExecutorで使えるプロセス数の上限
+max_workers = 61
+
 
 def dump_dir_of(model_name: str) -> str:
     return os.path.join(output_dir, model_name, "dump")
@@ -28,12 +48,61 @@ def normalize_wav(wav_path: str, output_dir: str):
         wav = librosa.resample(wav, orig_sr=sr, target_sr=sampling_rate)
     wav = librosa.effects.trim(wav, top_db=30)[0]
     normalized_wav = librosa.util.normalize(wav) * 0.9
-    sf.write(
-        os.path.join(output_dir, os.path.basename(wav_path)),
-        normalized_wav,
-        sampling_rate,
-        "PCM_16",
+    # 途中で止まったときに書きかけのファイルが正規化済みと見なされないよう、
+    # 一時ファイルに書いてから置き換える
+    output_path = os.path.join(output_dir, os.path.basename(wav_path))
+    tmp_path = output_path + ".tmp"
+    sf.write(tmp_path, normalized_wav, sampling_rate, "PCM_16", format="WAV")
+    os.replace(tmp_path, output_path)
+
+
+def is_up_to_date(src_path: str, dst_path: str) -> bool:
+    """出力が存在して、元ファイルより新しければTrue"""
+    if not os.path.exists(dst_path):
+        return False
+    return os.path.getmtime(dst_path) >= os.path.getmtime(src_path)
+
+
+def normalize_wavs(wav_paths: List[str], output_dir: str, num_workers: int = 1):
+    """
+    `normalize_wav`を複数プロセスで並列に実行する。
+    すでに正規化済み（出力が元ファイルより新しい）のものは飛ばすので、再実行は差分のみ。
+    Windowsでは`num_workers`は`max_workers`までに抑える。
+    """
+    if sys.platform == "win32":
+        num_workers = min(num_workers, max_workers)
+    todo = [
+        path
+        for path in wav_paths
+        if not is_up_to_date(path, os.path.join(output_dir, os.path.basename(path)))
+    ]
+    skipped = len(wav_paths) - len(todo)
+    if skipped > 0:
+        print(f"{skipped}ファイルは正規化済みなのでスキップします。")
+
+    start = time.perf_counter()
+    progress = tqdm(
+        total=len(todo), desc="wavファイルの正規化中...", unit="file", file=sys.stdout
     )
+    if num_workers <= 1:
+        for path in todo:
+            normalize_wav(path, output_dir)
+            progress.update()
+    else:
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            futures = [
+                executor.submit(normalize_wav, path, output_dir) for path in todo
+            ]
+            for future in as_completed(futures):
+                future.result()
+                progress.update()
+    progress.close()
+    elapsed = time.perf_counter() - start
+    if len(todo) > 0:
+        print(
+            f"{len(todo)}ファイルを{elapsed:.1f}秒で正規化しました"
+            f"（{len(todo) / elapsed:.1f}ファイル/秒、{num_workers}プロセス）。"
+        )
 
 
 def split_data_and_dump(
@@ -42,6 +111,7 @@ def split_data_and_dump(
     wavs_dir: str,
     normalized_wavs_dir: str,
     valid_count: int = 5,
+    num_workers: int = 1,
 ):
     dump_dir = dump_dir_of(model_name)
     for folder in ["train", "valid"]:
@@ -60,8 +130,11 @@ def split_data_and_dump(
     common_wavs.sort()
 
     # Normalize common wavs
-    for wav in tqdm(common_wavs, desc="wavファイルの正規化中...", file=sys.stdout):
-        normalize_wav(os.path.join(wavs_dir, wav + ".wav"), normalized_wavs_dir)
+    normalize_wavs(
+        [os.path.join(wavs_dir, wav + ".wav") for wav in common_wavs],
+        normalized_wavs_dir,
+        num_workers=num_workers,
+    )
 
     # Split into training and validation
     valid_wavs = common_wavs[:valid_count]
@@ -85,6 +158,82 @@ def split_data_and_dump(
                 )
 
 
+def training_args(model_name: str, output_dir: str) -> argparse.Namespace:
+    """`conf/train_args.py`の学習の引数（前処理の設定を学習時と揃えるのに使う）"""
+    return GANTTSTask.get_parser().parse_args(
+        [arg.format(model_name=model_name, output_dir=output_dir) for arg in train_args]
+    )
+
+
+def write_text_int(text_path: str, text_int_path: str, preprocessor):
+    """`text`の各文を`preprocessor`でトークンIDに変換して`text_int_path`に書き込む"""
+    with open(text_int_path, "w", encoding="utf-8") as f_out:
+        for wav, text in read_2columns_text(text_path).items():
+            ids = preprocessor(wav, {"text": text})["text"]
+            f_out.write(f"{wav} {' '.join(map(str, ids))}\n")
+
+
+def check_text_int(text_path: str, text_int_path: str, preprocessor):
+    """
+    `text_int`を学習時と同じ`ESPnetDataset`で読んだ結果が、以前の学習のように
+    `text`をその場で`preprocessor`に通した結果と一致するか確かめる
+    """
+    on_the_fly = ESPnetDataset([(text_path, "text", "text")], preprocess=preprocessor)
+    dumped = ESPnetDataset(
+        [(text_int_path, "text", "text_int")], preprocess=preprocessor
+    )
+    if list(dumped) != list(on_the_fly):
+        raise ValueError(f"{text_int_path}の文が{text_path}と一致しません。")
+    for wav in on_the_fly:
+        expected = on_the_fly[wav][1]["text"]
+        actual = dumped[wav][1]["text"]
+        if actual.dtype != expected.dtype or not np.array_equal(actual, expected):
+            raise ValueError(f"{wav}のtext_intがtextの変換結果と一致しません。")
+
+
+def dump_text_int(model_name: str):
+    """
+    `text`をトークンIDに変換して`text_int`に書き込む。
+    学習時と同じ設定の`CommonPreprocessor`（jaconv + pyopenjtalk_prosody）を使うので、
+    学習中に毎サンプル・毎エポックg2pを走らせる代わりにこれを読めばよい。
+    """
+    dump_dir = dump_dir_of(model_name)
+    preprocessor = GANTTSTask.build_preprocess_fn(
+        training_args(model_name, output_dir), train=True
+    )
+    for folder in ["train", "valid"]:
+        text_path = os.path.join(dump_dir, folder, "text")
+        text_int_path = os.path.join(dump_dir, folder, "text_int")
+        write_text_int(text_path, text_int_path, preprocessor)
+        check_text_int(text_path, text_int_path, preprocessor)
+
+
+def pack_wav_scp(wav_scp: str, npy_path: str, packed_scp: str):
+    """`wav_scp`のwavをint16のまま`npy_path`にまとめ、各wavの範囲を`packed_scp`に書き込む"""
+    wav_paths = read_2columns_text(wav_scp)
+    lengths = {wav: sf.info(path).frames for wav, path in wav_paths.items()}
+    with PackedNpyWriter(npy_path, packed_scp, lengths, dtype="int16") as writer:
+        for wav, path in wav_paths.items():
+            data, _ = sf.read(path, dtype="int16")
+            writer[wav] = data
+
+
+def pack_wavs(model_name: str):
+    """
+    正規化済みのwavを1つのint16のnpyファイル`dump/{train,valid}/wav.npy`に
+    まとめ、各wavの範囲を`wav_packed.scp`に書き込む。
+    学習時はこれをmmapで読むので、1ファイルずつwavを開かなくて済む。
+    wav.scpとの読み込み時間の比較は`python benchmark_train.py packed_wav`。
+    """
+    dump_dir = dump_dir_of(model_name)
+    for folder in ["train", "valid"]:
+        pack_wav_scp(
+            os.path.join(dump_dir, folder, "wav.scp"),
+            os.path.join(dump_dir, folder, "wav.npy"),
+            os.path.join(dump_dir, folder, "wav_packed.scp"),
+        )
+
+
 def process_shapes(model_name: str):
     """wavとtextの長さを計算してファイルに書き込む"""
     stats_dir = os.path.join(output_dir, model_name, "stats")
@@ -95,32 +244,75 @@ def process_shapes(model_name: str):
         os.makedirs(path, exist_ok=True)
 
     for folder in ["train", "valid"]:
-        with open(
-            os.path.join(dump_dir, folder, "text"),
-            "r",
-            encoding="utf-8",
-        ) as f_text:
-            lines = f_text.readlines()
+        text_ints = load_num_sequence_text(
+            os.path.join(dump_dir, folder, "text_int"), "text_int"
+        )
 
-        # 各行に対してg2pを適用してトークンの長さを計算
+        # トークン化済みのtext_intからトークンの長さを計算
         with open(
             os.path.join(stats_dir, folder, "text_shape.phn"), "w", encoding="utf-8"
         ) as f_out:
-            for line in lines:
-                wav, text = line.strip().split(" ", 1)
-                tokens = pyopenjtalk_g2p_prosody(text)
-                f_out.write(f"{wav} {len(tokens)},{num_of_tokens}\n")
+            for wav, ids in text_ints.items():
+                f_out.write(f"{wav} {len(ids)},{num_of_tokens}\n")
 
-        # 各wavに対してlibrosaを用いて長さを計算
+        # wav_packed.scpに書かれた範囲からwavの長さを計算
         with open(
-            os.path.join(dump_dir, folder, "wav.scp"), "r", encoding="utf-8"
+            os.path.join(dump_dir, folder, "wav_packed.scp"), "r", encoding="utf-8"
         ) as f_wavscp, open(
             os.path.join(stats_dir, folder, "speech_shape"), "w", encoding="utf-8"
         ) as f_out:
             for line in f_wavscp:
                 wav, path = line.strip().split(" ", 1)
-                y, _ = librosa.load(path, sr=None)
-                f_out.write(f"{wav} {len(y)}\n")
+                _, start, end = path.rsplit(":", 2)
+                f_out.write(f"{wav} {int(end) - int(start)}\n")
+
+
+def write_feats(
+    packed_scp: str, npy_path: str, scp_path: str, desc: Optional[str] = None
+):
+    """
+    `packed_scp`の各wavの線形スペクトログラムを計算して、`npy_path`にまとめて書き込む
+    """
+    reader = PackedSoundReader(packed_scp, dtype="float32")
+    feats_extract = LinearSpectrogram(
+        n_fft=n_fft, win_length=None, hop_length=hop_length
+    )
+    # center=TrueのSTFTなのでフレーム数は len // hop_length + 1
+    ranges = PackedNpyReader(packed_scp)
+    lengths = {wav: len(ranges[wav]) // hop_length + 1 for wav in ranges}
+    with PackedNpyWriter(
+        npy_path, scp_path, lengths, (feats_extract.output_size(),)
+    ) as writer:
+        for wav in tqdm(reader, desc=desc, file=sys.stdout):
+            with torch.no_grad():
+                feats, _ = feats_extract(torch.from_numpy(reader[wav])[None])
+            writer[wav] = feats[0].numpy()
+
+
+def dump_feats(model_name: str):
+    """
+    学習時に毎ステップ計算している線形スペクトログラムを事前に計算し、
+    `dump/{train,valid}/feats.npy`にまとめて書き込む（学習時はmmapで読む）。
+    STFTと読み込みの時間の比較は`python benchmark_train.py feats`。
+    """
+    dump_dir = dump_dir_of(model_name)
+    for folder in ["train", "valid"]:
+        write_feats(
+            os.path.join(dump_dir, folder, "wav_packed.scp"),
+            os.path.join(dump_dir, folder, "feats.npy"),
+            os.path.join(dump_dir, folder, "feats.scp"),
+            desc=f"{folder}の特徴量を計算中...",
+        )
+
+
+def remove_feats(model_name: str):
+    """古い特徴量が学習に使われないように削除する"""
+    dump_dir = dump_dir_of(model_name)
+    for folder in ["train", "valid"]:
+        for name in ["feats.npy", "feats.scp"]:
+            path = os.path.join(dump_dir, folder, name)
+            if os.path.exists(path):
+                os.remove(path)
 
 
 if __name__ == "__main__":
@@ -129,6 +321,17 @@ if __name__ == "__main__":
     parser.add_argument("--output-dir", type=str, default="outputs")
     parser.add_argument("--wavs-dir", type=str, required=True)
     parser.add_argument("--model-name", type=str, required=True)
+    parser.add_argument(
+        "--num-workers",
+        type=int,
+        default=min(max_workers, os.cpu_count() or 1),
+        help="wavファイルの正規化に使うプロセス数",
+    )
+    parser.add_argument(
+        "--dump-feats",
+        action="store_true",
+        help="学習で使う線形スペクトログラムを事前に計算して保存する",
+    )
 
     args = parser.parse_args()
 
@@ -150,8 +353,21 @@ if __name__ == "__main__":
         wavs_dir=wavs_dir,
         normalized_wavs_dir=normalized_wavs_dir,
         valid_count=5,
+        num_workers=args.num_workers,
     )
     print("完了！")
+    print("wavファイルを1つにまとめています...")
+    pack_wavs(model_name=model_name)
+    print("完了！")
+    print("textをトークンIDに変換しています...")
+    dump_text_int(model_name=model_name)
+    print("完了！")
     print("wavとtextの長さを計算しています...")
     process_shapes(model_name=model_name)
+    if args.dump_feats:
+        print("完了！")
+        print("線形スペクトログラムを計算しています...")
+        dump_feats(model_name=model_name)
+    else:
+        remove_feats(model_name=model_name)
     print("完了！前処理が完了しました。")
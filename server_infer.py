@@ -0,0 +1,307 @@
+"""
+WebUIを使わずにHTTPで音声合成するサーバー。
+
+- `POST /g2p`: `{"text": "こんにちは"}` → `{"p": "コ[ンニチワ"}`
+- `POST /synthesize`: `{"model": "model1", "p": "コ[ンニチワ"}` → wavファイル
+  （`p`の代わりに`text`を渡すとg2pしてから合成する。
+  `speed_scale`等の設定は`webui_infer.py`と同じ名前で渡せ、省略したときの値も
+  WebUIのスライダーの初期値と同じ。noise_scale・noise_scale_durは0で、
+  `VITSJaProsModel.p2speech`の既定値（0.667・0.8）とは違うので注意）
+
+同時に来たリクエストは少しだけ待ってまとめ、同じモデル・同じ設定のものは
+`p2speech_batch`で一度に合成する。まとめた合成に失敗したときは1件ずつ合成し直し、
+失敗したリクエストにだけエラーを返す。待ち行列がいっぱいのときは503を返す。
+`--watch`を付けると、学習中の既定のモデルの新しいチェックポイントを、
+合成を止めずに読み込んで差し替える（`checkpoint_watcher.py`を参照）。
+"""
+import argparse
+import io
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import soundfile as sf
+
+from checkpoint_watcher import CheckpointWatcher
+from model import ModelRegistry, VITSJaProsModel
+from synthesis_cache import SynthesisCache
+from text import g2p, p2tokens
+
+# 省略したときの値は`webui_infer.py`のスライダーの初期値に合わせる
+synthesis_params = {
+    "speed_scale": 1.0,
+    "pitch_scale": 1.0,
+    "intonation_scale": 1.0,
+    "noise_scale": 0.0,
+    "noise_scale_dur": 0.0,
+}
+
+
+class SynthesisRequest:
+    def __init__(self, model_name: str, p: str, params: Dict[str, float]):
+        self.model_name = model_name
+        self.p = p
+        self.params = params
+        self.future: Future = Future()
+
+    @property
+    def key(self) -> Tuple[Any, ...]:
+        """同じバッチで合成できるリクエストは同じ値になる"""
+        return (self.model_name, *(self.params[k] for k in synthesis_params))
+
+
+class MicroBatcher:
+    """
+    リクエストを待ち行列に入れ、最初の1件が来てから`window_ms`ミリ秒以内に
+    来たもの（最大`max_batch`件）をまとめて合成するワーカー。
+    """
+
+    def __init__(
+        self,
+        registry: ModelRegistry,
+        device: str = "cpu",
+        max_queue: int = 64,
+        max_batch: int = 8,
+        window_ms: float = 10,
+    ):
+        self.registry = registry
+        self.device = device
+        self.max_batch = max_batch
+        self.window = window_ms / 1000
+        self.queue: "queue.Queue[SynthesisRequest]" = queue.Queue(maxsize=max_queue)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def submit(self, request: SynthesisRequest) -> Future:
+        """待ち行列がいっぱいのときは`queue.Full`を投げる"""
+        self.queue.put_nowait(request)
+        return request.future
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            self._process(batch)
+
+    def _process(self, batch: List[SynthesisRequest]):
+        groups: Dict[Tuple[Any, ...], List[SynthesisRequest]] = {}
+        for request in batch:
+            groups.setdefault(request.key, []).append(request)
+        for requests in groups.values():
+            try:
+                model = self.registry.get(requests[0].model_name, self.device)
+            except Exception as e:
+                for request in requests:
+                    request.future.set_exception(e)
+                continue
+            if len(requests) == 1:
+                self._process_one(model, requests[0])
+                continue
+            try:
+                fs, waves = model.p2speech_batch(
+                    [request.p for request in requests],
+                    **requests[0].params,
+                    batch_size=len(requests),
+                )
+            except Exception:
+                # どのリクエストが原因か分からないので、1件ずつ合成し直す
+                for request in requests:
+                    self._process_one(model, request)
+                continue
+            for request, wave in zip(requests, waves):
+                request.future.set_result((fs, wave))
+
+    def _process_one(self, model: VITSJaProsModel, request: SynthesisRequest):
+        try:
+            fs, wave = model.p2speech(request.p, **request.params)
+        except Exception as e:
+            request.future.set_exception(e)
+            return
+        request.future.set_result((fs, wave))
+
+
+class SynthesisHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(body, dict):
+                raise ValueError
+        except ValueError:
+            self._send_json(400, {"error": "リクエストがJSONではありません。"})
+            return
+
+        if self.path == "/g2p":
+            if "text" not in body:
+                self._send_json(400, {"error": "`text`がありません。"})
+                return
+            self._send_json(200, {"p": g2p(body["text"])})
+        elif self.path == "/synthesize":
+            self._synthesize(body)
+        else:
+            self._send_json(404, {"error": f"`{self.path}`はありません。"})
+
+    def _synthesize(self, body: Dict[str, Any]):
+        model_name = body.get("model", self.server.default_model)
+        if model_name not in os.listdir(self.server.registry.model_root):
+            self._send_json(400, {"error": f"モデル`{model_name}`がありません。"})
+            return
+        if "p" in body:
+            p = body["p"]
+        elif "text" in body:
+            if not isinstance(body["text"], str):
+                self._send_json(400, {"error": "`text`が文字列ではありません。"})
+                return
+            p = g2p(body["text"])
+        else:
+            self._send_json(400, {"error": "`p`か`text`が必要です。"})
+            return
+        # 合成できない`p`は、他のリクエストとまとめる前にここで弾く
+        try:
+            if not isinstance(p, str):
+                raise TypeError
+            p2tokens(p)
+        except Exception:
+            self._send_json(400, {"error": "`p`を音素列として読めません。"})
+            return
+        try:
+            params = {k: float(body.get(k, v)) for k, v in synthesis_params.items()}
+        except (TypeError, ValueError):
+            self._send_json(400, {"error": "設定の値が数値ではありません。"})
+            return
+
+        try:
+            request = SynthesisRequest(model_name, p, params)
+            future = self.server.batcher.submit(request)
+        except queue.Full:
+            self._send_json(503, {"error": "混み合っています。"}, headers={"Retry-After": "1"})
+            return
+        try:
+            fs, wave = future.result(timeout=self.server.timeout_sec)
+        except TimeoutError:
+            self._send_json(504, {"error": "合成がタイムアウトしました。"})
+            return
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+            return
+
+        buffer = io.BytesIO()
+        sf.write(buffer, np.asarray(wave), fs, format="WAV", subtype="PCM_16")
+        data = buffer.getvalue()
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/wav")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_json(
+        self,
+        status: int,
+        obj: Dict[str, Any],
+        headers: Optional[Dict[str, str]] = None,
+    ):
+        data = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--model-root", type=str, default="weights")
+    parser.add_argument("--model", type=str, default=None, help="既定のモデル名")
+    parser.add_argument("--device", type=str, default="cpu")
+    parser.add_argument("--max-models", type=int, default=2)
+    parser.add_argument("--max-queue", type=int, default=64)
+    parser.add_argument("--max-batch", type=int, default=8)
+    parser.add_argument("--window-ms", type=float, default=10)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--cache-dir", type=str, default=None)
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument(
+        "--backend",
+        type=str,
+        default="torch",
+        choices=["torch", "onnx", "torchscript"],
+        help="onnxかtorchscriptのときは`export_model.py`で書き出したモデルを使う",
+    )
+    parser.add_argument(
+        "--precision",
+        type=str,
+        default="fp32",
+        choices=["fp32", "bf16", "int8"],
+        help="int8はCPUのみ（詳細は`precision.py`を参照）",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="学習中の既定のモデルの新しいチェックポイントを自動で読み込む",
+    )
+    parser.add_argument("--watch-epoch", type=int, default=0, help="0なら最新を追う")
+    parser.add_argument("--watch-interval", type=float, default=10)
+    parser.add_argument("--output-root", type=str, default="outputs")
+    args = parser.parse_args()
+
+    models = sorted(
+        d
+        for d in os.listdir(args.model_root)
+        if os.path.isdir(os.path.join(args.model_root, d))
+    )
+    if len(models) == 0:
+        raise ValueError(f"{args.model_root}ディレクトリにディレクトリがありません。")
+    default_model = args.model if args.model is not None else models[0]
+
+    cache = None if args.no_cache else SynthesisCache(args.cache_dir)
+    registry = ModelRegistry(
+        args.model_root,
+        max_models=args.max_models,
+        cache=cache,
+        backend=args.backend,
+        precision=args.precision,
+    )
+    registry.preload([default_model], args.device)
+    if args.watch:
+        watcher = CheckpointWatcher(registry, args.output_root, args.watch_interval)
+        watcher.watch(
+            default_model,
+            args.device,
+            epoch=args.watch_epoch if args.watch_epoch > 0 else None,
+        )
+    batcher = MicroBatcher(
+        registry,
+        device=args.device,
+        max_queue=args.max_queue,
+        max_batch=args.max_batch,
+        window_ms=args.window_ms,
+    )
+    batcher.start()
+
+    server = ThreadingHTTPServer((args.host, args.port), SynthesisHandler)
+    server.registry = registry
+    server.batcher = batcher
+    server.default_model = default_model
+    server.timeout_sec = args.timeout
+    print(f"http://{args.host}:{args.port} で待機しています...")
+    server.serve_forever()
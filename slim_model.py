@@ -0,0 +1,164 @@
+"""
+音声合成に使わない部分を落とした軽量なモデルファイル（`*.slim.pth`）を作る。
+
+python slim_model.py --model-name {model_name} [--fp16]
+
+学習で保存される`{数字}epoch.pth`には識別器や事後エンコーダ等の合成に使わない重みも
+入っており、読み込むときは学習時と同じ手順で全体を組み立てる必要がある。
+`*.slim.pth`にはVITSGeneratorの合成に使う重み（weight normは外したもの）と組み立てに
+必要な設定だけを入れ、読み込むときは重みをメモリマップするので、読み込みが速く
+メモリも少なくて済む。`--fp16`を付けるとfloat16で保存してファイルが半分になる
+（float32で合成するときは読み込み時に変換するので、メモリマップの効果は無くなる）。
+
+`weights/{model_name}`に`*.slim.pth`があれば、元の`pth`ファイルより優先して使われる。
+学習時に`--inference_snapshot_dir`を指定すると、同じ形式のファイルが毎エポック保存される。
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, Tuple
+
+import torch
+from espnet2.gan_tts.vits.generator import VITSGenerator
+from espnet2.gan_tts.vits.inference_snapshot import SNAPSHOT_SUFFIX, inference_snapshot
+from espnet2.gan_tts.vits.vits import AVAILABLE_GENERATERS
+from espnet2.tasks.tts import TTSTask
+
+SLIM_SUFFIX = SNAPSHOT_SUFFIX
+
+
+def remove_weight_norm(module: torch.nn.Module):
+    """`module`の全ての層からweight normを外す"""
+
+    def _remove_weight_norm(m: torch.nn.Module):
+        try:
+            torch.nn.utils.remove_weight_norm(m)
+        except ValueError:  # weight normが無い層
+            return
+
+    module.apply(_remove_weight_norm)
+
+
+def slim_checkpoint(
+    model_path: str, config_path: str, out_path: str, fp16: bool = False
+):
+    """`model_path`から合成に必要な部分だけを取り出して`out_path`に保存する"""
+    model, args = TTSTask.build_model_from_file(config_path, model_path, "cpu")
+    if args.tts != "vits":
+        raise ValueError("このモデルはVITSではありません。")
+    # 事後エンコーダ（teacher forcingでしか使わない）を落とし、weight normを外す
+    checkpoint = inference_snapshot(
+        model.state_dict(),
+        vars(args),
+        aux_channels=(
+            model.feats_extract.output_size() if args.odim is None else args.odim
+        ),
+        fs=model.tts.fs,
+        source=os.path.basename(model_path),
+    )
+    if fp16:
+        checkpoint["state_dict"] = {
+            k: v.half() if v.is_floating_point() else v
+            for k, v in checkpoint["state_dict"].items()
+        }
+    torch.save(checkpoint, out_path)
+
+
+def load_slim_generator(
+    path: str, device: str = "cpu", dtype: str = "float32"
+) -> Tuple[VITSGenerator, Dict[str, Any]]:
+    """
+    `slim_checkpoint`で保存したファイルからVITSGeneratorを組み立てる。
+    重みはメモリマップしたものをそのまま使う（dtypeとdeviceが同じとき）。
+    生成器と、重み以外の情報の辞書を返す。
+    """
+    checkpoint = torch.load(path, map_location="cpu", mmap=True, weights_only=True)
+    state_dict = checkpoint.pop("state_dict")
+    generator_class = AVAILABLE_GENERATERS[checkpoint["generator_type"]]
+    generator = generator_class(**checkpoint["generator_params"])
+    generator.posterior_encoder = None
+    remove_weight_norm(generator)
+    # assign=Trueで、初期化した重みをコピーせずにメモリマップした重みに置き換える
+    state_dict = {
+        k: v.to(dtype=getattr(torch, dtype)) if v.is_floating_point() else v
+        for k, v in state_dict.items()
+    }
+    generator.load_state_dict(state_dict, assign=True)
+    generator.to(device).eval()
+    return generator, checkpoint
+
+
+def _measure_load(model_path: str, config_path: str):
+    """新しいプロセスの中で呼ばれ、モデルの読み込み時間と増えたメモリ量を表示する"""
+    from model import VITSJaProsModel
+
+    try:
+        import psutil
+
+        process = psutil.Process()
+    except ImportError:
+        process = None
+    rss = process.memory_info().rss if process is not None else 0
+    start = time.perf_counter()
+    VITSJaProsModel("benchmark", model_path, config_path, device="cpu")
+    seconds = time.perf_counter() - start
+    if process is not None:
+        rss = (process.memory_info().rss - rss) / 1024 / 1024
+    else:
+        rss = None
+    print(json.dumps(dict(seconds=seconds, rss_mb=rss)))
+
+
+def benchmark(model_path: str, slim_path: str, config_path: str):
+    """元のファイルと軽量なファイルを、それぞれ新しいプロセスで読み込んで比べる"""
+    for name, path in [("元のファイル", model_path), ("軽量なファイル", slim_path)]:
+        result = subprocess.run(
+            [sys.executable, __file__, "--measure-load", path, "--config", config_path],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        stats = json.loads(result.stdout.strip().splitlines()[-1])
+        size = os.path.getsize(path) / 1024 / 1024
+        message = f"{name}（{size:.0f}MB）: 読み込み {stats['seconds']:.2f}秒"
+        if stats["rss_mb"] is not None:
+            message += f"、メモリ増加 {stats['rss_mb']:.0f}MB"
+        print(message)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model-root", type=str, default="weights")
+    parser.add_argument("--model-name", type=str)
+    parser.add_argument("--fp16", action="store_true", help="float16で保存する")
+    parser.add_argument(
+        "--no-benchmark", action="store_true", help="読み込み時間の比較をしない"
+    )
+    parser.add_argument("--measure-load", type=str, help=argparse.SUPPRESS)
+    parser.add_argument("--config", type=str, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure_load is not None:
+        _measure_load(args.measure_load, args.config)
+        sys.exit()
+    if args.model_name is None:
+        parser.error("--model-nameが必要です。")
+
+    from model import find_model_files
+
+    model_dir = os.path.join(args.model_root, args.model_name)
+    model_path, config_path = find_model_files(model_dir, prefer_slim=False)
+    if config_path is None:
+        config_path = "conf/config.yaml"
+    slim_path = model_path[: -len(".pth")] + SLIM_SUFFIX
+
+    print("---")
+    print("合成に使わない部分を取り除いています...")
+    slim_checkpoint(model_path, config_path, slim_path, fp16=args.fp16)
+    print(f"完了！{slim_path}に保存しました。")
+    if not args.no_benchmark:
+        print("読み込み時間を比べています...")
+        benchmark(model_path, slim_path, config_path)
@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+def file_hash(path: str) -> str:
+    """ファイルの中身のsha256"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class SynthesisCache:
+    """
+    合成した音声を、モデル（チェックポイントのハッシュ）・トークン列・合成設定ごとに
+    保存しておくキャッシュ。同じ文を何度も合成するときに使う。
+
+    メモリ上のLRUキャッシュ（`max_memory_mb`まで）と、`cache_dir`を指定した場合は
+    ディスク上のキャッシュ（`max_disk_mb`まで、古く使われたものから削除）の2段構え。
+    返す音声は書き換えられないようにしてある（`flags.writeable`が`False`）。
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        max_memory_mb: float = 256,
+        max_disk_mb: float = 2048,
+    ):
+        self.cache_dir = cache_dir
+        self.max_memory_bytes = int(max_memory_mb * 1024 * 1024)
+        self.max_disk_bytes = int(max_disk_mb * 1024 * 1024)
+        self.memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self.memory_bytes = 0
+        # ディスク上のファイルの大きさを、古く使われた順に持っておく
+        self.disk: "OrderedDict[str, int]" = OrderedDict()
+        self.disk_bytes = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._load_disk_index()
+
+    @staticmethod
+    def make_key(model_hash: str, tokens: List[str], params: Dict[str, Any]) -> str:
+        data = json.dumps([model_hash, tokens, params], sort_keys=True)
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self.lock:
+            if key in self.memory:
+                self.memory_hits += 1
+                self.memory.move_to_end(key)
+                return self.memory[key]
+            if key in self.disk:
+                path = self._path_of(key)
+                try:
+                    os.utime(path)  # 再起動した後も、最近使ったものとして残す
+                    wave = np.load(path)
+                except FileNotFoundError:
+                    # 外から消された
+                    self.disk_bytes -= self.disk.pop(key)
+                else:
+                    self.disk_hits += 1
+                    self.disk.move_to_end(key)
+                    wave.flags.writeable = False
+                    self._put_memory(key, wave)
+                    return wave
+            self.misses += 1
+            return None
+
+    def put(self, key: str, wave: np.ndarray):
+        # 呼び出し元が後で書き換えても、キャッシュの中身は変わらないようにする
+        wave = np.array(wave)
+        wave.flags.writeable = False
+        with self.lock:
+            self._put_memory(key, wave)
+            if self.cache_dir is None or key in self.disk:
+                return
+            # 書き込みの途中で落ちても壊れたファイルが残らないように、
+            # 一時ファイルに書いてから置き換える
+            fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=self.cache_dir)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    np.save(f, wave)
+                os.replace(tmp_path, self._path_of(key))
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+            self.disk[key] = os.path.getsize(self._path_of(key))
+            self.disk_bytes += self.disk[key]
+            self._evict_disk()
+
+    def stats(self) -> Dict[str, int]:
+        return dict(
+            memory_hits=self.memory_hits,
+            disk_hits=self.disk_hits,
+            misses=self.misses,
+            memory_items=len(self.memory),
+            memory_bytes=self.memory_bytes,
+            disk_items=len(self.disk),
+            disk_bytes=self.disk_bytes,
+        )
+
+    def _put_memory(self, key: str, wave: np.ndarray):
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            return
+        self.memory[key] = wave
+        self.memory_bytes += wave.nbytes
+        while self.memory_bytes > self.max_memory_bytes and len(self.memory) > 1:
+            _, old = self.memory.popitem(last=False)
+            self.memory_bytes -= old.nbytes
+
+    def _path_of(self, key: str) -> Optional[str]:
+        if self.cache_dir is None:
+            return None
+        return os.path.join(self.cache_dir, key + ".npy")
+
+    def _load_disk_index(self):
+        """起動時に一度だけ`cache_dir`を調べて、ファイルを最後に使われた順に並べる"""
+        files = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith(".tmp"):
+                # 書き込みの途中で落ちたときの残り
+                os.remove(path)
+            elif name.endswith(".npy"):
+                st = os.stat(path)
+                files.append((st.st_mtime, name[: -len(".npy")], st.st_size))
+        for _, key, size in sorted(files):
+            self.disk[key] = size
+            self.disk_bytes += size
+        self._evict_disk()
+
+    def _evict_disk(self):
+        while self.disk_bytes > self.max_disk_bytes and len(self.disk) > 0:
+            key, size = self.disk.popitem(last=False)
+            self.disk_bytes -= size
+            try:
+                os.remove(self._path_of(key))
+            except FileNotFoundError:
+                pass
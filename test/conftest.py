@@ -0,0 +1,58 @@
+import pytest
+import torch
+import yaml
+
+from espnet2.gan_tts.vits.generator import VITSGenerator
+from slim_model import SLIM_SUFFIX, remove_weight_norm
+
+TOKEN_LIST = "conf/tokens.txt"
+# 学習済みモデル無しで動かすための小さな生成器の設定
+TINY_GENERATOR_PARAMS = dict(
+    aux_channels=65,
+    hidden_channels=16,
+    text_encoder_attention_heads=2,
+    text_encoder_ffn_expand=2,
+    text_encoder_blocks=1,
+    text_encoder_positionwise_layer_type="conv1d",
+    text_encoder_positionwise_conv_kernel_size=1,
+    use_conformer_conv_in_text_encoder=False,
+    decoder_channels=16,
+    decoder_upsample_scales=[4, 4],
+    decoder_upsample_kernel_sizes=[8, 8],
+    decoder_resblock_kernel_sizes=[3],
+    decoder_resblock_dilations=[[1, 3]],
+    posterior_encoder_layers=2,
+    flow_flows=2,
+    flow_layers=2,
+    stochastic_duration_predictor_flows=2,
+    stochastic_duration_predictor_dds_conv_layers=2,
+)
+
+
+@pytest.fixture
+def tiny_model_files(tmp_path):
+    """乱数で初期化した小さなVITSGeneratorの`*.slim.pth`と`config.yaml`を作る"""
+    with open(TOKEN_LIST, encoding="utf-8") as f:
+        token_list = [line.rstrip("\n") for line in f]
+    params = dict(TINY_GENERATOR_PARAMS, vocabs=len(token_list))
+    torch.manual_seed(0)
+    generator = VITSGenerator(**params)
+    generator.posterior_encoder = None
+    remove_weight_norm(generator)
+    model_path = str(tmp_path / f"1epoch{SLIM_SUFFIX}")
+    torch.save(
+        dict(
+            generator_type="vits_generator",
+            generator_params=params,
+            fs=16000,
+            source="1epoch.pth",
+            state_dict=generator.state_dict(),
+        ),
+        model_path,
+    )
+    config_path = str(tmp_path / "config.yaml")
+    with open(config_path, "w", encoding="utf-8") as f:
+        yaml.safe_dump(
+            dict(tts="vits", g2p="pyopenjtalk_prosody", token_list=token_list), f
+        )
+    return model_path, config_path
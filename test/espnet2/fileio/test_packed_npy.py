@@ -0,0 +1,127 @@
+import numpy as np
+import pytest
+import soundfile as sf
+
+from espnet2.fileio.packed_npy import (
+    PackedNpyReader,
+    PackedNpyWriter,
+    PackedSoundReader,
+)
+from espnet2.fileio.read_text import read_2columns_text
+from espnet2.fileio.sound_scp import SoundScpReader
+from espnet2.train.dataset import ESPnetDataset
+
+
+def make_arrays(shape=(5,), dtype="float32", seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        f"utt{i}": rng.standard_normal((int(rng.integers(1, 50)), *shape)).astype(dtype)
+        for i in range(10)
+    }
+
+
+@pytest.mark.parametrize(
+    "shape, dtype", [((), "float32"), ((5,), "float32"), ((3, 4), "float64")]
+)
+def test_write_read(tmp_path, shape, dtype):
+    arrays = make_arrays(shape, dtype)
+    npyfile, scpfile = tmp_path / "feats.npy", tmp_path / "feats.scp"
+    lengths = {k: len(v) for k, v in arrays.items()}
+    with PackedNpyWriter(npyfile, scpfile, lengths, shape, dtype) as writer:
+        # The writing order does not have to follow the lengths
+        for k in reversed(list(arrays)):
+            writer[k] = arrays[k]
+
+    reader = PackedNpyReader(scpfile)
+    assert len(reader) == len(arrays)
+    assert set(reader) == set(arrays)
+    assert "utt0" in reader and "unknown" not in reader
+    for k, v in arrays.items():
+        assert reader[k].dtype == np.dtype(dtype)
+        np.testing.assert_array_equal(reader[k], v)
+    # All the items share one memory-mapped file
+    assert len(reader.arrays) == 1
+    assert isinstance(reader["utt0"], np.memmap)
+
+
+def test_scp_ranges(tmp_path):
+    npyfile, scpfile = tmp_path / "feats.npy", tmp_path / "feats.scp"
+    with PackedNpyWriter(npyfile, scpfile, {"a": 2, "b": 3}) as writer:
+        writer["a"] = np.zeros(2, dtype=np.float32)
+        writer["b"] = np.ones(3, dtype=np.float32)
+    assert scpfile.read_text(encoding="utf-8") == (
+        f"a {npyfile}:0:2\nb {npyfile}:2:5\n"
+    )
+    np.testing.assert_array_equal(np.load(npyfile), [0, 0, 1, 1, 1])
+
+
+def test_shape_mismatch(tmp_path):
+    with PackedNpyWriter(
+        tmp_path / "feats.npy", tmp_path / "feats.scp", {"a": 2}, (3,)
+    ) as writer:
+        with pytest.raises(RuntimeError, match="Shape mismatch for a"):
+            writer["a"] = np.zeros((3, 3), dtype=np.float32)
+        with pytest.raises(RuntimeError, match="Shape mismatch for a"):
+            writer["a"] = np.zeros((2, 4), dtype=np.float32)
+
+
+def test_dataset_packed_npy(tmp_path):
+    arrays = make_arrays()
+    npyfile, scpfile = tmp_path / "feats.npy", tmp_path / "feats.scp"
+    lengths = {k: len(v) for k, v in arrays.items()}
+    with PackedNpyWriter(npyfile, scpfile, lengths, (5,)) as writer:
+        for k, v in arrays.items():
+            writer[k] = v
+    dataset = ESPnetDataset([(str(scpfile), "feats", "packed_npy")])
+    for k, v in arrays.items():
+        _, data = dataset[k]
+        assert data["feats"].dtype == np.float32
+        np.testing.assert_array_equal(data["feats"], v)
+
+
+@pytest.fixture
+def wav_scp(tmp_path):
+    rng = np.random.default_rng(0)
+    scpfile = tmp_path / "wav.scp"
+    with scpfile.open("w", encoding="utf-8") as f:
+        for i in range(5):
+            wave = rng.uniform(-1, 1, int(rng.integers(100, 2000)))
+            # Include the full range of int16 (-32768 and 32767)
+            wave[:2] = [-1.0, 1.0]
+            path = tmp_path / f"utt{i}.wav"
+            sf.write(path, wave, 16000, "PCM_16")
+            f.write(f"utt{i} {path}\n")
+    return str(scpfile)
+
+
+def pack(wav_scp, tmp_path):
+    paths = read_2columns_text(wav_scp)
+    lengths = {k: sf.info(p).frames for k, p in paths.items()}
+    scpfile = tmp_path / "wav_packed.scp"
+    with PackedNpyWriter(
+        tmp_path / "wav.npy", scpfile, lengths, dtype="int16"
+    ) as writer:
+        for k, p in paths.items():
+            writer[k] = sf.read(p, dtype="int16")[0]
+    return str(scpfile)
+
+
+@pytest.mark.parametrize("dtype", [None, "float32", "float64"])
+def test_packed_sound_matches_sound_scp(wav_scp, tmp_path, dtype):
+    expected = SoundScpReader(wav_scp, dtype=dtype or "float64")
+    reader = PackedSoundReader(pack(wav_scp, tmp_path), dtype=dtype)
+    assert list(reader) == list(expected)
+    for k in expected:
+        _, wave = expected[k]
+        assert reader[k].dtype == wave.dtype
+        np.testing.assert_array_equal(reader[k], wave)
+
+
+def test_dataset_packed_sound_matches_sound(wav_scp, tmp_path):
+    packed_scp = pack(wav_scp, tmp_path)
+    expected = ESPnetDataset([(wav_scp, "speech", "sound")])
+    dataset = ESPnetDataset([(packed_scp, "speech", "packed_sound")])
+    for k in expected:
+        wave = expected[k][1]["speech"]
+        assert dataset[k][1]["speech"].dtype == wave.dtype
+        np.testing.assert_array_equal(dataset[k][1]["speech"], wave)
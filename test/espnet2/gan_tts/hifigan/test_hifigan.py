@@ -0,0 +1,65 @@
+import pytest
+import torch
+
+from espnet2.gan_tts.hifigan import HiFiGANGenerator
+
+
+def make_generator_args(**kwargs):
+    defaults = dict(
+        in_channels=5,
+        out_channels=1,
+        channels=32,
+        global_channels=-1,
+        kernel_size=7,
+        upsample_scales=[4, 2, 2],
+        upsample_kernel_sizes=[8, 4, 4],
+        resblock_kernel_sizes=[3, 7],
+        resblock_dilations=[[1, 3, 5], [1, 3, 5]],
+        use_additional_convs=True,
+        bias=True,
+        nonlinear_activation="LeakyReLU",
+        nonlinear_activation_params={"negative_slope": 0.1},
+        use_weight_norm=True,
+    )
+    defaults.update(kwargs)
+    return defaults
+
+
+@pytest.mark.parametrize(
+    "dict_g",
+    [
+        {},
+        {"use_additional_convs": False},
+        {"upsample_scales": [5, 3], "upsample_kernel_sizes": [10, 6]},
+        {"global_channels": 4},
+    ],
+)
+@pytest.mark.parametrize("total_len", [1, 37, 64, 101])
+@pytest.mark.parametrize("chunk_size", [1, 4, 16, 32])
+def test_hifigan_chunked_forward(dict_g, total_len, chunk_size):
+    torch.manual_seed(0)
+    args = make_generator_args(**dict_g)
+    model = HiFiGANGenerator(**args).eval()
+    c = torch.randn(2, args["in_channels"], total_len)
+    g = None
+    if args["global_channels"] > 0:
+        g = torch.randn(2, args["global_channels"], 1)
+    with torch.no_grad():
+        y = model(c, g=g)
+        y_chunked = model.chunked_forward(c, g=g, chunk_size=chunk_size)
+    assert y_chunked.shape == y.shape
+    # chunk_size smaller than the receptive field is also covered
+    torch.testing.assert_close(y_chunked, y, rtol=0, atol=1e-5)
+
+
+def test_hifigan_chunked_forward_with_short_context():
+    # The windows must differ from the full decode if the context is too short,
+    # otherwise the above test cannot detect a wrong receptive field
+    torch.manual_seed(0)
+    args = make_generator_args()
+    model = HiFiGANGenerator(**args).eval()
+    c = torch.randn(1, args["in_channels"], 64)
+    with torch.no_grad():
+        y = model(c)
+        y_chunked = model.chunked_forward(c, chunk_size=8, context=0)
+    assert not torch.allclose(y_chunked, y, rtol=0, atol=1e-5)
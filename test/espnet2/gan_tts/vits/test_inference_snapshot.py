@@ -0,0 +1,26 @@
+import pytest
+import torch
+
+from espnet2.gan_tts.vits.inference_snapshot import fold_weight_norm
+
+
+@pytest.mark.parametrize(
+    "module, dim",
+    [
+        (torch.nn.Conv1d(4, 8, 3), 0),
+        (torch.nn.Conv1d(4, 1, 3), 0),
+        (torch.nn.ConvTranspose1d(8, 4, 4), 1),
+        (torch.nn.Linear(5, 3), 0),
+    ],
+)
+def test_fold_weight_norm_matches_remove_weight_norm(module, dim):
+    torch.nn.utils.weight_norm(module, dim=dim)
+    with torch.no_grad():
+        module.weight_g.uniform_(0.5, 2.0)
+    model = torch.nn.Sequential(module)
+    folded = fold_weight_norm(model.state_dict())
+    torch.nn.utils.remove_weight_norm(module)
+    expected = model.state_dict()
+    assert sorted(folded) == sorted(expected)
+    for k in expected:
+        torch.testing.assert_close(folded[k], expected[k])
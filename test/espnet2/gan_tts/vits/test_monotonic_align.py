@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+import torch
+
+from espnet2.gan_tts.vits.monotonic_align import (
+    is_cython_avalable,
+    maximum_path_numba,
+    maximum_path_torch,
+)
+
+if is_cython_avalable:
+    from espnet2.gan_tts.vits.monotonic_align.core import maximum_path_c
+
+
+def make_inputs(t_ys, t_xs, seed=0, ties=False):
+    torch.manual_seed(seed)
+    B, T_feats, T_text = len(t_ys), max(t_ys), max(t_xs)
+    neg_x_ent = torch.randn(B, T_feats, T_text)
+    if ties:
+        # Many equal scores to check that ties are broken in the same way
+        neg_x_ent = neg_x_ent.round()
+    feats_mask = torch.arange(T_feats)[None] < torch.tensor(t_ys)[:, None]
+    text_mask = torch.arange(T_text)[None] < torch.tensor(t_xs)[:, None]
+    attn_mask = (feats_mask.unsqueeze(2) & text_mask.unsqueeze(1)).float()
+    return neg_x_ent, attn_mask
+
+
+def reference_paths(neg_x_ent, attn_mask):
+    """Run the numba (and the cython if built) version in the same way as
+    ``maximum_path``."""
+    values = neg_x_ent.numpy().astype(np.float32)
+    t_ys = attn_mask.sum(1)[:, 0].numpy().astype(np.int32)
+    t_xs = attn_mask.sum(2)[:, 0].numpy().astype(np.int32)
+    path = np.zeros(values.shape, dtype=np.int32)
+    maximum_path_numba(path, values.copy(), t_ys, t_xs)
+    paths = [path]
+    if is_cython_avalable:
+        path = np.zeros(values.shape, dtype=np.int32)
+        maximum_path_c(path, values.copy(), t_ys, t_xs)
+        paths.append(path)
+    return paths
+
+
+def random_lengths(rng, B):
+    t_xs = rng.integers(1, 20, B)
+    t_ys = t_xs + rng.integers(0, 30, B)
+    return t_ys.tolist(), t_xs.tolist()
+
+
+@pytest.mark.parametrize(
+    "t_ys, t_xs",
+    [
+        ([5], [5]),  # T_text == T_feats
+        ([7, 4, 9], [7, 4, 9]),
+        ([1], [1]),
+        ([6], [1]),  # T_text == 1
+        ([6, 3, 1], [1, 1, 1]),
+        ([9, 5, 12], [9, 1, 3]),
+    ],
+)
+@pytest.mark.parametrize("ties", [False, True])
+def test_maximum_path_torch_edge_cases(t_ys, t_xs, ties):
+    neg_x_ent, attn_mask = make_inputs(t_ys, t_xs, ties=ties)
+    path = maximum_path_torch(neg_x_ent, attn_mask).int().numpy()
+    for expected in reference_paths(neg_x_ent, attn_mask):
+        np.testing.assert_array_equal(path, expected)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_maximum_path_torch_random(seed):
+    rng = np.random.default_rng(seed)
+    t_ys, t_xs = random_lengths(rng, int(rng.integers(1, 9)))
+    neg_x_ent, attn_mask = make_inputs(t_ys, t_xs, seed=seed, ties=seed % 4 == 0)
+    path = maximum_path_torch(neg_x_ent, attn_mask).int().numpy()
+    for expected in reference_paths(neg_x_ent, attn_mask):
+        np.testing.assert_array_equal(path, expected)
+    # Each valid frame is aligned to exactly one token
+    np.testing.assert_array_equal(path.sum(2), attn_mask[:, :, 0].numpy())
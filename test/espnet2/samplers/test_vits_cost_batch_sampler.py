@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+
+from espnet2.samplers.vits_cost_batch_sampler import (
+    DEFAULT_COST_CONF,
+    VITSCostBatchSampler,
+    batch_cost,
+    fit_cost_conf,
+)
+
+HOP_LENGTH = DEFAULT_COST_CONF["hop_length"]
+
+
+@pytest.fixture
+def shape_files(tmp_path):
+    rng = np.random.default_rng(0)
+    text_shape = tmp_path / "text_shape.phn"
+    speech_shape = tmp_path / "speech_shape"
+    with text_shape.open("w") as ft, speech_shape.open("w") as fs:
+        for i in range(500):
+            num_frames = int(rng.integers(20, 1000))
+            # The text length roughly follows the speech length
+            text = max(int(num_frames * rng.uniform(0.1, 0.3)), 1)
+            speech = (num_frames - 1) * HOP_LENGTH + int(rng.integers(HOP_LENGTH))
+            ft.write(f"utt{i} {text},45\n")
+            fs.write(f"utt{i} {speech}\n")
+    return str(text_shape), str(speech_shape)
+
+
+def load_lengths(shape_files):
+    lengths = {}
+    for text_line, speech_line in zip(*(open(f) for f in shape_files)):
+        key, text = text_line.split()
+        _, speech = speech_line.split()
+        lengths[key] = (int(text.split(",")[0]), int(speech) // HOP_LENGTH + 1)
+    return lengths
+
+
+def padded_cost(sampler, lengths, keys):
+    text = max(lengths[k][0] for k in keys)
+    feats = max(lengths[k][1] for k in keys)
+    return sampler.batch_cost(text, feats, len(keys))
+
+
+@pytest.mark.parametrize("batch_bins", [3000, 20000, 100000])
+@pytest.mark.parametrize("sort_batch", ["ascending", "descending"])
+def test_every_utterance_once_within_budget(shape_files, batch_bins, sort_batch):
+    sampler = VITSCostBatchSampler(batch_bins, shape_files, sort_batch=sort_batch)
+    lengths = load_lengths(shape_files)
+    keys = [k for batch in sampler for k in batch]
+    assert sorted(keys) == sorted(lengths)
+    for batch in sampler:
+        # A single utterance over the budget still makes its own mini-batch
+        assert len(batch) == 1 or padded_cost(sampler, lengths, batch) <= batch_bins
+    assert 0 < sampler.utilization <= 1
+    assert 0 <= sampler.padding_waste < 1
+
+
+def test_packing_is_greedy(shape_files):
+    batch_bins = 20000
+    sampler = VITSCostBatchSampler(batch_bins, shape_files, sort_batch="ascending")
+    lengths = load_lengths(shape_files)
+    batches = list(sampler)
+    for batch, next_batch in zip(batches, batches[1:]):
+        # The utterances are sorted by the frames, and then by the text
+        sizes = [lengths[k][::-1] for k in batch]
+        assert sizes == sorted(sizes, reverse=True)
+        # The mini-batch is full: the next utterance would exceed the budget
+        next_key = min(next_batch, key=lambda k: lengths[k][::-1])
+        assert padded_cost(sampler, lengths, batch + (next_key,)) > batch_bins
+
+
+def test_min_batch_size_and_drop_last(shape_files):
+    lengths = load_lengths(shape_files)
+    sampler = VITSCostBatchSampler(3000, shape_files, min_batch_size=4)
+    assert all(len(batch) >= 4 for batch in sampler)
+    assert sorted(k for batch in sampler for k in batch) == sorted(lengths)
+
+    full = VITSCostBatchSampler(20000, shape_files)
+    dropped = VITSCostBatchSampler(20000, shape_files, drop_last=True)
+    # Only the last mini-batch, which is not full, is dropped
+    assert list(dropped) == list(full)[:-1]
+
+
+def test_unknown_cost_conf(shape_files):
+    with pytest.raises(ValueError):
+        VITSCostBatchSampler(20000, shape_files, cost_conf=dict(frames=1.0))
+
+
+def test_fit_cost_conf_recovers_coefficients():
+    rng = np.random.default_rng(0)
+    conf = dict(
+        hop_length=256,
+        feats=1.0,
+        text=0.3,
+        text_square=2.0e-4,
+        text_feats=5.0e-5,
+        utterance=500.0,
+    )
+    batch_size = rng.integers(1, 17, 200)
+    text = rng.integers(10, 300, 200)
+    feats = rng.integers(50, 1500, 200)
+    scale, overhead = 2.0e-6, 0.05
+    seconds = scale * batch_cost(conf, text, feats, batch_size) + overhead
+    fitted, fitted_scale, fitted_overhead = fit_cost_conf(
+        text, feats, batch_size, seconds, hop_length=256
+    )
+    assert fitted.keys() == conf.keys()
+    for k, v in conf.items():
+        assert fitted[k] == pytest.approx(v, rel=1e-4, abs=1e-9)
+    assert fitted_scale == pytest.approx(scale, rel=1e-4)
+    assert fitted_overhead == pytest.approx(overhead, rel=1e-4)
+
+
+def test_fit_cost_conf_needs_frame_dependency():
+    with pytest.raises(ValueError):
+        fit_cost_conf([10, 20, 30], [100, 200, 300], [1, 1, 1], [1.0, 1.0, 1.0], 512)
@@ -0,0 +1,203 @@
+import random
+import re
+
+import pytest
+
+from espnet2.text import phoneme_tokenizer
+from espnet2.text.phoneme_tokenizer import (
+    _numeric_feature_by_regex,
+    _parse_fullcontext_label,
+    pyopenjtalk_g2p_prosody,
+)
+
+
+def old_label_features(lab):
+    # The regex extraction used before the labels were parsed in one pass
+    p3 = re.search(r"\-(.*?)\+", lab).group(1)
+    a1 = _numeric_feature_by_regex(r"/A:([0-9\-]+)\+", lab)
+    a2 = _numeric_feature_by_regex(r"\+(\d+)\+", lab)
+    a3 = _numeric_feature_by_regex(r"\+(\d+)/", lab)
+    f1 = _numeric_feature_by_regex(r"/F:(\d+)_", lab)
+    e3 = _numeric_feature_by_regex(r"!(\d+)_", lab)
+    return p3, a1, a2, a3, f1, e3
+
+
+def old_g2p_prosody(labels, drop_unvoiced_vowels=True):
+    N = len(labels)
+    phones = []
+    for n in range(N):
+        lab_curr = labels[n]
+        p3 = re.search(r"\-(.*?)\+", lab_curr).group(1)
+        if drop_unvoiced_vowels and p3 in "AEIOU":
+            p3 = p3.lower()
+        if p3 == "sil":
+            if n == 0:
+                phones.append("^")
+            elif n == N - 1:
+                e3 = _numeric_feature_by_regex(r"!(\d+)_", lab_curr)
+                if e3 == 0:
+                    phones.append("$")
+                elif e3 == 1:
+                    phones.append("?")
+            continue
+        elif p3 == "pau":
+            phones.append("_")
+            continue
+        else:
+            phones.append(p3)
+        a1 = _numeric_feature_by_regex(r"/A:([0-9\-]+)\+", lab_curr)
+        a2 = _numeric_feature_by_regex(r"\+(\d+)\+", lab_curr)
+        a3 = _numeric_feature_by_regex(r"\+(\d+)/", lab_curr)
+        f1 = _numeric_feature_by_regex(r"/F:(\d+)_", lab_curr)
+        a2_next = _numeric_feature_by_regex(r"\+(\d+)\+", labels[n + 1])
+        if a3 == 1 and a2_next == 1 and p3 in "aeiouAEIOUNcl":
+            phones.append("#")
+        elif a1 == 0 and a2_next == a2 + 1 and a2 != f1:
+            phones.append("]")
+        elif a2 == 1 and a2_next == 2:
+            phones.append("[")
+    return phones
+
+
+def make_label(
+    phones, n, a="xx+xx+xx", e="xx_xx!xx_xx-xx", f="xx_xx#xx_xx@xx_xx|xx_xx"
+):
+    p = ["xx", "xx", *phones, "xx", "xx"]
+    return (
+        f"{p[n]}^{p[n + 1]}-{p[n + 2]}+{p[n + 3]}={p[n + 4]}/A:{a}/B:xx-xx_xx"
+        f"/C:xx_xx+xx/D:xx+xx_xx/E:{e}/F:{f}/G:xx_xx%xx_xx_xx/H:xx_xx"
+        "/I:1-5@1+1&1-1|1+5/J:xx_xx/K:1+1-5"
+    )
+
+
+def make_labels(breath_groups, question=False):
+    """Build HTS labels like OpenJTalk from accent phrases.
+
+    Args:
+        breath_groups: List of breath groups separated by pauses, each a list of
+            accent phrases ``(moras, accent_type)`` where ``moras`` is a list of
+            phoneme lists.
+
+    """
+    # (phoneme, a1, a2, a3, f1) for each phoneme, None for sil/pau
+    entries = [("sil", None)]
+    for i, group in enumerate(breath_groups):
+        if i > 0:
+            entries.append(("pau", None))
+        for moras, accent in group:
+            f1 = len(moras)
+            for a2, mora in enumerate(moras, 1):
+                a1 = a2 - (accent if accent > 0 else f1)
+                for phone in mora:
+                    entries.append((phone, (a1, a2, f1 - a2 + 1, f1, accent)))
+    entries.append(("sil", None))
+    phones = [phone for phone, _ in entries]
+    labels = []
+    for n, (_, feats) in enumerate(entries):
+        if feats is None:
+            e3 = int(question) if n == len(entries) - 1 else "xx"
+            e = f"{len(breath_groups[-1][-1][0])}_1!{e3}_xx-xx"
+            labels.append(make_label(phones, n, e=e))
+        else:
+            a1, a2, a3, f1, accent = feats
+            a = f"{a1}+{a2}+{a3}"
+            f = f"{f1}_{accent}#0_xx@1_1|1_{f1}"
+            labels.append(make_label(phones, n, a=a, e="xx_xx!0_xx-1", f=f))
+    return labels
+
+
+# "こんにちは", "今日は いい 天気ですね、散歩に 行きましょうか？"
+SENTENCES = [
+    (
+        [[([["k", "o"], ["N"], ["n", "i"], ["ch", "i"], ["w", "a"]], 0)]],
+        False,
+        ["^", "k", "o", "[", "N", "n", "i", "ch", "i", "w", "a", "$"],
+    ),
+    (
+        [
+            [
+                ([["ky", "o"], ["o"], ["w", "a"]], 1),
+                ([["i"], ["i"]], 1),
+                (
+                    [["t", "e"], ["N"], ["k", "i"], ["d", "e"], ["s", "U"], ["n", "e"]],
+                    1,
+                ),
+            ],
+            [
+                ([["s", "a"], ["N"], ["p", "o"], ["n", "i"]], 0),
+                (
+                    [["i"], ["k", "i"], ["m", "a"], ["sh", "o"], ["o"], ["k", "a"]],
+                    4,
+                ),
+            ],
+        ],
+        True,
+        None,
+    ),
+]
+
+
+@pytest.fixture
+def fake_labels(monkeypatch):
+    labels = {}
+    monkeypatch.setattr(
+        phoneme_tokenizer, "_extract_fullcontext_label", lambda text: labels[text]
+    )
+    return labels
+
+
+@pytest.mark.parametrize("breath_groups, question, expected", SENTENCES)
+def test_pyopenjtalk_g2p_prosody_matches_regex(
+    fake_labels, breath_groups, question, expected
+):
+    labels = make_labels(breath_groups, question)
+    fake_labels["text"] = labels
+    phones = pyopenjtalk_g2p_prosody("text")
+    assert phones == old_g2p_prosody(labels)
+    assert phones[-1] == ("?" if question else "$")
+    if expected is not None:
+        assert phones == expected
+    for lab in labels:
+        assert _parse_fullcontext_label(lab) == old_label_features(lab)
+
+
+def random_value(rng, signed=False):
+    # Mostly integers so that the fast path is taken, sometimes broken fields
+    if rng.random() < 0.8:
+        value = str(rng.choice([0, 1, 2, 13]))
+    else:
+        value = rng.choice(["xx", "", "1a", "-"])
+    if signed and rng.random() < 0.3:
+        value = "-" + value
+    return value
+
+
+def random_label(rng):
+    phones = [
+        rng.choice(["sil", "pau", "a", "I", "N", "cl", "ky", "xx"]) for _ in range(5)
+    ]
+    a = "+".join(random_value(rng, i == 0) for i in range(rng.choice([3, 3, 3, 2, 4])))
+    e = f"{random_value(rng)}_{random_value(rng)}!{random_value(rng)}_xx-xx"
+    f = f"{random_value(rng)}_{random_value(rng)}#xx_xx@xx_xx|xx_xx"
+    label = make_label(phones, 2, a=a, e=e, f=f)
+    # Drop or duplicate a whole section now and then
+    if rng.random() < 0.1:
+        section = rng.choice(["/A:", "/E:", "/F:", "!"])
+        label = label.replace(section, rng.choice(["/X:", section * 2]), 1)
+    return label
+
+
+def features_or_error(fn, lab):
+    try:
+        return fn(lab)
+    except ValueError:
+        # e.g. "--" matches [0-9\-]+ but is not an integer
+        return ValueError
+
+
+def test_parse_fullcontext_label_matches_regex_random():
+    rng = random.Random(0)
+    for _ in range(20000):
+        lab = random_label(rng)
+        expected = features_or_error(old_label_features, lab)
+        assert features_or_error(_parse_fullcontext_label, lab) == expected, lab
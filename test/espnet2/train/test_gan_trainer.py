@@ -0,0 +1,152 @@
+import dataclasses
+
+import pytest
+import torch
+
+from espnet2.train.distributed_utils import DistributedOption
+from espnet2.train.gan_trainer import GANTrainer, GANTrainerOptions
+from espnet2.train.reporter import Reporter
+
+
+class ToyGAN(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+        torch.manual_seed(0)
+        self.generator = torch.nn.Linear(3, 3)
+        self.discriminator = torch.nn.Sequential(
+            torch.nn.Linear(3, 4), torch.nn.Tanh(), torch.nn.Linear(4, 1)
+        )
+
+    def forward(self, x, y, forward_generator=True):
+        fake = self.generator(x)
+        if forward_generator:
+            # Back-propagated through the discriminator unless it is frozen
+            adv = torch.nn.functional.softplus(-self.discriminator(fake)).mean()
+            loss = adv + ((fake - y) ** 2).mean()
+            optim_idx, turn = 0, "generator"
+        else:
+            real = torch.nn.functional.softplus(-self.discriminator(y)).mean()
+            fake = torch.nn.functional.softplus(self.discriminator(fake.detach()))
+            loss = real + fake.mean()
+            optim_idx, turn = 1, "discriminator"
+        return dict(
+            loss=loss,
+            stats={f"{turn}_loss": loss.detach()},
+            weight=torch.tensor(len(x)),
+            optim_idx=optim_idx,
+        )
+
+
+class RecordingSGD(torch.optim.SGD):
+    """SGD with lr=0 that records the gradients given to each step"""
+
+    def __init__(self, params):
+        super().__init__(params, lr=0.0)
+        self.grads = []
+
+    def step(self, closure=None):
+        self.grads.append(
+            [p.grad.clone() for g in self.param_groups for p in g["params"]]
+        )
+        return super().step(closure)
+
+
+def make_options(**kwargs):
+    options = {f.name: None for f in dataclasses.fields(GANTrainerOptions)}
+    options.update(
+        ngpu=0,
+        grad_noise=False,
+        grad_clip=0.0,
+        grad_clip_type=2.0,
+        log_interval=100,
+        no_forward_run=False,
+        use_wandb=False,
+        unused_parameters=False,
+    )
+    options.update(kwargs)
+    return GANTrainerOptions(**options)
+
+
+def train_grads(batches, accum_grad, generator_first, freeze_inactive_params):
+    model = ToyGAN()
+    optimizers = [
+        RecordingSGD(model.generator.parameters()),
+        RecordingSGD(model.discriminator.parameters()),
+    ]
+    options = make_options(
+        accum_grad=accum_grad,
+        generator_first=generator_first,
+        freeze_inactive_params=freeze_inactive_params,
+    )
+    iterator = [([str(i)] * len(x), dict(x=x, y=y)) for i, (x, y) in enumerate(batches)]
+    with Reporter().observe("train", 1) as reporter:
+        GANTrainer.train_one_epoch(
+            model,
+            iterator,
+            optimizers,
+            [None, None],
+            None,
+            reporter,
+            None,
+            options,
+            DistributedOption(),
+        )
+    return [optimizer.grads for optimizer in optimizers]
+
+
+@pytest.mark.parametrize("generator_first", [False, True])
+@pytest.mark.parametrize("freeze_inactive_params", [False, True])
+@pytest.mark.parametrize("accum_grad", [2, 3])
+def test_accum_grad_matches_large_batch(
+    generator_first, freeze_inactive_params, accum_grad
+):
+    torch.manual_seed(1)
+    x, y = torch.randn(4 * accum_grad, 3), torch.randn(4 * accum_grad, 3)
+    # With lr=0 the weights are not changed by the steps, so the accumulated
+    # gradients must match those of one large batch for both turns
+    accumulated = train_grads(
+        list(zip(x.split(4), y.split(4))),
+        accum_grad,
+        generator_first,
+        freeze_inactive_params,
+    )
+    large_batch = train_grads([(x, y)], 1, generator_first, freeze_inactive_params)
+    for turn_accumulated, turn_large_batch in zip(accumulated, large_batch):
+        assert len(turn_accumulated) == len(turn_large_batch) == 1
+        for grad, expected in zip(turn_accumulated[0], turn_large_batch[0]):
+            torch.testing.assert_close(grad, expected)
+
+
+class FailingGAN(ToyGAN):
+    def forward(self, x, y, forward_generator=True):
+        if forward_generator:
+            # The discriminator must be frozen while the generator turn runs
+            assert not any(p.requires_grad for p in self.discriminator.parameters())
+            raise RuntimeError("out of memory")
+        return super().forward(x, y, forward_generator)
+
+
+def test_freeze_inactive_params_restores_on_error():
+    model = FailingGAN()
+    optimizers = [
+        RecordingSGD(model.generator.parameters()),
+        RecordingSGD(model.discriminator.parameters()),
+    ]
+    options = make_options(
+        accum_grad=1, generator_first=False, freeze_inactive_params=True
+    )
+    x, y = torch.randn(4, 3), torch.randn(4, 3)
+    with Reporter().observe("train", 1) as reporter:
+        with pytest.raises(RuntimeError, match="out of memory"):
+            GANTrainer.train_one_epoch(
+                model,
+                [(["0"] * 4, dict(x=x, y=y))],
+                optimizers,
+                [None, None],
+                None,
+                reporter,
+                None,
+                options,
+                DistributedOption(),
+            )
+    assert all(p.requires_grad for p in model.parameters())
@@ -0,0 +1,104 @@
+import math
+
+import numpy as np
+import pytest
+import torch
+
+from espnet2.train.reporter import Reporter
+
+
+class SummaryWriter:
+    def __init__(self):
+        self.scalars = []
+
+    def add_scalar(self, tag, value, step):
+        self.scalars.append((tag, value, step))
+
+
+def make_steps(num_steps=30, seed=0):
+    """Make the stats and the weight of each step, like the ones of VITS."""
+    rng = np.random.default_rng(seed)
+    steps = []
+    for i in range(num_steps):
+        stats = dict(
+            generator_loss=torch.tensor(rng.normal() * 10, dtype=torch.float32),
+            generator_mel_loss=torch.tensor(rng.normal(), dtype=torch.float32),
+            generator_kl_loss=torch.tensor(rng.normal(), dtype=torch.float64),
+            generator_adv_loss=torch.tensor([rng.normal()]),
+            numpy_loss=np.array(rng.normal(), dtype=np.float32),
+            float_loss=float(rng.normal()),
+            int_count=int(rng.integers(10)),
+            none_loss=None if i % 5 == 0 else torch.tensor(rng.normal()),
+        )
+        # Keys which appear later or only in some steps
+        if i >= 7:
+            stats["late_loss"] = torch.tensor(rng.normal() * 1e-4)
+        if i % 3 == 0:
+            stats["sometimes_loss"] = torch.tensor(rng.normal() * 1e4)
+        weight = torch.tensor(int(rng.integers(1, 8)))
+        steps.append((stats, weight))
+    return steps
+
+
+def run_epochs(defer_stats, steps, weighted, log_interval=4, num_epochs=2):
+    reporter = Reporter(defer_stats=defer_stats)
+    messages = []
+    writer = SummaryWriter()
+    for epoch in range(1, num_epochs + 1):
+        reporter.set_epoch(epoch)
+        with reporter.observe("train") as sub_reporter:
+            for i, (stats, weight) in enumerate(steps):
+                sub_reporter.register(stats, weight if weighted else None)
+                sub_reporter.next()
+                if (i + 1) % log_interval == 0:
+                    messages.append(sub_reporter.log_message(-log_interval))
+                    sub_reporter.tensorboard_add_scalar(writer, -log_interval)
+            messages.append(sub_reporter.log_message())
+        messages.append(reporter.log_message())
+        reporter.tensorboard_add_scalar(writer, key1="train")
+    return reporter, messages, writer.scalars
+
+
+def assert_same(a, b):
+    if isinstance(a, float) and math.isnan(a):
+        assert isinstance(b, float) and math.isnan(b)
+    else:
+        assert a == b
+        assert type(a) is type(b)
+
+
+@pytest.mark.parametrize("weighted", [False, True])
+def test_defer_stats_keeps_logged_values(weighted):
+    steps = make_steps()
+    expected = run_epochs(False, steps, weighted)
+    actual = run_epochs(True, steps, weighted)
+    reporter, messages, scalars = actual
+    ref_reporter, ref_messages, ref_scalars = expected
+
+    # "time" is the elapsed time, which is not deterministic
+    assert [m.split(", time=")[0] for m in messages] == [
+        m.split(", time=")[0] for m in ref_messages
+    ]
+    assert len(scalars) == len(ref_scalars)
+    for (tag, v, step), (ref_tag, ref_v, ref_step) in zip(scalars, ref_scalars):
+        assert (tag, step) == (ref_tag, ref_step)
+        if tag != "time":
+            assert_same(v, ref_v)
+    for epoch, stats in ref_reporter.stats.items():
+        for key2, v in stats["train"].items():
+            if key2 != "time":
+                assert_same(reporter.stats[epoch]["train"][key2], v)
+
+
+def test_defer_stats_does_not_call_item(monkeypatch):
+    steps = make_steps(num_steps=5)
+    reporter = Reporter(defer_stats=True)
+    reporter.set_epoch(1)
+    with reporter.observe("train") as sub_reporter:
+        with monkeypatch.context() as m:
+            # Registering must not synchronize with the device
+            m.setattr(torch.Tensor, "item", pytest.fail)
+            for stats, weight in steps:
+                sub_reporter.register(stats, weight)
+                sub_reporter.next()
+        assert "generator_loss=" in sub_reporter.log_message()
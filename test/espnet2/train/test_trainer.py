@@ -0,0 +1,90 @@
+from types import SimpleNamespace
+
+import pytest
+import torch
+import yaml
+
+from espnet2.gan_tts.vits.inference_snapshot import SNAPSHOT_SUFFIX
+from espnet2.train.checkpoint_writer import CheckpointWriter
+from espnet2.train.trainer import Trainer
+
+CONFIG = dict(tts="vits", tts_conf=dict(generator_params={}), token_list=["a", "b"])
+
+
+@pytest.fixture
+def output_dir(tmp_path):
+    output_dir = tmp_path / "checkpoints"
+    output_dir.mkdir()
+    with (output_dir / "config.yaml").open("w", encoding="utf-8") as f:
+        yaml.safe_dump(CONFIG, f)
+    return output_dir
+
+
+def make_model():
+    return SimpleNamespace(
+        feats_extract=SimpleNamespace(output_size=lambda: 5),
+        tts=SimpleNamespace(fs=16000),
+    )
+
+
+def test_prepare_inference_snapshot_dir(output_dir, tmp_path):
+    snapshot_dir = tmp_path / "snapshots"
+    kwargs = Trainer.prepare_inference_snapshot_dir(
+        make_model(), output_dir, snapshot_dir
+    )
+    assert kwargs == dict(config=CONFIG, aux_channels=5, fs=16000)
+    config = (snapshot_dir / "config.yaml").read_bytes()
+    assert config == (output_dir / "config.yaml").read_bytes()
+    # Resuming with the same config is fine
+    Trainer.prepare_inference_snapshot_dir(make_model(), output_dir, snapshot_dir)
+
+
+def test_prepare_inference_snapshot_dir_keeps_other_config(output_dir, tmp_path):
+    snapshot_dir = tmp_path / "weights"
+    snapshot_dir.mkdir()
+    (snapshot_dir / "config.yaml").write_text("tts: vits\n")
+    with pytest.raises(RuntimeError):
+        Trainer.prepare_inference_snapshot_dir(make_model(), output_dir, snapshot_dir)
+    assert (snapshot_dir / "config.yaml").read_text() == "tts: vits\n"
+
+
+def test_save_inference_snapshot_removes_only_own_files(tmp_path):
+    snapshot_dir = tmp_path / "snapshots"
+    snapshot_dir.mkdir()
+    # Made by slim_model.py or by an earlier run
+    others = ["10epoch" + SNAPSHOT_SUFFIX, "model" + SNAPSHOT_SUFFIX, "config.yaml"]
+    for name in others:
+        (snapshot_dir / name).write_bytes(b"")
+
+    model_state = {"tts.generator.x.weight": torch.zeros(1)}
+    writer = CheckpointWriter()
+    previous = None
+    for iepoch in [1, 2, 3]:
+        Trainer.save_inference_snapshot(
+            writer,
+            model_state,
+            snapshot_dir,
+            iepoch,
+            config=CONFIG,
+            aux_channels=5,
+            fs=16000,
+            previous=previous,
+        )
+        previous = f"{iepoch}epoch{SNAPSHOT_SUFFIX}"
+    writer.close()
+
+    files = sorted(p.name for p in snapshot_dir.iterdir())
+    assert files == sorted(others + ["3epoch" + SNAPSHOT_SUFFIX])
+    snapshot = torch.load(snapshot_dir / f"3epoch{SNAPSHOT_SUFFIX}")
+    assert snapshot["source"] == "3epoch.pth"
+    assert list(snapshot["state_dict"]) == ["x.weight"]
+
+
+def test_checkpoint_writer_closes_on_error(tmp_path):
+    with pytest.raises(KeyError):
+        with CheckpointWriter() as writer:
+            writer.save({"x": torch.zeros(1)}, tmp_path / "checkpoint.pth")
+            raise KeyError("training failed")
+    # The checkpoint submitted before the error is written
+    assert writer._thread is None
+    assert torch.load(tmp_path / "checkpoint.pth")["x"].shape == (1,)
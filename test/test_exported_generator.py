@@ -0,0 +1,50 @@
+import pytest
+import torch
+
+from conftest import TINY_GENERATOR_PARAMS
+from espnet2.gan_tts.vits.generator import VITSGenerator
+from exported_generator import ExportedGenerator, export_generator
+
+
+@pytest.fixture
+def generator():
+    # weight normを付けたまま（学習時と同じ状態）の小さな生成器
+    torch.manual_seed(0)
+    return VITSGenerator(**dict(TINY_GENERATOR_PARAMS, vocabs=50)).eval()
+
+
+@pytest.mark.parametrize("export_format", ["torchscript", "onnx"])
+@pytest.mark.parametrize(
+    "noise_scale, noise_scale_dur", [(0.0, 0.0), (0.667, 0.8), (1.0, 1.0)]
+)
+def test_export_matches_pytorch(
+    generator, tmp_path, export_format, noise_scale, noise_scale_dur
+):
+    if export_format == "onnx":
+        pytest.importorskip("onnx")
+        pytest.importorskip("onnxruntime")
+    export_dir = str(tmp_path / "export")
+    export_generator(
+        generator,
+        export_dir,
+        fs=16000,
+        checkpoint="1epoch.pth",
+        export_format=export_format,
+    )
+    # 書き出しても元の生成器のweight normはそのまま
+    assert hasattr(generator.decoder.input_conv, "weight_g")
+    exported = ExportedGenerator(export_dir, backend=export_format)
+
+    text = torch.randint(1, 50, (2, 12))
+    text_lengths = torch.tensor([12, 7])
+    kwargs = dict(noise_scale=noise_scale, noise_scale_dur=noise_scale_dur)
+    for seed in range(3):
+        with torch.no_grad():
+            torch.manual_seed(seed)
+            ref, _, ref_dur = generator.inference(text, text_lengths, **kwargs)
+            torch.manual_seed(seed)
+            wav, _, dur = exported.inference(text, text_lengths, **kwargs)
+        # 乱数を同じ順番で引くので、長さも波形も一致する
+        torch.testing.assert_close(dur, ref_dur)
+        assert wav.shape == ref.shape
+        torch.testing.assert_close(wav, ref, atol=1e-4, rtol=1e-3)
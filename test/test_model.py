@@ -0,0 +1,150 @@
+import numpy as np
+import pytest
+import pyworld
+
+from model import VITSJaProsModel, scale_f0
+from text import p2tokens, split_p
+
+P_LIST = [
+    "コ[ンニチワ",
+    "キョ]オワ イ]イ テ]ンキデス",
+    "ハ]イ",
+    "ソ[レワ ム[ズカシ]イ、デ]モ ヤ[ッテミマ]ス",
+    "キ[ミワ ダ]レ?",
+]
+
+
+@pytest.fixture
+def model(tiny_model_files):
+    model_path, config_path = tiny_model_files
+    return VITSJaProsModel("test", model_path, config_path, device="cpu")
+
+
+@pytest.mark.parametrize("batch_size", [1, 2, 16])
+def test_tokens2speech_batch_matches_per_utterance(model, batch_size):
+    tokens_list = [p2tokens(p) for p in P_LIST]
+    # 長めに合成して、末尾以外の比べられる部分を確保する
+    kwargs = dict(speed_scale=0.25, noise_scale=0, noise_scale_dur=0)
+    fs, waves = model.tokens2speech_batch(tokens_list, batch_size=batch_size, **kwargs)
+    assert len(waves) == len(tokens_list)
+    # デコーダのパディングが入り込むのは、末尾の受容野の分だけ
+    tail = model.generator.decoder.receptive_field * model.generator.upsample_factor
+    for tokens, wave in zip(tokens_list, waves):
+        _, ref = model.tokens2speech(tokens, **kwargs)
+        assert len(wave) == len(ref)
+        assert len(ref) > tail
+        np.testing.assert_allclose(wave[:-tail], ref[:-tail], atol=1e-4)
+
+
+def _old_scale_f0(f0, pitch_scale, intonation_scale):
+    # user-004より前のPythonのループでの実装
+    non_zero_f0 = [f for f in f0 if f != 0]
+    f0_mean = sum(non_zero_f0) / len(non_zero_f0)
+    for i, f in enumerate(f0):
+        if f == 0:
+            continue
+        f0[i] = pitch_scale * f0_mean + intonation_scale * (f - f0_mean)
+    return f0
+
+
+def _test_wave(fs, seconds=1.0):
+    # 途中に無音を挟んだ、音程が揺れる倍音の多い音
+    t = np.arange(int(fs * seconds)) / fs
+    f0 = 150 + 30 * np.sin(2 * np.pi * 2 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / fs
+    wave = sum(np.sin(k * phase) / k for k in range(1, 8)) * 0.3
+    wave[len(wave) // 3 : len(wave) // 2] = 0
+    return wave.astype(np.float32)
+
+
+@pytest.mark.parametrize("pitch_scale", [0.9, 1.0, 1.1])
+@pytest.mark.parametrize("intonation_scale", [0.0, 1.0, 1.5])
+def test_scale_f0_matches_loop(pitch_scale, intonation_scale):
+    rng = np.random.default_rng(0)
+    f0 = rng.uniform(80, 300, 500)
+    f0[rng.random(500) < 0.3] = 0
+    expected = _old_scale_f0(f0.copy(), pitch_scale, intonation_scale)
+    np.testing.assert_allclose(
+        scale_f0(f0.copy(), pitch_scale, intonation_scale), expected, rtol=1e-12
+    )
+
+
+def test_scale_f0_unvoiced():
+    f0 = np.zeros(10)
+    np.testing.assert_array_equal(scale_f0(f0.copy(), 1.1, 1.5), f0)
+
+
+@pytest.mark.parametrize("f0_method", ["harvest", "dio"])
+def test_change_pitch_matches_old_path(tiny_model_files, f0_method):
+    model_path, config_path = tiny_model_files
+    model = VITSJaProsModel(
+        "test", model_path, config_path, device="cpu", f0_method=f0_method
+    )
+    fs = 16000
+    wave = _test_wave(fs)
+    # user-004より前の処理（harvestに限らず、f0推定以外は同じ）
+    x = wave.astype(np.double)
+    if f0_method == "dio":
+        f0, t = pyworld.dio(x, fs)
+        f0 = pyworld.stonemask(x, f0, t, fs)
+    else:
+        f0, t = pyworld.harvest(x, fs)
+    sp = pyworld.cheaptrick(x, f0, t, fs)
+    ap = pyworld.d4c(x, f0, t, fs)
+    f0 = _old_scale_f0(f0, 1.1, 1.3)
+    expected = pyworld.synthesize(f0, sp, ap, fs)
+
+    actual = model.change_pitch(fs, wave, 1.1, 1.3)
+    np.testing.assert_allclose(actual, expected, rtol=1e-7, atol=1e-9)
+
+
+@pytest.mark.parametrize("pitch_scale", [0.8, 1.0, 1.25])
+def test_latent_pitch_keeps_length(tiny_model_files, pitch_scale):
+    model_path, config_path = tiny_model_files
+    model = VITSJaProsModel(
+        "test", model_path, config_path, device="cpu", pitch_method="latent"
+    )
+    kwargs = dict(noise_scale=0, noise_scale_dur=0)
+    # 伸縮したフレーム数の切り捨ての分（最大1フレーム）だけ短くなりうる
+    tolerance = model.generator.upsample_factor / min(pitch_scale, 1)
+    for p in P_LIST:
+        _, ref = model.p2speech(p, **kwargs)
+        _, wave = model.p2speech(p, pitch_scale=pitch_scale, **kwargs)
+        assert abs(len(wave) - len(ref)) <= tolerance
+        if pitch_scale == 1:
+            np.testing.assert_array_equal(wave, ref)
+
+
+@pytest.mark.parametrize("crossfade_ms", [0, 10])
+def test_p2speech_stream_matches_chunks(model, crossfade_ms):
+    p = "ハ]イ、ソ[レワ ム[ズカシ]イ。デ]モ ヤ[ッテミマ]ス?"
+    kwargs = dict(speed_scale=0.25, noise_scale=0, noise_scale_dur=0)
+    chunks = split_p(p)
+    assert len(chunks) == 3
+    waves = [model.p2speech(chunk, **kwargs)[1] for chunk in chunks]
+    streamed = [
+        wave
+        for _, wave in model.p2speech_stream(p, crossfade_ms=crossfade_ms, **kwargs)
+    ]
+    fs = model.fs
+    fade_len = int(fs * crossfade_ms / 1000)
+    assert all(len(wave) > 2 * fade_len for wave in waves)
+
+    # つなぎ目ごとに、クロスフェードで重なった分だけ短くなる
+    stream = np.concatenate(streamed)
+    assert len(stream) == sum(len(wave) for wave in waves) - fade_len * (len(waves) - 1)
+    # 重なっていないところは、塊ごとに合成したものと同じ
+    offset = 0
+    for i, wave in enumerate(waves):
+        start = fade_len if i > 0 else 0
+        end = len(wave) - fade_len if i < len(waves) - 1 else len(wave)
+        np.testing.assert_array_equal(
+            stream[offset + start : offset + end], wave[start:end]
+        )
+        if i < len(waves) - 1:
+            # クロスフェードした部分は、両側の音声の振幅を超えない
+            head = waves[i + 1][:fade_len]
+            joint = stream[offset + end : offset + end + fade_len]
+            bound = np.maximum(np.abs(wave[end:]), np.abs(head)) + 1e-6
+            assert np.all(np.abs(joint) <= bound)
+        offset += len(wave) - fade_len
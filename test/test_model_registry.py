@@ -0,0 +1,130 @@
+import os
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from checkpoint_watcher import CheckpointWatcher, _Target
+from model import ModelRegistry
+
+
+class FakeRegistry(ModelRegistry):
+    """`_create`でモデルを組み立てずに、読み込んだファイルを記録する"""
+
+    def __init__(self, model_root, **kwargs):
+        super().__init__(model_root, **kwargs)
+        self.created = []
+        # セットされるまで`_create`を止めておく
+        self.release = threading.Event()
+        self.release.set()
+        self.started = threading.Event()
+        self.fail = False
+
+    def _create(self, model_name, model_path, config_path, device, dtype):
+        self.created.append(model_path)
+        self.started.set()
+        assert self.release.wait(5)
+        if self.fail:
+            raise ValueError(model_path)
+        return SimpleNamespace(model_path=model_path, device=device)
+
+
+@pytest.fixture
+def model_root(tmp_path):
+    for name in ["model1", "model2", "model3"]:
+        os.makedirs(tmp_path / name)
+        (tmp_path / name / "100epoch.pth").write_bytes(b"")
+    return str(tmp_path)
+
+
+def weights_path(model_root, name):
+    return os.path.join(model_root, name, "100epoch.pth")
+
+
+def test_get_reloads_swapped_checkpoint_after_eviction(model_root):
+    registry = FakeRegistry(model_root, max_models=1)
+    registry.swap("model1", model_path="outputs/model1/checkpoints/3epoch.pth")
+    assert registry.swapped_path("model1") == "outputs/model1/checkpoints/3epoch.pth"
+    # model2を読み込むとmodel1は捨てられる
+    registry.get("model2")
+    assert registry.stats()["size"] == 1
+    model = registry.get("model1")
+    assert model.model_path == "outputs/model1/checkpoints/3epoch.pth"
+
+    # `model_path`を省略した`swap`で`weights`のモデルに戻る
+    registry.swap("model1")
+    assert registry.swapped_path("model1") is None
+    registry.get("model2")
+    assert registry.get("model1").model_path == weights_path(model_root, "model1")
+
+
+def test_get_loads_once_without_blocking_other_models(model_root):
+    registry = FakeRegistry(model_root)
+    registry.get("model2")
+    registry.release.clear()
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(registry.get("model1")))
+        for _ in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    assert registry.started.wait(5)
+    # model1の読み込み中も、読み込み済みのモデルはすぐに返る
+    assert registry.get("model2").model_path == weights_path(model_root, "model2")
+    registry.release.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(results) == 3
+    assert all(model is results[0] for model in results)
+    assert registry.created.count(weights_path(model_root, "model1")) == 1
+    assert registry.stats() == dict(hits=1, misses=2, size=2)
+
+
+def test_swap_while_loading_wins(model_root):
+    registry = FakeRegistry(model_root)
+    registry.release.clear()
+    results = []
+    thread = threading.Thread(target=lambda: results.append(registry.get("model1")))
+    thread.start()
+    assert registry.started.wait(5)
+    # `get`の読み込みが終わる前に`swap`が差し替える場合
+    with registry.lock:
+        registry.release.set()
+        registry.swap("model1", model_path="3epoch.pth")
+    thread.join(5)
+    assert results[0].model_path == "3epoch.pth"
+    assert registry.get("model1") is results[0]
+
+
+def test_get_error_is_retried(model_root):
+    registry = FakeRegistry(model_root)
+    registry.fail = True
+    with pytest.raises(ValueError):
+        registry.get("model1")
+    registry.fail = False
+    assert registry.get("model1").model_path == weights_path(model_root, "model1")
+    with pytest.raises(FileNotFoundError):
+        registry.get("missing")
+    assert registry.stats()["size"] == 1
+
+
+def test_checkpoint_watcher_uses_swapped_path(model_root, tmp_path):
+    registry = FakeRegistry(model_root, max_models=1)
+    watcher = CheckpointWatcher(registry, output_root=str(tmp_path / "outputs"))
+    checkpoint_dir = tmp_path / "outputs" / "model1" / "checkpoints"
+    os.makedirs(checkpoint_dir)
+    (checkpoint_dir / "3epoch.pth").write_bytes(b"")
+    target = _Target("cpu", "float32", None)
+
+    watcher._check("model1", target)
+    checkpoint = str(checkpoint_dir / "3epoch.pth")
+    assert registry.get("model1").model_path == checkpoint
+    watcher._check("model1", target)
+    assert registry.created.count(checkpoint) == 1
+
+    # WebUIで`weights`のモデルを読み込み直したら、次の確認で差し替え直す
+    registry.swap("model1")
+    watcher._check("model1", target)
+    assert registry.get("model1").model_path == checkpoint
+    assert registry.created.count(checkpoint) == 2
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from model import VITSJaProsModel
+from precision import log_spectral_distance, set_precision
+from text import p2tokens
+
+P_LIST = [
+    "コ[ンニチワ",
+    "キョ]オワ イ]イ テ]ンキデス",
+    "ハ]イ",
+    "ソ[レワ ム[ズカシ]イ、デ]モ ヤ[ッテミマ]ス",
+    "キ[ミワ ダ]レ?",
+]
+# float32とのスペクトル距離（dB）の上限。乱数の重みの小さなモデルでの値
+# （bf16で0.6dB、int8で6.5dB程度）に余裕を持たせたもの
+MAX_DISTANCE = {"bf16": 1.0, "int8": 10.0}
+
+
+@pytest.fixture
+def fp32_model(tiny_model_files):
+    model_path, config_path = tiny_model_files
+    return VITSJaProsModel("test", model_path, config_path, device="cpu")
+
+
+@pytest.mark.parametrize("precision", ["bf16", "int8"])
+def test_precision_close_to_fp32(tiny_model_files, fp32_model, precision):
+    model_path, config_path = tiny_model_files
+    model = VITSJaProsModel(
+        "test", model_path, config_path, device="cpu", precision=precision
+    )
+    # 長めに合成して、スペクトルのフレームを確保する
+    kwargs = dict(speed_scale=0.25, noise_scale=0, noise_scale_dur=0)
+    for p in P_LIST:
+        tokens = p2tokens(p)
+        _, ref = fp32_model.tokens2speech(tokens, **kwargs)
+        _, wave = model.tokens2speech(tokens, **kwargs)
+        # duration predictorはfloat32のままなので、長さは変わらない
+        assert len(wave) == len(ref)
+        assert log_spectral_distance(ref, wave) < MAX_DISTANCE[precision]
+
+
+@pytest.mark.parametrize("precision", ["bf16", "int8"])
+def test_set_precision_keeps_duration_layers(fp32_model, precision):
+    names = set_precision(fp32_model.generator, precision)
+    assert names
+    for name in names:
+        assert name.split(".")[0] in ("text_encoder", "flow", "decoder")
+        assert not name.startswith("text_encoder.proj")
+        assert name != "decoder.output_conv"
+        assert not name.endswith(".proj")
+
+
+def test_set_precision_fp32_is_noop(fp32_model):
+    kwargs = dict(noise_scale=0, noise_scale_dur=0)
+    _, ref = fp32_model.p2speech(P_LIST[1], **kwargs)
+    assert set_precision(fp32_model.generator, "fp32") == []
+    _, wave = fp32_model.p2speech(P_LIST[1], **kwargs)
+    np.testing.assert_array_equal(wave, ref)
@@ -0,0 +1,128 @@
+import os
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from espnet2.fileio.packed_npy import PackedSoundReader
+from espnet2.fileio.sound_scp import SoundScpReader
+from espnet2.tasks.gan_tts import GANTTSTask
+from espnet2.train.preprocessor import CommonPreprocessor
+from preprocess import (
+    check_text_int,
+    normalize_wavs,
+    pack_wav_scp,
+    sampling_rate,
+    training_args,
+    write_text_int,
+)
+
+
+def write_wav(path, seconds=0.5):
+    t = np.arange(int(sampling_rate * seconds)) / sampling_rate
+    sf.write(path, 0.3 * np.sin(2 * np.pi * 220 * t), sampling_rate)
+
+
+def test_normalize_wavs_skips_up_to_date(tmp_path):
+    wavs_dir, output_dir = tmp_path / "wavs", tmp_path / "normalized"
+    wavs_dir.mkdir()
+    output_dir.mkdir()
+    wav_paths = [str(wavs_dir / f"{i}.wav") for i in range(3)]
+    for path in wav_paths:
+        write_wav(path)
+
+    normalize_wavs(wav_paths, str(output_dir))
+    assert sorted(os.listdir(output_dir)) == ["0.wav", "1.wav", "2.wav"]
+    mtimes = {f: os.path.getmtime(output_dir / f) for f in os.listdir(output_dir)}
+    wave, sr = sf.read(output_dir / "0.wav")
+    assert sr == sampling_rate
+    np.testing.assert_allclose(np.abs(wave).max(), 0.9, atol=1e-3)
+
+    # 元ファイルが新しいものだけ正規化し直す
+    os.utime(wav_paths[1], (mtimes["1.wav"] + 10, mtimes["1.wav"] + 10))
+    normalize_wavs(wav_paths, str(output_dir))
+    assert os.path.getmtime(output_dir / "0.wav") == mtimes["0.wav"]
+    assert os.path.getmtime(output_dir / "1.wav") > mtimes["1.wav"]
+
+
+def test_normalize_wavs_ignores_unfinished_output(tmp_path):
+    wavs_dir, output_dir = tmp_path / "wavs", tmp_path / "normalized"
+    wavs_dir.mkdir()
+    output_dir.mkdir()
+    wav_path = str(wavs_dir / "0.wav")
+    write_wav(wav_path)
+    # 書き込み中に止まったときは一時ファイルだけが残る
+    (output_dir / "0.wav.tmp").write_bytes(b"RIFF")
+
+    normalize_wavs([wav_path], str(output_dir))
+    assert os.listdir(output_dir) == ["0.wav"]
+    assert sf.info(output_dir / "0.wav").frames > 0
+
+
+def _char_preprocessor(tmp_path):
+    # pyopenjtalkの辞書が無くても動くように、文字単位でトークン化する
+    token_list = tmp_path / "tokens.txt"
+    token_list.write_text(
+        "\n".join(["<blank>", "<unk>", *"abcdefgh", "<space>", "<sos/eos>"]),
+        encoding="utf-8",
+    )
+    return CommonPreprocessor(
+        train=True, token_type="char", token_list=str(token_list), text_cleaner=None
+    )
+
+
+def test_text_int_matches_on_the_fly(tmp_path):
+    preprocessor = _char_preprocessor(tmp_path)
+    text_path, text_int_path = str(tmp_path / "text"), str(tmp_path / "text_int")
+    (tmp_path / "text").write_text(
+        "utt1 abc\nutt2 bad cafe\nutt3 hg z\n", encoding="utf-8"
+    )
+    write_text_int(text_path, text_int_path, preprocessor)
+    # 未知の文字（z）と空白もその場で変換したときと同じIDになる
+    assert (tmp_path / "text_int").read_text(encoding="utf-8") == (
+        "utt1 2 3 4\nutt2 3 2 5 10 4 2 7 6\nutt3 9 8 10 1\n"
+    )
+    check_text_int(text_path, text_int_path, preprocessor)
+
+    # 1文でも違えば、学習を始める前に分かる
+    (tmp_path / "text_int").write_text(
+        "utt1 2 3 4\nutt2 3 2 5 10 4 2 7 6\nutt3 9 8 10 2\n", encoding="utf-8"
+    )
+    with pytest.raises(ValueError, match="utt3"):
+        check_text_int(text_path, text_int_path, preprocessor)
+    (tmp_path / "text_int").write_text("utt1 2 3 4\n", encoding="utf-8")
+    with pytest.raises(ValueError):
+        check_text_int(text_path, text_int_path, preprocessor)
+
+
+def test_training_args_preprocessor():
+    # text_intは学習時と同じ設定の前処理で作る
+    args = training_args("test", "outputs")
+    assert args.train_data_path_and_name_and_type[0] == (
+        "outputs/test/dump/train/text_int",
+        "text",
+        "text_int",
+    )
+    preprocessor = GANTTSTask.build_preprocess_fn(args, train=True)
+    assert (args.token_type, args.cleaner, args.g2p) == (
+        "phn",
+        "jaconv",
+        "pyopenjtalk_prosody",
+    )
+    assert preprocessor.token_id_converter.token_list[:2] == ["<blank>", "<unk>"]
+
+
+def test_pack_wav_scp_matches_wav_scp(tmp_path):
+    wav_scp = tmp_path / "wav.scp"
+    with open(wav_scp, "w", encoding="utf-8") as f:
+        for i, seconds in enumerate([0.5, 0.1, 0.3]):
+            write_wav(str(tmp_path / f"{i}.wav"), seconds)
+            f.write(f"{i} {tmp_path / f'{i}.wav'}\n")
+    packed_scp = str(tmp_path / "wav_packed.scp")
+    pack_wav_scp(str(wav_scp), str(tmp_path / "wav.npy"), packed_scp)
+    # 学習時の読み込み方で、wav.scpと同じ値になる
+    expected = SoundScpReader(str(wav_scp), dtype="float32")
+    reader = PackedSoundReader(packed_scp, dtype="float32")
+    assert list(reader) == list(expected)
+    for wav in expected:
+        np.testing.assert_array_equal(reader[wav], expected[wav][1])
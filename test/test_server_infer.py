@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from server_infer import MicroBatcher, SynthesisRequest, synthesis_params
+
+
+class FakeModel:
+    """`p`が"bad"のときに失敗する、`p`の長さの無音を返すモデル"""
+
+    def __init__(self):
+        self.batch_calls = 0
+
+    def p2speech(self, p, **params):
+        if p == "bad":
+            raise ValueError(p)
+        return 16000, np.zeros(len(p))
+
+    def p2speech_batch(self, p_list, batch_size=1, **params):
+        self.batch_calls += 1
+        return 16000, [self.p2speech(p, **params)[1] for p in p_list]
+
+
+class FakeRegistry:
+    def __init__(self):
+        self.model = FakeModel()
+
+    def get(self, model_name, device):
+        if model_name == "missing":
+            raise FileNotFoundError(model_name)
+        return self.model
+
+
+def make_request(p, model_name="test"):
+    return SynthesisRequest(model_name, p, dict(synthesis_params))
+
+
+def test_process_batches_requests():
+    registry = FakeRegistry()
+    requests = [make_request(p) for p in ["ア", "アイ", "アイウ"]]
+    MicroBatcher(registry)._process(requests)
+    assert registry.model.batch_calls == 1
+    for request in requests:
+        assert len(request.future.result(0)[1]) == len(request.p)
+
+
+def test_process_isolates_bad_request():
+    requests = [make_request(p) for p in ["ア", "bad", "アイウ"]]
+    MicroBatcher(FakeRegistry())._process(requests)
+    with pytest.raises(ValueError):
+        requests[1].future.result(0)
+    for request in [requests[0], requests[2]]:
+        assert len(request.future.result(0)[1]) == len(request.p)
+
+
+def test_process_model_error_fails_group():
+    requests = [make_request(p, "missing") for p in ["ア", "アイ"]]
+    requests.append(make_request("ア"))
+    MicroBatcher(FakeRegistry())._process(requests)
+    for request in requests[:2]:
+        with pytest.raises(FileNotFoundError):
+            request.future.result(0)
+    assert requests[2].future.result(0)[0] == 16000
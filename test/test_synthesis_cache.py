@@ -0,0 +1,140 @@
+import os
+
+import numpy as np
+import pytest
+
+import synthesis_cache
+from synthesis_cache import SynthesisCache
+
+MB = 1024 * 1024
+
+
+def _wave(seed, n=1000):
+    return np.random.default_rng(seed).standard_normal(n).astype(np.float32)
+
+
+def _npy_files(cache_dir):
+    return sorted(f for f in os.listdir(cache_dir) if f.endswith(".npy"))
+
+
+def test_make_key_depends_on_everything():
+    key = SynthesisCache.make_key("a", ["k", "o"], dict(x=1, y=2))
+    # 辞書の順番には依らない
+    assert key == SynthesisCache.make_key("a", ["k", "o"], dict(y=2, x=1))
+    assert key != SynthesisCache.make_key("b", ["k", "o"], dict(x=1, y=2))
+    assert key != SynthesisCache.make_key("a", ["k"], dict(x=1, y=2))
+    assert key != SynthesisCache.make_key("a", ["k", "o"], dict(x=1, y=3))
+
+
+@pytest.mark.parametrize("use_disk", [False, True])
+def test_get_is_not_affected_by_mutation(tmp_path, use_disk):
+    cache = SynthesisCache(str(tmp_path) if use_disk else None)
+    wave = _wave(0)
+    expected = wave.copy()
+    cache.put("a", wave)
+    # 呼び出し元の配列を書き換えてもキャッシュは変わらない
+    wave[:] = 0
+    cached = cache.get("a")
+    np.testing.assert_array_equal(cached, expected)
+    # 返した配列は書き換えられない
+    with pytest.raises(ValueError):
+        cached[0] = 1
+    if use_disk:
+        from_disk = SynthesisCache(str(tmp_path)).get("a")
+        np.testing.assert_array_equal(from_disk, expected)
+        with pytest.raises(ValueError):
+            from_disk[0] = 1
+
+
+def test_memory_lru():
+    wave_bytes = _wave(0).nbytes
+    cache = SynthesisCache(max_memory_mb=2.5 * wave_bytes / MB)
+    cache.put("a", _wave(0))
+    cache.put("b", _wave(1))
+    assert cache.get("a") is not None  # bより新しくなる
+    cache.put("c", _wave(2))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    stats = cache.stats()
+    assert stats["memory_items"] == 2
+    assert stats["memory_bytes"] == 2 * wave_bytes
+    assert (stats["memory_hits"], stats["misses"]) == (3, 1)
+
+
+def test_disk_hit_after_restart(tmp_path):
+    cache = SynthesisCache(str(tmp_path))
+    cache.put("a", _wave(0))
+    assert _npy_files(tmp_path) == ["a.npy"]
+
+    cache = SynthesisCache(str(tmp_path))
+    np.testing.assert_array_equal(cache.get("a"), _wave(0))
+    assert cache.get("a") is not None
+    assert cache.stats()["disk_hits"] == 1
+    assert cache.stats()["memory_hits"] == 1
+    assert cache.get("b") is None
+
+
+def test_disk_eviction_is_lru(tmp_path, monkeypatch):
+    cache = SynthesisCache(str(tmp_path / "size"))
+    cache.put("x", _wave(0))
+    file_bytes = cache.disk_bytes
+
+    cache_dir = str(tmp_path / "cache")
+    # メモリに残らないようにして、ディスクから読ませる
+    cache = SynthesisCache(
+        cache_dir, max_memory_mb=0, max_disk_mb=3.5 * file_bytes / MB
+    )
+    # 一杯になってから消すときに、ディレクトリを調べ直さない
+    monkeypatch.setattr(os, "listdir", pytest.fail)
+    for key, seed in [("a", 0), ("b", 1), ("c", 2)]:
+        cache.put(key, _wave(seed))
+    assert cache.get("a") is not None  # bが一番古くなる
+    cache.put("d", _wave(3))
+    cache.put("e", _wave(4))
+    monkeypatch.undo()
+
+    assert _npy_files(cache_dir) == ["a.npy", "d.npy", "e.npy"]
+    assert cache.disk_bytes == 3 * file_bytes
+    assert cache.stats()["disk_items"] == 3
+
+    # 使われた順番は、再起動した後も更新日時から復元される
+    cache = SynthesisCache(
+        cache_dir, max_memory_mb=0, max_disk_mb=3.5 * file_bytes / MB
+    )
+    assert list(cache.disk) == ["a", "d", "e"]
+    assert cache.disk_bytes == 3 * file_bytes
+
+
+def test_disk_file_removed_externally(tmp_path):
+    cache = SynthesisCache(str(tmp_path), max_memory_mb=0)
+    cache.put("a", _wave(0))
+    # メモリには最後の1つだけ残る
+    cache.put("b", _wave(1))
+    os.remove(tmp_path / "a.npy")
+    assert cache.get("a") is None
+    assert list(cache.disk) == ["b"]
+    cache.put("a", _wave(0))
+    assert _npy_files(tmp_path) == ["a.npy", "b.npy"]
+
+
+def test_put_is_atomic(tmp_path, monkeypatch):
+    cache = SynthesisCache(str(tmp_path), max_memory_mb=0)
+
+    def broken_save(f, wave):
+        f.write(b"partial")
+        raise OSError("disk full")
+
+    monkeypatch.setattr(synthesis_cache.np, "save", broken_save)
+    with pytest.raises(OSError, match="disk full"):
+        cache.put("a", _wave(0))
+    monkeypatch.undo()
+    # 書きかけのファイルは残らず、読み込めない音声として扱われることもない
+    assert os.listdir(tmp_path) == []
+    assert cache.disk_bytes == 0
+    assert SynthesisCache(str(tmp_path)).get("a") is None
+
+    # 以前に落ちたときの一時ファイルは、起動時に消す
+    (tmp_path / "b.npy.tmp").write_bytes(b"partial")
+    SynthesisCache(str(tmp_path))
+    assert os.listdir(tmp_path) == []
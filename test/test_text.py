@@ -0,0 +1,151 @@
+import random
+import re
+
+import pytest
+
+import text
+from text import (
+    a2kata,
+    g2p,
+    kata2a_with_spaces,
+    kata2p,
+    kata2tokens,
+    p2kata,
+    p2tokens,
+    split_p,
+)
+
+# 以前の（`str.replace`を繰り返す）実装では、"by e"が"bイェ"、"ts i"が"tスィ"の
+# ように、途中から先に置換されてしまっていたもの
+
+
+def _old_p2tokens(p):
+    # user-009より前の実装
+    p = p.replace("　", " ")
+    p = p.replace("？", "?")
+    p = re.sub(r"\s{2,}", " ", p)
+    p = p.strip()
+    if p[-1] != "?" and p[-1] != "$":
+        p = p + "$"
+    for k, v in kata2p.items():
+        p = p.replace(k, v)
+    p = "^" + p
+    for k, v in kata2a_with_spaces.items():
+        p = p.replace(k, v)
+    symbols = ["[", "]", "#", "_", "N", "cl", "?", "$"]
+    for sym in symbols:
+        p = p.replace(sym, " " + sym)
+    return p.split(" ")
+
+
+def _old_tokens2p(tokens):
+    # user-009より前の`g2p`の、pyopenjtalkの後の部分
+    tokens = tokens[1:]
+    if tokens[-1] == "$":
+        tokens = tokens[:-1]
+    tokens = [p2kata[token] if token in p2kata else token for token in tokens]
+    p = "".join(tokens)
+    for k, v in a2kata.items():
+        p = p.replace(k, v)
+    return p
+
+
+OLD_BROKEN_KATA = [
+    k for k, v in kata2tokens.items() if _old_tokens2p(["^", *v, "$"]) != k
+]
+
+
+def _random_p(rng, kata):
+    chars = kata + ["ッ", "ン", "、", " ", "[", "]", "？", "　"]
+    p = "".join(rng.choice(chars) for _ in range(rng.randint(1, 30)))
+    return p + rng.choice(["", "?", "$"])
+
+
+def _random_tokens(rng, kata):
+    tokens = ["^", *kata2tokens[rng.choice(kata)]]
+    for _ in range(rng.randint(0, 30)):
+        c = rng.choice(kata + ["cl", "N", "_", "#", "[", "]"])
+        tokens.extend(kata2tokens.get(c, [c]))
+    # `p2tokens`は空白をまとめて前後を落とすので、pyopenjtalkと同じく
+    # "#"は単語の間にだけ1つ置く
+    tokens = [t for i, t in enumerate(tokens) if t != "#" or tokens[i - 1] != "#"]
+    if tokens[-1] == "#":
+        tokens.pop()
+    return tokens + [rng.choice(["$", "?"])]
+
+
+@pytest.fixture
+def fake_g2tokens(monkeypatch):
+    """pyopenjtalkを使わずに、`g2p`に任意のトークン列を渡す"""
+    g2tokens = {}
+    monkeypatch.setattr(text, "g2tokens", lambda s: list(g2tokens[s]))
+    return g2tokens
+
+
+def test_p2tokens_matches_old():
+    rng = random.Random(0)
+    kata = list(kata2tokens)
+    for _ in range(2000):
+        p = _random_p(rng, kata)
+        if not p.strip(" 　"):
+            continue
+        assert p2tokens(p) == _old_p2tokens(p), p
+
+
+@pytest.mark.parametrize("p", ["コ[ンニチワ", "キョ]オワ イ]イ テ]ンキデス", "xコ", "ハ]イ？"])
+def test_p2tokens_unknown_and_examples(p):
+    assert p2tokens(p) == _old_p2tokens(p)
+
+
+def test_g2p_matches_old(fake_g2tokens):
+    rng = random.Random(0)
+    kata = [k for k in kata2tokens if k not in OLD_BROKEN_KATA]
+    for i in range(2000):
+        tokens = _random_tokens(rng, kata)
+        fake_g2tokens[str(i)] = tokens
+        p = g2p(str(i))
+        assert p == _old_tokens2p(tokens), tokens
+        # カタカナに戻した音素列は、元のトークン列に戻る
+        assert p2tokens(p) == tokens
+
+
+@pytest.mark.parametrize("kata", OLD_BROKEN_KATA)
+def test_g2p_fixed_kata(fake_g2tokens, kata):
+    tokens = ["^", *kata2tokens[kata], "$"]
+    fake_g2tokens[kata] = tokens
+    assert g2p(kata) == kata
+    assert p2tokens(g2p(kata)) == tokens
+
+
+def _strip_ends(tokens):
+    # 先頭の"^"と、通常文の末尾の"$"を除く
+    tokens = tokens[1:]
+    return tokens[:-1] if tokens[-1] == "$" else tokens
+
+
+@pytest.mark.parametrize(
+    "p",
+    [
+        "コ[ンニチワ",
+        "ハ]イ、ソ[オ オ[モイマ]ス",
+        "ハ]イ。ソ[オ オ[モイマ]ス。",
+        "キ[ミワ ダ]レ? ボ]ク、ワ[タシ？",
+        "ア]ノ、、エ[ト。",
+    ],
+)
+def test_split_p_keeps_tokens(p):
+    chunks = split_p(p)
+    assert len(chunks) >= 1
+    # 区切り記号も含めて、元の音素列をそのまま分けたもの
+    assert "".join(chunks) == p
+    tokens = [t for chunk in chunks for t in _strip_ends(p2tokens(chunk))]
+    # 区切りの直後の空白は、塊の先頭の空白として除かれる
+    expected = _strip_ends(p2tokens(re.sub(r"(?<=[、。?？]) +", "", p)))
+    assert tokens == expected
+
+
+def test_split_p_examples():
+    assert split_p("ハ]イ、ソ[オ オ[モイマ]ス") == ["ハ]イ、", "ソ[オ オ[モイマ]ス"]
+    assert split_p("ハ]イ。ソ[オ?") == ["ハ]イ。", "ソ[オ?"]
+    # 続く区切り記号はまとめて、空白だけの塊は合成しない
+    assert split_p("ア]ノ、、エ[ト。 ") == ["ア]ノ、、", "エ[ト。"]
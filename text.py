@@ -1,5 +1,6 @@
 import re
-from typing import List
+from functools import lru_cache
+from typing import List, Tuple
 
 from espnet2.text.phoneme_tokenizer import pyopenjtalk_g2p_prosody
 
@@ -169,8 +170,28 @@ kata2a_with_spaces = {k: " " + " ".join(v) for k, v in kata2tokens.items()}
 a2kata = {v: k for k, v in kata2a.items()}
 
 
+# `p2tokens`で記号として扱うもの
+symbols = ["[", "]", "#", "_", "N", "cl", "?", "$"]
+
+# `p2tokens`用：カタカナ（1・2文字）・例外文字・記号からトークンへの辞書。
+# 先頭から2文字、1文字の順に引けば、辞書順に置換していくのと同じ結果になる
+p2tokens_dict = {
+    **{sym: [sym] for sym in symbols},
+    **{k: [v] for k, v in kata2p.items()},
+    **kata2tokens,
+}
+# 文字列を「カタカナ+小書き文字」「cl」「その他1文字」に切り分ける
+p2tokens_pattern = re.compile(r"[ァ-ヴ][ァィゥェォャュョ]|cl|.", re.S)
+
+
+@lru_cache(maxsize=4096)
+def _g2tokens(text: str) -> Tuple[str, ...]:
+    return tuple(pyopenjtalk_g2p_prosody(text))
+
+
 def g2tokens(text: str) -> List[str]:
-    return pyopenjtalk_g2p_prosody(text)
+    # 同じ文は何度も来るので、pyopenjtalkの結果を覚えておく
+    return list(_g2tokens(text))
 
 
 def g2p(text: str) -> str:
@@ -187,11 +208,18 @@ def g2p(text: str) -> str:
     tokens = tokens[1:]  # 最初の'^'を落とす
     if tokens[-1] == "$":
         tokens = tokens[:-1]  # 疑問文でないとき'$'を落とす
-    tokens = [p2kata[token] if token in p2kata else token for token in tokens]
-    text = "".join(tokens)
-    for k, v in a2kata.items():
-        text = text.replace(k, v)
-    return text
+    # 子音+母音の組、母音・記号単体の順にカタカナにしていく
+    kata = []
+    i = 0
+    while i < len(tokens):
+        if i + 1 < len(tokens) and tokens[i] + tokens[i + 1] in a2kata:
+            kata.append(a2kata[tokens[i] + tokens[i + 1]])
+            i += 2
+            continue
+        token = tokens[i]
+        kata.append(p2kata[token] if token in p2kata else a2kata.get(token, token))
+        i += 1
+    return "".join(kata)
 
 
 def p2tokens(p: str) -> List[str]:
@@ -200,21 +228,43 @@ def p2tokens(p: str) -> List[str]:
     例：
     コ[ンニチワ → [^, k, o, [, N, n, i, ch, i, w, a, $]
     """
+    return list(_p2tokens(p))
+
+
+@lru_cache(maxsize=4096)
+def _p2tokens(p: str) -> Tuple[str, ...]:
     p = p.replace("　", " ")  # 全角スペースを半角スペースに
     p = p.replace("？", "?")  # 全角疑問符を半角に
     p = re.sub(r"\s{2,}", " ", p)  # 連続するスペースを1つに
     p = p.strip()  # 先頭と末尾のスペースを削除
 
-    # 以下では、一度空白で区切られた"^ k o [ N n i ch i w a $"を作り、あとで分割。
-
     if p[-1] != "?" and p[-1] != "$":  # 疑問でない場合、最後に"$"がなければ付ける
         p = p + "$"
-    for k, v in kata2p.items():  # 例外文字を先にトークンに置換
-        p = p.replace(k, v)
-    p = "^" + p  # 先頭に"^"を付ける
-    for k, v in kata2a_with_spaces.items():
-        p = p.replace(k, v)
-    symbols = ["[", "]", "#", "_", "N", "cl", "?", "$"]
-    for sym in symbols:
-        p = p.replace(sym, " " + sym)
-    return p.split(" ")
+
+    # カタカナ・記号を先頭から順にトークンにする。
+    # どれにも当てはまらない文字は、直前のトークンにくっつける（結果<unk>になる）
+    tokens = ["^"]
+    for chunk in p2tokens_pattern.findall(p):
+        if chunk in p2tokens_dict:
+            tokens.extend(p2tokens_dict[chunk])
+            continue
+        # 辞書にない2文字の組は1文字ずつ見る
+        for c in chunk:
+            if c in p2tokens_dict:
+                tokens.extend(p2tokens_dict[c])
+            else:
+                tokens[-1] += c
+    return tuple(tokens)
+
+
+def split_p(p: str) -> List[str]:
+    """
+    音素列を、ポーズ（`、`）や文末（`?`・`。`）の直後で区切ったリストに分ける。
+    区切り記号は書き換えずに（続くときはまとめて）直前の塊の末尾に残すので、各塊を
+    `p2tokens`に渡すと、区切らずに渡したときと同じトークンになる
+    （塊の先頭と末尾の`^`・`$`と、区切りの直後の空白を除く）。
+    例：
+    ハ]イ、ソ[オ オ[モイマ]ス → [ハ]イ、, ソ[オ オ[モイマ]ス]
+    """
+    chunks = re.split(r"(?<=[、。?？])(?![、。?？])", p)
+    return [chunk for chunk in chunks if chunk.strip(" 　")]
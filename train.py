@@ -1,4 +1,5 @@
 import argparse
+import os
 import sys
 import subprocess
 
@@ -18,6 +19,18 @@ def run_train(
         train_args[i] = arg.format(model_name=model_name, output_dir=output_dir)
 
     cmd.extend(train_args)
+
+    # preprocess.pyで--dump-featsした場合は、保存した特徴量をSTFTの代わりに使う
+    dump_dir = os.path.join(output_dir, model_name, "dump")
+    for folder in ["train", "valid"]:
+        feats_scp = os.path.join(dump_dir, folder, "feats.scp")
+        if os.path.exists(feats_scp):
+            cmd.extend(
+                [
+                    f"--{folder}_data_path_and_name_and_type",
+                    f"{feats_scp},feats,packed_npy",
+                ]
+            )
     cmd.extend(["--batch_bins", str(batch_bins)])
     cmd.extend(["--max_epoch", str(max_epoch)])
 
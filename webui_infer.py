@@ -1,11 +1,15 @@
+import argparse
 import os
 import sys
-from typing import Tuple
+import threading
+from typing import Dict, Iterator, Tuple
 
 import gradio as gr
 import numpy as np
 
-from model import VITSJaProsModel
+from checkpoint_watcher import CheckpointWatcher
+from model import ModelRegistry
+from synthesis_cache import SynthesisCache
 from text import g2p
 
 python = sys.executable
@@ -28,22 +32,49 @@ def update_model_list():
     return gr.Dropdown.update(choices=models)
 
 
+# `__main__`で引数から作る
+registry: ModelRegistry
+watcher: CheckpointWatcher
+# 「モデルを再読み込み」の結果。チェックポイントの状態と一緒に表示する
+reload_messages: Dict[str, str] = {}
+
+
 def load_model(model_name: str, device: str = "cpu"):
-    global model
-    model_dir = os.path.join(model_root, model_name)
-    pth_files = [f for f in os.listdir(model_dir) if f.endswith(".pth")]
-    if len(pth_files) == 0:
-        raise ValueError(f"`{model_dir}`に`pth`ファイルがありません。")
-    elif len(pth_files) > 1:
-        raise ValueError(f"`{model_dir}`に`pth`ファイルが複数あります。")
-    yaml_file = os.path.join(model_dir, "config.yaml")
-    if not os.path.exists(yaml_file):
-        yaml_file = None
-    model_path = os.path.join(model_dir, pth_files[0])
-    model = VITSJaProsModel(model_name, model_path, yaml_file, device=device)
+    registry.get(model_name, device)
     return gr.Dropdown.update()
 
 
+def reload_model(model_name: str, device: str = "cpu") -> str:
+    # 読み込みの間も今のモデルで合成できるように、裏で読み込んでから差し替える
+    def _swap():
+        try:
+            registry.swap(model_name, device)
+            message = f"{model_name}を再読み込みしました。"
+        except Exception as e:
+            message = f"{model_name}の再読み込みに失敗しました: {e}"
+        reload_messages[model_name] = message
+        print(message)
+
+    reload_messages[model_name] = f"{model_name}を再読み込みしています..."
+    threading.Thread(target=_swap, daemon=True).start()
+    return model_status(model_name)
+
+
+def model_status(model_name: str) -> str:
+    status = watcher.status(model_name)
+    message = reload_messages.get(model_name)
+    return status if message is None else f"{message}\n{status}"
+
+
+def set_watch(model_name: str, enabled: bool, epoch: int, device: str = "cpu"):
+    for name in list(watcher.targets):
+        watcher.unwatch(name)
+    if enabled:
+        epoch = int(epoch) if epoch else 0
+        watcher.watch(model_name, device, epoch=epoch if epoch > 0 else None)
+    return model_status(model_name)
+
+
 def inference(
     model_name: str,
     p: str,
@@ -54,16 +85,28 @@ def inference(
     noise_scale_dur: float,
     device: str = "cpu",
 ) -> Tuple[int, np.ndarray]:
-    try:
-        if model_name != model.name:
-            load_model(model_name, device)
-    except NameError:
-        load_model(model_name, device)
+    model = registry.get(model_name, device)
     return model.p2speech(
         p, speed_scale, pitch_scale, intonation_scale, noise_scale, noise_scale_dur
     )
 
 
+def inference_stream(
+    model_name: str,
+    p: str,
+    speed_scale: float,
+    pitch_scale: float,
+    intonation_scale: float,
+    noise_scale: float,
+    noise_scale_dur: float,
+    device: str = "cpu",
+) -> Iterator[Tuple[int, np.ndarray]]:
+    model = registry.get(model_name, device)
+    yield from model.p2speech_stream(
+        p, speed_scale, pitch_scale, intonation_scale, noise_scale, noise_scale_dur
+    )
+
+
 accent_guide = """
 カタカナで実際の読み方を表し、記号を用いてアクセント等を制御します。
 
@@ -78,97 +121,138 @@ accent_guide = """
 カタカナ・上記記号以外を入れるとエラーになります。
 """
 
-with gr.Blocks(title="VITS-JaPros-WebUI 音声合成") as app:
-    gr.Markdown("# VITS-JaPros-WebUI 音声合成")
-    radio_device = gr.Radio(
-        ["cpu", "gpu"],
-        label="使用するデバイス",
-        info="GPUのほうが速度が早いですが、学習中の途中観察にはCPUを使ってください",
-        value="cpu",
-    )
-    with gr.Row():
-        model_drop = gr.Dropdown(label="モデル", choices=models, value=models[0])
-        model_drop.select(
-            fn=load_model, inputs=[model_drop, radio_device], outputs=[model_drop]
-        )
-        refresh_button = gr.Button("モデル一覧を更新", scale=0)
-        refresh_button.click(fn=update_model_list, inputs=[], outputs=[model_drop])
-        reload_button = gr.Button("モデルを再読み込み", scale=0)
-        reload_button.click(
-            fn=load_model, inputs=[model_drop, radio_device], outputs=[model_drop]
-        )
-    with gr.Row():
-        text = gr.Textbox(label="テキストを入力してください。", value="これは音声合成のテストです。")
-        button_2p = gr.Button(value="アクセント解析\n(Enter可)", variant="primary", scale=0)
-    with gr.Column():
-        p = gr.Textbox(
-            label="解析結果（これをもとに音声合成します）",
-            info="必要に応じて、記法ルールを見ながら正しいアクセントになるように修正してください（直接ここに内容を入力することもできます）",
+
+def create_app() -> gr.Blocks:
+    with gr.Blocks(title="VITS-JaPros-WebUI 音声合成") as app:
+        gr.Markdown("# VITS-JaPros-WebUI 音声合成")
+        radio_device = gr.Radio(
+            ["cpu", "gpu"],
+            label="使用するデバイス",
+            info="GPUのほうが速度が早いですが、学習中の途中観察にはCPUを使ってください",
+            value="cpu",
         )
-        with gr.Accordion("アクセント等の記法ルール", open=False):
-            gr.Markdown(accent_guide)
-    button_2p.click(fn=g2p, inputs=[text], outputs=[p], api_name="g2p")
-    text.submit(fn=g2p, inputs=[text], outputs=[p])
-    with gr.Accordion("設定", open=False):
         with gr.Row():
-            with gr.Column():
-                gr.Markdown("音程・抑揚は1以外だと音質劣化の可能性があります。")
-                speed_scale = gr.Slider(
-                    label="話速", minimum=0.5, maximum=2.0, value=1.0, step=0.1
-                )
-                pitch_scale = gr.Slider(
-                    label="音程", minimum=0.85, maximum=1.15, value=1, step=0.01
-                )
-                intonation_scale = gr.Slider(
-                    label="抑揚", minimum=0, maximum=2, value=1.0, step=0.1
-                )
-            with gr.Column():
-                gr.Markdown("詳細設定（0以外にすると毎回結果が変わるみたいです。）")
-                noise_scale = gr.Slider(
-                    label="noise_scale (flowのゆらぎ?)",
-                    minimum=0,
-                    maximum=1,
-                    value=0,
-                    step=0.01,
-                )
-                noise_scale_dur = gr.Slider(
-                    label="noise_scale_dur (stochastic duration predictorのゆらぎ?)",
-                    minimum=0,
-                    maximum=1,
-                    value=0,
-                    step=0.01,
+            model_drop = gr.Dropdown(label="モデル", choices=models, value=models[0])
+            model_drop.select(
+                fn=load_model, inputs=[model_drop, radio_device], outputs=[model_drop]
+            )
+            refresh_button = gr.Button("モデル一覧を更新", scale=0)
+            refresh_button.click(fn=update_model_list, inputs=[], outputs=[model_drop])
+            reload_button = gr.Button("モデルを再読み込み", scale=0)
+        with gr.Row():
+            watch_checkbox = gr.Checkbox(
+                label="学習中のチェックポイントを自動で読み込む",
+                info="学習で新しいエポックが保存されたら、合成を止めずに差し替えます",
+                value=False,
+            )
+            watch_epoch = gr.Number(label="エポック（0なら最新）", value=0, precision=0)
+            watch_status = gr.Textbox(label="モデルの状態", interactive=False)
+            reload_button.click(
+                fn=reload_model,
+                inputs=[model_drop, radio_device],
+                outputs=[watch_status],
+            )
+            for component in [watch_checkbox, watch_epoch]:
+                component.change(
+                    fn=set_watch,
+                    inputs=[model_drop, watch_checkbox, watch_epoch, radio_device],
+                    outputs=[watch_status],
                 )
-    button_infer = gr.Button(value="音声合成！（Enter可）", variant="primary")
-    output_audio = gr.Audio(label="結果")
-    button_infer.click(
-        fn=inference,
-        inputs=[
-            model_drop,
-            p,
-            speed_scale,
-            pitch_scale,
-            intonation_scale,
-            noise_scale,
-            noise_scale_dur,
-            radio_device,
-        ],
-        outputs=[output_audio],
-        api_name="inference",
-    )
-    p.submit(
-        fn=inference,
-        inputs=[
-            model_drop,
-            p,
-            speed_scale,
-            pitch_scale,
-            intonation_scale,
-            noise_scale,
-            noise_scale_dur,
-            radio_device,
-        ],
-        outputs=[output_audio],
-    )
+            app.load(
+                fn=model_status, inputs=[model_drop], outputs=[watch_status], every=5
+            )
+        with gr.Row():
+            text = gr.Textbox(label="テキストを入力してください。", value="これは音声合成のテストです。")
+            button_2p = gr.Button(value="アクセント解析\n(Enter可)", variant="primary", scale=0)
+        with gr.Column():
+            p = gr.Textbox(
+                label="解析結果（これをもとに音声合成します）",
+                info="必要に応じて、記法ルールを見ながら正しいアクセントになるように修正してください（直接ここに内容を入力することもできます）",
+            )
+            with gr.Accordion("アクセント等の記法ルール", open=False):
+                gr.Markdown(accent_guide)
+        button_2p.click(fn=g2p, inputs=[text], outputs=[p], api_name="g2p")
+        text.submit(fn=g2p, inputs=[text], outputs=[p])
+        with gr.Accordion("設定", open=False):
+            with gr.Row():
+                with gr.Column():
+                    gr.Markdown("音程・抑揚は1以外だと音質劣化の可能性があります。")
+                    speed_scale = gr.Slider(
+                        label="話速", minimum=0.5, maximum=2.0, value=1.0, step=0.1
+                    )
+                    pitch_scale = gr.Slider(
+                        label="音程", minimum=0.85, maximum=1.15, value=1, step=0.01
+                    )
+                    intonation_scale = gr.Slider(
+                        label="抑揚", minimum=0, maximum=2, value=1.0, step=0.1
+                    )
+                with gr.Column():
+                    gr.Markdown("詳細設定（0以外にすると毎回結果が変わるみたいです。）")
+                    noise_scale = gr.Slider(
+                        label="noise_scale (flowのゆらぎ?)",
+                        minimum=0,
+                        maximum=1,
+                        value=0,
+                        step=0.01,
+                    )
+                    noise_scale_dur = gr.Slider(
+                        label="noise_scale_dur (stochastic duration predictorのゆらぎ?)",
+                        minimum=0,
+                        maximum=1,
+                        value=0,
+                        step=0.01,
+                    )
+        with gr.Row():
+            button_infer = gr.Button(value="音声合成！（Enter可）", variant="primary")
+            button_stream = gr.Button(value="ストリーミング合成（区切りごとに再生）")
+        output_audio = gr.Audio(label="結果")
+        output_stream = gr.Audio(label="ストリーミング結果", streaming=True, autoplay=True)
+        button_infer.click(
+            fn=inference,
+            inputs=[
+                model_drop,
+                p,
+                speed_scale,
+                pitch_scale,
+                intonation_scale,
+                noise_scale,
+                noise_scale_dur,
+                radio_device,
+            ],
+            outputs=[output_audio],
+            api_name="inference",
+        )
+        p.submit(
+            fn=inference,
+            inputs=[
+                model_drop,
+                p,
+                speed_scale,
+                pitch_scale,
+                intonation_scale,
+                noise_scale,
+                noise_scale_dur,
+                radio_device,
+            ],
+            outputs=[output_audio],
+        )
+        button_stream.click(
+            fn=inference_stream,
+            inputs=[
+                model_drop,
+                p,
+                speed_scale,
+                pitch_scale,
+                intonation_scale,
+                noise_scale,
+                noise_scale_dur,
+                radio_device,
+            ],
+            outputs=[output_stream],
+            api_name="inference_stream",
+        )
+
+    return app
 
 
 def is_colab():
@@ -178,4 +262,44 @@ def is_colab():
 
 
 if __name__ == "__main__":
-    app.launch(inbrowser=True, share=is_colab())
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--max-models", type=int, default=2, help="メモリに保持しておくモデルの数"
+    )
+    parser.add_argument(
+        "--preload", type=str, nargs="*", default=[], help="起動時に読み込むモデル名"
+    )
+    parser.add_argument("--preload-device", type=str, default="cpu")
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default=None,
+        help="合成結果をディスクにもキャッシュする場合の保存先",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="合成結果をキャッシュしない")
+    parser.add_argument(
+        "--precision",
+        type=str,
+        default="fp32",
+        choices=["fp32", "bf16", "int8"],
+        help="int8はCPUのみ（詳細は`precision.py`を参照）",
+    )
+
+    parser.add_argument(
+        "--output-root",
+        type=str,
+        default="outputs",
+        help="学習中のチェックポイントを探すディレクトリ",
+    )
+    args = parser.parse_args()
+
+    cache = None if args.no_cache else SynthesisCache(args.cache_dir)
+    registry = ModelRegistry(
+        model_root,
+        max_models=args.max_models,
+        cache=cache,
+        precision=args.precision,
+    )
+    watcher = CheckpointWatcher(registry, args.output_root)
+    registry.preload(args.preload, args.preload_device)
+    create_app().queue().launch(inbrowser=True, share=is_colab())
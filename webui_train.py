@@ -88,7 +88,7 @@ VITSのJaProsモデルを学習します。以下のStep 0からStep 3に従っ
 - 音声データのうち5ファイルは学習データとして使われず、検証データとして使われます。
 - どれだけの音声データがあれば質が良くなるか等は分かりません、実験してください。TensorBoardの`generator_mel_loss`がいい指標かもしれません。
 - 学習を途中で中断したい場合は単にターミナルを閉じてください。学習を再開したいときは、最後のステップ以外を飛ばし、最後のステップを「同じモデル名」で実行すれば、`data/outputs/{model_name}/checkpoints`に保存されている最新エポック・最新状態から再開されます。
-- 音声合成に使うには、`weights/{model_name}`フォルダを作って、`outputs/{model_name}/checkpoints`にある`{数字}epoch.pth`ファイルをコピーしてください。**学習中はグラボが競合しないように、音声合成はCPUモードを選んでください。**
+- 学習中は毎エポック、`weights/{model_name}`に最新エポックの合成用のファイル（`{数字}epoch.slim.pth`と`config.yaml`）が保存されるので、そのまま音声合成に使えます。**学習中はグラボが競合しないように、音声合成はCPUモードを選んでください。**
 """
 
 step_0_md = """